@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('C:/Users/Ionut.Emilian/AppData/Local/Programs/Python/Python313/Lib/site-packages/customtkinter', 'customtkinter'), ('C:/Users/Ionut.Emilian/AppData/Local/Programs/Python/Python313/Lib/site-packages/darkdetect', 'darkdetect')],
-    hiddenimports=['customtkinter', 'darkdetect', 'samsung_mdc', 'samsungtvws', 'websocket', 'requests', 'PIL', 'PIL._tkinter_finder'],
+    hiddenimports=['customtkinter', 'darkdetect', 'samsung_mdc', 'samsungtvws', 'websocket', 'websockets', 'aiohttp', 'requests', 'PIL', 'PIL._tkinter_finder'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,385 @@
+import argparse
+import atexit
+import getpass
+import gzip
+import json
+import os
+import queue
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+AUDIT_DIR = Path.home() / "Documents" / "SamsungMDC" / "audit"
+JOURNAL_FILE = AUDIT_DIR / "audit.jsonl"
+INDEX_FILE = AUDIT_DIR / "audit.db"
+ROTATE_BYTES = 16 * 1024 * 1024
+RETENTION_SECONDS = 365 * 86400
+MAINTENANCE_INTERVAL_SECONDS = 3600
+# Rotated segments are compressed once no writer can still be appending to them.
+COMPRESS_AFTER_SECONDS = 60
+# Longer arguments / results (screen captures, device info) are journalled as their size only.
+MAX_VALUE_CHARS = 160
+SEARCH_LIMIT = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    ts REAL NOT NULL,
+    who TEXT,
+    source TEXT,
+    device TEXT NOT NULL,
+    port INTEGER,
+    display_id INTEGER,
+    command TEXT NOT NULL,
+    args TEXT,
+    ok INTEGER NOT NULL,
+    result TEXT,
+    latency_ms REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_device_ts ON entries (device, ts);
+CREATE INDEX IF NOT EXISTS entries_command_ts ON entries (command, ts);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts);
+"""
+_INSERT = "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_COLUMNS = ("ts", "who", "source", "device", "port", "display_id", "command", "args", "ok", "result",
+            "latency_ms", "error")
+# Journal keys, in the order of _COLUMNS.
+_KEYS = ("ts", "who", "src", "dev", "port", "id", "cmd", "args", "ok", "res", "ms", "err")
+
+
+def compact_value(value):
+    """``value`` as a small JSON-able journal field: bytes as a list (or text), enums by name, big values as a size."""
+    if isinstance(value, (bytes, bytearray)):
+        data = bytes(value)
+        if len(data) > MAX_VALUE_CHARS // 4:
+            return f"<{len(data)} bytes>"
+        if len(data) >= 4 and all(32 <= byte < 127 for byte in data):
+            return data.decode("ascii")
+        return list(data)
+    if isinstance(value, (list, tuple)):
+        value = [compact_value(item) for item in value]
+    elif hasattr(value, "name") and hasattr(value, "value"):  # enum members
+        return value.name
+    elif not isinstance(value, (str, int, float, bool, dict, type(None))):
+        value = str(value)
+    text = json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+    if len(text) > MAX_VALUE_CHARS:
+        return f"<{len(text)} chars>"
+    return value
+
+
+def _dump(value) -> str | None:
+    return None if value is None else json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _row(entry: dict) -> tuple:
+    row = tuple(entry.get(key) for key in _KEYS)
+    # args and result are stored as JSON text in the index.
+    return row[:7] + (_dump(row[7]), int(bool(row[8])), _dump(row[9])) + row[10:]
+
+
+class AuditLog:
+    """Every command sent to a device, as an append-only journal plus a SQLite index.
+
+    :meth:`record` is called for each MDC frame and Smart TV call and never
+    touches the disk on the caller's thread: entries go to a writer thread
+    (started on the first one) that appends them in batches to ``journal`` as
+    compact JSON lines and inserts them into ``index``. The journal is the
+    record; the index only makes :meth:`search` by device, command and time
+    range fast and can be rebuilt from the journal (:meth:`rebuild_index`).
+
+    Past ``rotate_bytes`` the journal is renamed to a timestamped segment,
+    which is gzipped a minute later; segments and index rows older than
+    ``retention`` seconds are deleted. Several processes (dashboard, daemon,
+    scheduler) may share the files: each batch is one append and the index is
+    in WAL mode. ``who`` is the OS account and host, ``source`` the program.
+    """
+
+    def __init__(self, journal: Path = JOURNAL_FILE, index: Path = INDEX_FILE, rotate_bytes: int = ROTATE_BYTES,
+                 retention: float = RETENTION_SECONDS):
+        self.journal = journal
+        self.index = index
+        self.rotate_bytes = rotate_bytes
+        self.retention = retention
+        self.enabled = True
+        self.who = f"{getpass.getuser()}@{socket.gethostname()}"
+        self.source = Path(sys.argv[0]).stem or "python"
+        self._entries: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self._writer: threading.Thread | None = None
+        self._reader: sqlite3.Connection | None = None
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        self.index.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.index), timeout=5, check_same_thread=check_same_thread)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        return conn
+
+    # ── Writing ──────────────────────────────────────────────────────────────
+    def record(self, device: str, command: str, args=(), ok: bool = True, result=None,
+               latency_ms: float | None = None, error: str | None = None, port: int | None = None,
+               display_id: int | None = None) -> None:
+        if not self.enabled:
+            return
+        entry = {"ts": round(time.time(), 3), "who": self.who, "src": self.source, "dev": device, "port": port,
+                 "id": display_id, "cmd": command, "args": compact_value(args), "ok": bool(ok),
+                 "res": compact_value(result), "ms": None if latency_ms is None else round(latency_ms, 1),
+                 "err": error}
+        self._entries.put({key: value for key, value in entry.items() if value is not None})
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="audit-log", daemon=True)
+                    self._writer.start()
+                    atexit.register(self.close)
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """Wait until every recorded entry is in the journal and the index; False on timeout."""
+        if self._writer is None:
+            return True
+        done = threading.Event()
+        self._entries.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        if self._writer is not None and self._writer.is_alive():
+            self._entries.put(None)
+            self._writer.join(timeout=5)
+
+    def _write_loop(self) -> None:
+        try:
+            conn = self._connect()
+        except sqlite3.Error:
+            conn = None  # the journal is still written; rebuild_index() catches the index up later
+        last_maintenance = 0.0
+
+        while True:
+            items = [self._entries.get()]
+            while True:
+                try:
+                    items.append(self._entries.get_nowait())
+                except queue.Empty:
+                    break
+
+            entries = [item for item in items if isinstance(item, dict)]
+            if entries:
+                try:
+                    self._append(entries)
+                except OSError:
+                    pass
+                if conn is not None:
+                    try:
+                        with conn:
+                            conn.executemany(_INSERT, [_row(entry) for entry in entries])
+                    except sqlite3.Error:
+                        pass
+            if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL_SECONDS:
+                self._maintain(conn)
+                last_maintenance = time.monotonic()
+
+            for item in items:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if None in items:
+                if conn is not None:
+                    conn.close()
+                return
+
+    def _append(self, entries: list[dict]) -> None:
+        self.journal.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            if self.journal.stat().st_size >= self.rotate_bytes:
+                self._rotate()
+        except OSError:
+            pass
+        lines = "".join(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n" for entry in entries)
+        # Opened per batch and written in one call, so another process can append or rotate in between.
+        with open(self.journal, "a", encoding="utf-8") as journal:
+            journal.write(lines)
+
+    def _rotate(self) -> None:
+        now = time.time()
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+        segment = self.journal.with_name(f"{self.journal.stem}-{stamp}-{os.getpid()}.jsonl")
+        os.replace(self.journal, segment)
+
+    def segments(self) -> list[Path]:
+        """Rotated journal segments, oldest first (the names sort by rotation time)."""
+        pattern = f"{self.journal.stem}-*.jsonl*"
+        return sorted(self.journal.parent.glob(pattern))
+
+    def _maintain(self, conn: sqlite3.Connection | None) -> None:
+        now = time.time()
+        for segment in self.segments():
+            try:
+                age = now - segment.stat().st_mtime
+                if age > self.retention:
+                    segment.unlink()
+                elif segment.suffix == ".jsonl" and age > COMPRESS_AFTER_SECONDS:
+                    with open(segment, "rb") as source, gzip.open(f"{segment}.gz", "wb") as target:
+                        target.writelines(source)
+                    segment.unlink()
+            except OSError:
+                continue
+        if conn is not None:
+            try:
+                with conn:
+                    conn.execute("DELETE FROM entries WHERE ts < ?", (now - self.retention,))
+            except sqlite3.Error:
+                pass
+
+    # ── Reading ──────────────────────────────────────────────────────────────
+    def entries(self):
+        """Every journalled entry, oldest first, from the segments and then the active journal."""
+        for path in [*self.segments(), self.journal]:
+            opener = gzip.open if path.suffix == ".gz" else open
+            try:
+                with opener(path, "rt", encoding="utf-8") as journal:
+                    for line in journal:
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            continue  # a line cut short by a crash
+            except OSError:
+                continue
+
+    def rebuild_index(self) -> int:
+        """Recreate the index from the journal (after deleting a damaged ``audit.db``); returns the entry count."""
+        self.flush()
+        conn = self._connect()
+        count = 0
+        try:
+            with conn:
+                conn.execute("DELETE FROM entries")
+                batch = []
+                for entry in self.entries():
+                    batch.append(_row(entry))
+                    if len(batch) >= 10000:
+                        conn.executemany(_INSERT, batch)
+                        count += len(batch)
+                        batch.clear()
+                conn.executemany(_INSERT, batch)
+                count += len(batch)
+        finally:
+            conn.close()
+        return count
+
+    def search(self, device: str | None = None, command: str | None = None, since: float | None = None,
+               until: float | None = None, failed_only: bool = False, limit: int = SEARCH_LIMIT) -> list[dict]:
+        """Indexed entries, newest first. ``device`` is an IP; ``command`` may end in ``*`` to match a prefix."""
+        clauses, params = [], []
+        if device:
+            clauses.append("device = ?")
+            params.append(device)
+        if command:
+            if command.endswith("*"):
+                clauses.append("command >= ? AND command < ?")
+                params += [command[:-1], command[:-1] + "\uffff"]
+            else:
+                clauses.append("command = ?")
+                params.append(command)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts < ?")
+            params.append(until)
+        if failed_only:
+            clauses.append("ok = 0")
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._read(f"SELECT * FROM entries{where} ORDER BY ts DESC LIMIT ?", (*params, limit))
+        entries = []
+        for row in rows:
+            entry = dict(zip(_COLUMNS, row))
+            entry["args"] = json.loads(entry["args"]) if entry["args"] else []
+            entry["result"] = json.loads(entry["result"]) if entry["result"] else None
+            entry["ok"] = bool(entry["ok"])
+            entries.append(entry)
+        return entries
+
+    def commands(self) -> list[str]:
+        """Every command name in the index, for filter suggestions."""
+        return [name for (name,) in self._read("SELECT DISTINCT command FROM entries ORDER BY command")]
+
+    def _read(self, sql: str, params=()) -> list[tuple]:
+        if self._reader is None:
+            try:
+                # Searches may come from the UI thread or from daemon handler threads.
+                self._reader = self._connect(check_same_thread=False)
+            except sqlite3.Error:
+                return []
+        try:
+            with self._read_lock:
+                return self._reader.execute(sql, params).fetchall()
+        except sqlite3.Error:
+            return []
+
+
+AUDIT = AuditLog()
+
+
+def format_entry(entry: dict) -> str:
+    """One search result as a log line."""
+    when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["ts"]))
+    target = entry["device"] if entry.get("display_id") in (None, 0) else f"{entry['device']}#{entry['display_id']}"
+    args = entry.get("args")
+    call = f"{entry['command']}({', '.join(str(arg) for arg in args)})" if isinstance(args, list) else \
+        f"{entry['command']}({args})"
+    if entry["ok"]:
+        outcome = "OK" if entry.get("result") is None else f"-> {entry['result']}"
+    else:
+        outcome = f"FAILED: {entry.get('error') or 'error'}"
+    latency = f" {entry['latency_ms']:.0f} ms" if entry.get("latency_ms") is not None else ""
+    return f"{when}  {target:<18} {call:<32} {outcome}{latency}  [{entry.get('who')} / {entry.get('source')}]"
+
+
+def parse_time(text: str | None) -> float | None:
+    """``YYYY-MM-DD[ HH:MM[:SS]]``, or an age such as ``90m``, ``12h`` or ``7d``, as a timestamp."""
+    if not text:
+        return None
+    text = text.strip()
+    units = {"m": 60, "h": 3600, "d": 86400}
+    if text[-1:] in units and text[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(text[:-1]) * units[text[-1]]
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return time.mktime(time.strptime(text, fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised time {text!r} (use YYYY-MM-DD[ HH:MM] or an age like 12h / 7d)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Search the audit log of commands sent to devices")
+    sub = parser.add_subparsers(dest="action", required=True)
+    search = sub.add_parser("search", help="Show matching entries, newest first")
+    search.add_argument("--device", help="Device IP")
+    search.add_argument("--command", help="Command name; a trailing * matches a prefix (e.g. timer_*)")
+    search.add_argument("--since", help="YYYY-MM-DD[ HH:MM] or an age (12h, 7d)")
+    search.add_argument("--until", help="YYYY-MM-DD[ HH:MM] or an age (12h, 7d)")
+    search.add_argument("--failed", action="store_true", help="Only failed commands")
+    search.add_argument("--limit", type=int, default=SEARCH_LIMIT)
+    search.add_argument("--json", action="store_true", help="JSON Lines instead of text")
+    sub.add_parser("rebuild", help="Recreate the index from the journal")
+    args = parser.parse_args()
+
+    AUDIT.enabled = False  # searching is not a device command
+    if args.action == "rebuild":
+        print(f"Indexed {AUDIT.rebuild_index()} entries from {AUDIT.journal.parent}")
+        return
+    try:
+        since, until = parse_time(args.since), parse_time(args.until)
+    except ValueError as exc:
+        parser.error(str(exc))
+    for entry in reversed(AUDIT.search(args.device, args.command, since, until, args.failed, args.limit)):
+        print(json.dumps(entry, ensure_ascii=False) if args.json else format_entry(entry))
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,8 @@ py -m PyInstaller ^
     --hidden-import samsung_mdc ^
     --hidden-import samsungtvws ^
     --hidden-import websocket ^
+    --hidden-import websockets ^
+    --hidden-import aiohttp ^
     --hidden-import requests ^
     --hidden-import PIL ^
     --hidden-import PIL._tkinter_finder ^
@@ -0,0 +1,109 @@
+import asyncio
+import itertools
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class SupersededError(Exception):
+    """A queued command was dropped because a newer one replaced it before it ran."""
+
+
+def device_key(ip: str, port: int, display_id: int = 0) -> str:
+    return f"{ip}:{port}/{display_id}"
+
+
+class _Entry:
+    __slots__ = ("factory", "future", "supersede_key", "dropped")
+
+    def __init__(self, factory, future, supersede_key):
+        self.factory = factory
+        self.future = future
+        self.supersede_key = supersede_key
+        self.dropped = False
+
+
+class CommandQueue:
+    """Run at most one command per device at a time, lowest priority value first.
+
+    Must be used from the event loop thread. A worker task is created on demand
+    for each busy device and exits as soon as that device's queue drains.
+    """
+
+    def __init__(self):
+        self._queues: dict[str, asyncio.PriorityQueue] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+        self._pending: dict[tuple[str, str], _Entry] = {}
+        self._depths: dict[str, int] = {}
+        self._active: set[str] = set()
+        self._counter = itertools.count()
+
+    def submit(self, key: str, factory, priority: int = PRIORITY_INTERACTIVE, supersede_key: str | None = None):
+        """Queue ``factory()`` (a coroutine factory) for device ``key``.
+
+        When ``supersede_key`` is given, a still-queued entry with the same key
+        is dropped and its future fails with :class:`SupersededError`.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        entry = _Entry(factory, future, supersede_key)
+
+        if supersede_key is not None:
+            previous = self._pending.get((key, supersede_key))
+            if previous is not None:
+                self._drop(key, previous)
+            self._pending[(key, supersede_key)] = entry
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.PriorityQueue()
+        queue.put_nowait((priority, next(self._counter), entry))
+        self._depths[key] = self._depths.get(key, 0) + 1
+
+        if key not in self._workers:
+            self._workers[key] = loop.create_task(self._drain(key, queue))
+        return future
+
+    def depth(self, key: str) -> int:
+        return self._depths.get(key, 0)
+
+    def depths(self) -> dict[str, int]:
+        return {key: count for key, count in self._depths.items() if count}
+
+    def active(self) -> set[str]:
+        return set(self._active)
+
+    def _drop(self, key: str, entry: _Entry) -> None:
+        entry.dropped = True
+        self._depths[key] -= 1
+        if not entry.future.done():
+            entry.future.set_exception(SupersededError(f"{entry.supersede_key} superseded on {key}"))
+
+    async def _drain(self, key: str, queue: asyncio.PriorityQueue) -> None:
+        try:
+            while not queue.empty():
+                _, _, entry = queue.get_nowait()
+                if entry.dropped:
+                    continue
+                self._depths[key] -= 1
+                if entry.supersede_key is not None and self._pending.get((key, entry.supersede_key)) is entry:
+                    del self._pending[(key, entry.supersede_key)]
+                if entry.future.done():
+                    continue
+
+                self._active.add(key)
+                try:
+                    result = await entry.factory()
+                except Exception as exc:
+                    if not entry.future.done():
+                        entry.future.set_exception(exc)
+                else:
+                    if not entry.future.done():
+                        entry.future.set_result(result)
+                finally:
+                    self._active.discard(key)
+        finally:
+            self._workers.pop(key, None)
+            if queue.empty():
+                self._queues.pop(key, None)
+                self._depths.pop(key, None)
@@ -0,0 +1,559 @@
+import argparse
+import asyncio
+import hmac
+import json
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from audit_log import AUDIT, parse_time
+from command_queue import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, device_key
+from deferred_commands import DeferredCommands
+from devices import load_saved_devices, normalize_device
+from fleet_runtime import FleetRuntime
+from operations import Operation, OperationError, run_operation, to_jsonable
+from resilience import is_offline, is_transient
+from rollout import DEFAULT_CONCURRENCY, DEFAULT_MAX_FAILURE_RATE, Rollout
+from scheduler import JOBS_FILE, Job, Scheduler, load_jobs
+from status_history import StatusHistory
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_KEEPALIVE = 20.0
+DEFAULT_POLL_SECONDS = 30.0
+MAX_BODY_BYTES = 1024 * 1024
+REQUEST_TIMEOUT = 10.0
+SSE_HEARTBEAT_SECONDS = 15.0
+EVENT_BUFFER = 1000
+
+_REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 502: "Bad Gateway"}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class EventHub:
+    """Fan-out of daemon events to stream subscribers.
+
+    Each subscriber has a bounded queue; a client that stops reading loses
+    its oldest events rather than holding memory or slowing the others.
+    """
+
+    def __init__(self, buffer: int = EVENT_BUFFER):
+        self.buffer = buffer
+        self._subscribers: set[asyncio.Queue] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(self.buffer)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, event_type: str, **fields) -> None:
+        event = {"type": event_type, "ts": time.time(), **fields}
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+class ControlDaemon:
+    """Headless HTTP/JSON front end for one shared :class:`FleetRuntime`.
+
+    Every operator and script talking to the daemon goes through the same
+    command queues, circuit breakers, RTT timeouts and kept-open MDC
+    connections, instead of each dashboard competing for the panels. Saved
+    devices are polled in the background at low priority; reachability
+    changes and every operation result are pushed to ``GET /events``
+    (server-sent events). Runs entirely on the runtime's event loop.
+    """
+
+    def __init__(self, runtime: FleetRuntime, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 token: str | None = None, poll_interval: float = DEFAULT_POLL_SECONDS,
+                 history: StatusHistory | None = None, jobs: list[Job] | None = None,
+                 deferred: DeferredCommands | None = None):
+        self.runtime = runtime
+        self.host = host
+        self.port = port
+        self.token = token
+        self.poll_interval = poll_interval
+        self.history = history
+        self.deferred = deferred
+        self.events = EventHub()
+        self.scheduler = Scheduler(runtime, jobs, on_event=self.events.publish) if jobs else None
+        self.device_state: dict[str, dict] = {}
+        self.rollouts: dict[str, Rollout] = {}
+        self.started_at = time.time()
+        self._server: asyncio.AbstractServer | None = None
+        self._poller: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.poll_interval > 0:
+            self._poller = asyncio.create_task(self._poll_loop())
+        if self.scheduler is not None:
+            self.scheduler.start()
+
+    def _spawn(self, coro) -> asyncio.Task:
+        # The loop only keeps weak references to tasks; hold one until the task is done.
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def stop(self) -> None:
+        if self._poller is not None:
+            self._poller.cancel()
+        if self._server is not None:
+            self._server.close()
+        if self.scheduler is not None:
+            await self.scheduler.stop()
+        if self.runtime.sessions is not None:
+            await self.runtime.sessions.close()
+
+    # ── HTTP plumbing ────────────────────────────────────────────────────────
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                method, path, query, headers, body = await asyncio.wait_for(_read_request(reader), REQUEST_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                return
+            except HttpError as exc:
+                await _send_json(writer, exc.status, {"ok": False, "error": str(exc)})
+                return
+
+            try:
+                self._authorize(headers)
+                if method == "GET" and path == "/events":
+                    await self._stream_events(writer, query)
+                    return
+                status, payload = 200, await self._route(method, path, query, body)
+            except HttpError as exc:
+                status, payload = exc.status, {"ok": False, "error": str(exc)}
+            except Exception as exc:
+                status, payload = 500, {"ok": False, "error": f"{exc.__class__.__name__}: {exc}"}
+            await _send_json(writer, status, payload)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def _authorize(self, headers: dict) -> None:
+        if not self.token:
+            return
+        supplied = headers.get("authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {self.token}".encode()):
+            raise HttpError(401, "Missing or wrong bearer token")
+
+    async def _route(self, method: str, path: str, query: dict, body: bytes) -> dict:
+        parts = [unquote(part) for part in path.strip("/").split("/") if part]
+        if parts == ["health"]:
+            _expect(method, "GET")
+            return {"ok": True, "uptime_s": round(time.time() - self.started_at, 1)}
+        if parts == ["stats"]:
+            _expect(method, "GET")
+            return {"ok": True, **await self.runtime.stats(), "subscribers": len(self.events)}
+        if parts == ["devices"]:
+            _expect(method, "GET")
+            devices = await asyncio.to_thread(load_saved_devices)
+            return {"ok": True, "devices": [self._describe(device) for device in devices]}
+        if len(parts) == 3 and parts[0] == "devices" and parts[2] == "operations":
+            _expect(method, "POST")
+            return await self._run_one(parts[1], _parse_json(body))
+        if parts == ["operations"]:
+            _expect(method, "POST")
+            return await self._run_many(_parse_json(body))
+        if parts and parts[0] == "rollouts":
+            return await self._route_rollouts(method, parts[1:], body)
+        if parts and parts[0] == "schedule":
+            return await self._route_schedule(method, parts[1:], query)
+        if parts and parts[0] == "deferred":
+            return await self._route_deferred(method, parts[1:], query, body)
+        if parts == ["audit"]:
+            _expect(method, "GET")
+            return {"ok": True, "entries": await self._audit(query)}
+        raise HttpError(404, f"No route for {path}")
+
+    async def _route_schedule(self, method: str, parts: list[str], query: dict) -> dict:
+        if self.scheduler is None:
+            raise HttpError(404, "No scheduled jobs are loaded")
+        history = self.scheduler.history
+        if not parts:
+            _expect(method, "GET")
+            return {"ok": True, "jobs": [
+                {"name": job.name, "cron": job.schedule.expression, "operation": job.operation.to_dict(),
+                 "targets": job.targets, "enabled": job.enabled,
+                 "next_run": next_run.timestamp() if (next_run := self.scheduler.next_run.get(job.name)) else None}
+                for job in self.scheduler.jobs.values()
+            ]}
+        if parts == ["runs"]:
+            _expect(method, "GET")
+            limit = int(_query_value(query, "limit") or 50)
+            runs = await asyncio.to_thread(history.runs, _query_value(query, "job"), limit)
+            return {"ok": True, "runs": runs}
+        if len(parts) == 2 and parts[0] == "runs":
+            _expect(method, "GET")
+            return {"ok": True, "results": await asyncio.to_thread(history.results, int(parts[1]))}
+        if parts == ["failures"]:
+            _expect(method, "GET")
+            since = time.time() - float(_query_value(query, "days") or 7) * 86400
+            failures = await asyncio.to_thread(
+                history.failures, _query_value(query, "device"), _query_value(query, "job"), since)
+            return {"ok": True, "failures": failures}
+        if len(parts) == 2 and parts[1] == "run":
+            _expect(method, "POST")
+            if parts[0] not in self.scheduler.jobs:
+                raise HttpError(404, f"No scheduled job named {parts[0]!r}")
+            self.scheduler.run_now(parts[0])
+            return {"ok": True}
+        raise HttpError(404, "No such schedule route")
+
+    async def _route_deferred(self, method: str, parts: list[str], query: dict, body: bytes) -> dict:
+        if self.deferred is None:
+            raise HttpError(404, "Deferred commands are disabled")
+        if not parts:
+            _expect(method, "GET")
+            return {"ok": True, "pending": await asyncio.to_thread(self.deferred.pending, _query_value(query, "device"))}
+        if parts == ["clear"]:
+            _expect(method, "POST")
+            ip = _parse_json(body).get("device")
+            return {"ok": True, "discarded": await asyncio.to_thread(self.deferred.discard, ip)}
+        raise HttpError(404, "No such deferred route")
+
+    @staticmethod
+    async def _audit(query: dict) -> list[dict]:
+        try:
+            since, until = parse_time(_query_value(query, "since")), parse_time(_query_value(query, "until"))
+            limit = int(_query_value(query, "limit") or 200)
+        except ValueError as exc:
+            raise HttpError(400, str(exc)) from exc
+        failed = (_query_value(query, "failed") or "").lower() in ("1", "true", "yes")
+        return await asyncio.to_thread(AUDIT.search, _query_value(query, "device"), _query_value(query, "command"),
+                                       since, until, failed, limit)
+
+    # ── Operations ───────────────────────────────────────────────────────────
+    def _describe(self, device: dict) -> dict:
+        return {**device, **self.device_state.get(device["ip"], {})}
+
+    @staticmethod
+    async def _saved_by_ip() -> dict[str, dict]:
+        """Saved devices keyed by IP, read once per request off the event loop; the first entry wins."""
+        saved: dict[str, dict] = {}
+        for device in await asyncio.to_thread(load_saved_devices):
+            saved.setdefault(device["ip"], device)
+        return saved
+
+    @staticmethod
+    def _target(ip: str, overrides: dict, saved: dict[str, dict]) -> dict:
+        """The saved device for ``ip`` (or MDC defaults), with ``port`` / ``display_id`` / ``protocol`` overrides."""
+        device = dict(saved.get(ip.strip()) or {"ip": ip})
+        for field, key in (("port", "port"), ("display_id", "id"), ("protocol", "protocol")):
+            if overrides.get(field) is not None:
+                device[key] = overrides[field]
+        normalized = normalize_device(device)
+        if normalized is None:
+            raise HttpError(400, "A device IP is required")
+        return normalized
+
+    async def _execute(self, device: dict, operation: Operation, priority: int, defer: bool = False) -> dict:
+        """Run one operation; with ``defer`` a SET for an offline device is queued for replay instead."""
+        start = time.perf_counter()
+        try:
+            result = await run_operation(self.runtime, device, operation, priority)
+        except OperationError as exc:
+            raise HttpError(400, str(exc)) from exc
+        except Exception as exc:
+            elapsed_ms = int((time.perf_counter() - start) * 1000)
+            self.events.publish("operation", device=device["ip"], operation=operation.to_dict(), ok=False,
+                                error=str(exc) or exc.__class__.__name__, elapsed_ms=elapsed_ms)
+            self._note_reachability(device["ip"], not is_offline(exc), None)
+            row = {"device": device["ip"], "ok": False, "error": str(exc) or exc.__class__.__name__,
+                   "transient": is_transient(exc), "elapsed_ms": elapsed_ms}
+            if defer and self.deferred is not None and is_offline(exc):
+                row["deferred"] = await asyncio.to_thread(self.deferred.add, device, operation)
+                if row["deferred"]:
+                    self.events.publish("deferred", device=device["ip"], operation=operation.to_dict())
+            return row
+
+        elapsed_ms = int((time.perf_counter() - start) * 1000)
+        result = to_jsonable(result)
+        self.events.publish("operation", device=device["ip"], operation=operation.to_dict(), ok=True,
+                            result=None if isinstance(result, dict) and "base64" in result else result,
+                            elapsed_ms=elapsed_ms)
+        self._note_reachability(device["ip"], True, None)
+        return {"device": device["ip"], "ok": True, "result": result, "elapsed_ms": elapsed_ms}
+
+    async def _run_one(self, ip: str, body: dict) -> dict:
+        operation = _operation(body)
+        device = self._target(ip, body, await self._saved_by_ip())
+        return await self._execute(device, operation, _priority(body),
+                                   bool(body.get("defer_if_offline")))
+
+    async def _targets(self, body: dict) -> list[dict]:
+        """``devices`` (IPs), a ``site``, or every saved device with ``"all": true``; never a default."""
+        if not (body.get("devices") or body.get("site") or body.get("all") is True):
+            # A bare {"command": "reboot"} must not reach the whole fleet.
+            raise HttpError(400, 'Name the targets: "devices", "site", or "all": true for every saved device')
+        saved = await self._saved_by_ip()
+        if body.get("devices"):
+            return [self._target(str(ip), {}, saved) for ip in body["devices"]]
+        if body.get("site"):
+            return [device for device in saved.values() if device["site"] == str(body["site"]).strip()]
+        return list(saved.values())
+
+    async def _run_many(self, body: dict) -> dict:
+        """Fan one operation out over ``devices`` (IPs), a ``site``, or every saved device (``"all": true``)."""
+        operation = _operation(body.get("operation", body))
+        targets = await self._targets(body)
+        defer = bool(body.get("defer_if_offline"))
+        results = await asyncio.gather(
+            *(self._execute(device, operation, _priority(body), defer) for device in targets),
+            return_exceptions=True,
+        )
+        rows = []
+        for device, result in zip(targets, results):
+            if isinstance(result, BaseException):
+                result = {"device": device["ip"], "ok": False, "error": str(result)}
+            rows.append(result)
+        return {"ok": all(row["ok"] for row in rows), "results": rows}
+
+    # ── Rollouts ─────────────────────────────────────────────────────────────
+    async def _start_rollout(self, body: dict) -> dict:
+        operation = _operation(body.get("operation", {}))
+        targets = await self._targets(body)
+        if not targets:
+            raise HttpError(400, "No devices match the rollout targets")
+        rollout_id = str(len(self.rollouts) + 1)
+        try:
+            rollout = Rollout(
+                self.runtime, targets, operation,
+                canary=body.get("canary", 1),
+                wave_size=body.get("wave_size"),
+                wave_percent=body.get("wave_percent"),
+                max_failure_rate=float(body.get("max_failure_rate", DEFAULT_MAX_FAILURE_RATE)),
+                concurrency=int(body.get("concurrency", DEFAULT_CONCURRENCY)),
+                settle_seconds=body.get("settle_seconds"),
+                pause_seconds=float(body.get("pause_seconds", 0)),
+                on_event=lambda event_type, **fields: self.events.publish(event_type, rollout=rollout_id, **fields),
+            )
+        except (TypeError, ValueError) as exc:
+            raise HttpError(400, f"Invalid rollout settings: {exc}") from exc
+        self.rollouts[rollout_id] = rollout
+        self._spawn(rollout.run())
+        return {"ok": True, "id": rollout_id, "waves": [len(wave) for wave in rollout.waves]}
+
+    async def _route_rollouts(self, method: str, parts: list[str], body: bytes) -> dict:
+        if not parts:
+            if method == "POST":
+                return await self._start_rollout(_parse_json(body))
+            _expect(method, "GET")
+            return {"ok": True, "rollouts": [
+                {"id": rollout_id, "status": rollout.status, "operation": rollout.operation.to_dict()}
+                for rollout_id, rollout in self.rollouts.items()
+            ]}
+        rollout = self.rollouts.get(parts[0])
+        if rollout is None:
+            raise HttpError(404, f"No rollout {parts[0]!r}")
+        if parts[1:] == ["cancel"]:
+            _expect(method, "POST")
+            rollout.cancel()
+            return {"ok": True}
+        _expect(method, "GET")
+        return {"ok": True, **rollout.report()}
+
+    # ── Status polling and events ────────────────────────────────────────────
+    def _note_reachability(self, ip: str, reachable: bool, latency_ms: int | None) -> None:
+        state = self.device_state.setdefault(ip, {})
+        changed = state.get("reachable") != reachable
+        state["reachable"] = reachable
+        state["checked_at"] = time.time()
+        if latency_ms is not None:
+            state["latency_ms"] = latency_ms
+        if reachable:
+            state["last_seen"] = state["checked_at"]
+        if changed:
+            self.events.publish("status", device=ip, reachable=reachable, latency_ms=latency_ms)
+
+    async def _poll_loop(self) -> None:
+        while True:
+            devices = await asyncio.to_thread(load_saved_devices)
+            await asyncio.gather(*(self._poll_one(device) for device in devices), return_exceptions=True)
+            if self.deferred is not None:
+                await self._replay_deferred()
+            await asyncio.sleep(self.poll_interval)
+
+    async def _replay_deferred(self) -> None:
+        """Send queued SETs to devices the last poll found reachable (including ones queued by the dashboard)."""
+        counts = await asyncio.to_thread(self.deferred.counts)
+        ready = [ip for ip in counts if self.device_state.get(ip, {}).get("reachable")]
+        for rows in await asyncio.gather(*(self.deferred.replay(self.runtime, ip) for ip in ready),
+                                         return_exceptions=True):
+            if isinstance(rows, BaseException):
+                continue
+            for row in rows:
+                self.events.publish("deferred_replayed", device=row["device"], operation=row["operation"],
+                                    ok=row["ok"], error=row.get("error"), queued_at=row["queued"])
+
+    async def _poll_one(self, device: dict) -> None:
+        ip, port = device["ip"], int(device["port"])
+
+        async def _check():
+            start = time.perf_counter()
+            if not await self.runtime.probe(ip, port):
+                return None
+            return int((time.perf_counter() - start) * 1000)
+
+        latency_ms = await self.runtime.queue.submit(
+            device_key(ip, port, int(device["id"])), _check, PRIORITY_BACKGROUND, "network_check",
+        )
+        self._note_reachability(ip, latency_ms is not None, latency_ms)
+        if self.history is not None:
+            self.history.record(ip, latency_ms is not None, latency_ms=latency_ms)
+
+    async def _stream_events(self, writer: asyncio.StreamWriter, query: dict) -> None:
+        wanted = set(query.get("device", []))
+        queue = self.events.subscribe()
+        try:
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                b"Connection: close\r\n\r\n"
+            )
+            for ip, state in self.device_state.items():
+                if not wanted or ip in wanted:
+                    queue.put_nowait({"type": "status", "ts": state["checked_at"], "device": ip,
+                                      "reachable": state["reachable"], "latency_ms": state.get("latency_ms")})
+            await writer.drain()
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                else:
+                    if wanted and event.get("device") not in wanted:
+                        continue
+                    writer.write(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode())
+                await writer.drain()
+        finally:
+            self.events.unsubscribe(queue)
+
+
+def _expect(method: str, allowed: str) -> None:
+    if method != allowed:
+        raise HttpError(405, f"Use {allowed}")
+
+
+def _query_value(query: dict, name: str) -> str | None:
+    values = query.get(name)
+    return values[0] if values else None
+
+
+def _parse_json(body: bytes) -> dict:
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError as exc:
+        raise HttpError(400, f"Body is not valid JSON: {exc}") from exc
+    if not isinstance(payload, dict):
+        raise HttpError(400, "Body must be a JSON object")
+    return payload
+
+
+def _operation(body: dict) -> Operation:
+    try:
+        return Operation.from_dict(body)
+    except OperationError as exc:
+        raise HttpError(400, str(exc)) from exc
+
+
+def _priority(body: dict) -> int:
+    return PRIORITY_BACKGROUND if body.get("priority") == "background" else PRIORITY_INTERACTIVE
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    if not request_line:
+        raise asyncio.IncompleteReadError(b"", None)
+    try:
+        method, target, _ = request_line.split(" ", 2)
+    except ValueError as exc:
+        raise HttpError(400, "Malformed request line") from exc
+
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    text = headers.get("content-length") or "0"
+    if not (text.isascii() and text.isdigit()):  # also rejects negative values, which readexactly() would choke on
+        raise HttpError(400, f"Invalid Content-Length: {text!r}")
+    length = int(text)
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    return method.upper(), url.path, parse_qs(url.query), headers, body
+
+
+async def _send_json(writer: asyncio.StreamWriter, status: int, payload: dict) -> None:
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Samsung MDC / Smart TV control daemon (JSON over HTTP)")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Address to listen on (default: localhost only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="TCP port to listen on")
+    parser.add_argument("--token", default=None, help="Require 'Authorization: Bearer <token>' on every request")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_SECONDS,
+                        help="Seconds between reachability checks of saved devices (0 disables)")
+    parser.add_argument("--keepalive", type=float, default=DEFAULT_KEEPALIVE,
+                        help="Seconds an idle MDC connection is kept open (0 closes after every command)")
+    parser.add_argument("--no-history", action="store_true", help="Do not record checks in status_history.db")
+    parser.add_argument("--no-deferred", action="store_true",
+                        help="Do not replay SETs queued for offline devices (deferred_commands.db)")
+    parser.add_argument("--jobs", type=Path, default=JOBS_FILE, help="Scheduled jobs file (see scheduler.py)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    AUDIT.source = "daemon"
+    runtime = FleetRuntime(keepalive=args.keepalive)
+    history = None if args.no_history else StatusHistory()
+    jobs = load_jobs(args.jobs)
+    deferred = None if args.no_deferred else DeferredCommands()
+    daemon = ControlDaemon(runtime, args.host, args.port, args.token, args.poll, history, jobs, deferred)
+    runtime.run(daemon.start()).result()
+    print(f"Control daemon listening on http://{args.host}:{daemon.port} (Ctrl+C to stop)")
+    if jobs:
+        print(f"{len(jobs)} scheduled job(s) loaded from {args.jobs}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runtime.run(daemon.stop()).result(timeout=5)
+        if history is not None:
+            history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import base64
+import json
+import urllib.error
+import urllib.request
+from urllib.parse import quote, urlencode
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+
+
+class DaemonError(RuntimeError):
+    def __init__(self, message: str, status: int | None = None, transient: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.transient = transient
+
+
+def decode_bytes(value) -> bytes:
+    """Bytes from a daemon result (``{"base64": ...}``), e.g. a screen capture."""
+    return base64.b64decode(value["base64"])
+
+
+class DaemonClient:
+    """Thin blocking client for :mod:`control_daemon` (stdlib only)."""
+
+    def __init__(self, url: str = DEFAULT_URL, token: str | None = None, timeout: float = 120.0):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def _open(self, method: str, path: str, payload: dict | None = None, timeout: float | None = None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, method=method)
+        if data is not None:
+            request.add_header("Content-Type", "application/json")
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            return urllib.request.urlopen(request, timeout=timeout or self.timeout)
+        except urllib.error.HTTPError as exc:
+            try:
+                message = json.loads(exc.read()).get("error") or str(exc)
+            except ValueError:
+                message = str(exc)
+            raise DaemonError(message, exc.code) from exc
+        except urllib.error.URLError as exc:
+            raise DaemonError(f"Control daemon not reachable at {self.url} ({exc.reason})") from exc
+
+    def _request(self, method: str, path: str, payload: dict | None = None) -> dict:
+        with self._open(method, path, payload) as response:
+            return json.loads(response.read())
+
+    def health(self) -> dict:
+        return self._request("GET", "/health")
+
+    def stats(self) -> dict:
+        return self._request("GET", "/stats")
+
+    def devices(self) -> list[dict]:
+        return self._request("GET", "/devices")["devices"]
+
+    def run(self, ip: str, command: str, args=(), port: int | None = None, display_id: int | None = None,
+            protocol: str | None = None, background: bool = False, defer_if_offline: bool = False):
+        """Run one operation on a device and return its result; raises DaemonError when it failed.
+
+        With ``defer_if_offline`` a SET for an unreachable device is queued by
+        the daemon and sent when the device is back; the error says so.
+        """
+        payload = {"command": command, "args": list(args), "port": port, "display_id": display_id,
+                   "protocol": protocol, "defer_if_offline": defer_if_offline}
+        if background:
+            payload["priority"] = "background"
+        reply = self._request("POST", f"/devices/{quote(ip, safe='')}/operations", payload)
+        if not reply.get("ok"):
+            message = reply.get("error", "operation failed")
+            if reply.get("deferred"):
+                message += " (queued until the device is back online)"
+            raise DaemonError(message, transient=reply.get("transient", False))
+        return reply.get("result")
+
+    def run_many(self, command: str, args=(), devices: list[str] | None = None, site: str | None = None,
+                 defer_if_offline: bool = False, all_devices: bool = False) -> list[dict]:
+        """One operation over several devices (IPs), a site, or, with ``all_devices``, every saved device.
+
+        Returns one result row per device.
+        """
+        payload = {"operation": {"command": command, "args": list(args)}, "devices": devices, "site": site,
+                   "all": all_devices, "defer_if_offline": defer_if_offline}
+        return self._request("POST", "/operations", payload)["results"]
+
+    def deferred(self, ip: str | None = None) -> list[dict]:
+        """SETs queued for offline devices, oldest first."""
+        query = f"?{urlencode({'device': ip})}" if ip else ""
+        return self._request("GET", f"/deferred{query}")["pending"]
+
+    def clear_deferred(self, ip: str | None = None) -> int:
+        return self._request("POST", "/deferred/clear", {"device": ip})["discarded"]
+
+    def start_rollout(self, command: str, args=(), devices: list[str] | None = None, site: str | None = None,
+                      all_devices: bool = False, **settings) -> str:
+        """Start a wave-based rollout (see :class:`rollout.Rollout` for ``settings``); returns its id."""
+        payload = {"operation": {"command": command, "args": list(args)}, "devices": devices, "site": site,
+                   "all": all_devices, **settings}
+        return self._request("POST", "/rollouts", payload)["id"]
+
+    def rollout(self, rollout_id: str) -> dict:
+        return self._request("GET", f"/rollouts/{rollout_id}")
+
+    def cancel_rollout(self, rollout_id: str) -> None:
+        self._request("POST", f"/rollouts/{rollout_id}/cancel", {})
+
+    def events(self, devices: list[str] | None = None):
+        """Yield daemon events (dicts) as they arrive; blocks until the connection drops."""
+        query = f"?{urlencode([('device', ip) for ip in devices])}" if devices else ""
+        # The daemon sends a heartbeat every 15 s, so a long read timeout only trips on a dead daemon.
+        with self._open("GET", f"/events{query}", timeout=60) as response:
+            data = []
+            for raw in response:
+                line = raw.decode("utf-8").rstrip("\r\n")
+                if line.startswith("data:"):
+                    data.append(line[5:].strip())
+                elif not line and data:
+                    yield json.loads("\n".join(data))
+                    data = []
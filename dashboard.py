@@ -1,55 +1,68 @@
+from __future__ import annotations
+
 import asyncio
-import csv
 import json
-import socket
-import threading
+import math
 import time
 import tkinter as tk
-from io import BytesIO, StringIO
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from pathlib import Path
 from tkinter import filedialog, messagebox
+from typing import TYPE_CHECKING
 
-try:
-    from PIL import Image, ImageTk
-    _PIL_AVAILABLE = True
-except ImportError:
-    _PIL_AVAILABLE = False
+from audit_log import AUDIT, SEARCH_LIMIT, format_entry
+from stall_watchdog import StallWatchdog
+from startup_timing import STARTUP
+from status_history import StatusHistory
 
 import customtkinter as ctk
-from samsung_mdc import MDC
 
-try:
-    from samsungtvws import SamsungTVWS
-    _SMARTTVWS_AVAILABLE = True
-except ImportError:
-    SamsungTVWS = None
-    _SMARTTVWS_AVAILABLE = False
+from command_queue import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, SupersededError, device_key
+from devices import (
+    PROTOCOL_OPTIONS,
+    find_device_by_ip,
+    load_saved_devices,
+    merge_devices,
+    normalize_device,
+    parse_imported_devices,
+    resolve_protocol,
+    save_saved_devices,
+)
+from deferred_commands import DeferredCommands
+from discovery import SubnetScanner, expand_cidrs
+from fleet_report import FleetReport, format_for
+from fleet_runtime import PROBE_CANDIDATES, FleetRuntime
+from operations import Operation
+from profiling import SessionProfiler
+from screen_analysis import STATE_OK, ScreenMonitor
+from screenshot_gallery import THUMBNAIL_SIZE, ThumbnailCache, apply_retention, list_captures
+from smart_tv import SMART_TV_KEYS
+from smart_tv_macros import MacroEngine, describe, load_macros
+from resilience import READ_RETRY, SET_RETRY, UNSAFE_RETRY, RetryPolicy, is_offline, is_transient
+from timeouts import Deadline
+from token_store import TOKENS
+from ui_dispatch import UiDispatcher
+
+if TYPE_CHECKING:
+    from samsung_mdc import MDC
+
+STARTUP.mark("imports")
 
-SAVED_DEVICES_FILE = Path("saved_devices.json")
 APP_VERSION = "1.0.1"
-PROTOCOL_OPTIONS = ["AUTO", "SIGNAGE_MDC", "SMART_TV_WS"]
-SMART_TV_KEYS = [
-    "KEY_HOME",
-    "KEY_POWER",
-    "KEY_MUTE",
-    "KEY_VOLUP",
-    "KEY_VOLDOWN",
-    "KEY_SOURCE",
-    "KEY_MENU",
-    "KEY_RETURN",
-    "KEY_UP",
-    "KEY_DOWN",
-    "KEY_LEFT",
-    "KEY_RIGHT",
-    "KEY_ENTER",
-]
-
-SMART_TV_HDMI_MACROS = {
-    "HDMI1": ["KEY_SOURCE", "KEY_ENTER"],
-    "HDMI2": ["KEY_SOURCE", "KEY_RIGHT", "KEY_ENTER"],
-    "HDMI3": ["KEY_SOURCE", "KEY_RIGHT", "KEY_RIGHT", "KEY_ENTER"],
-    "HDMI4": ["KEY_SOURCE", "KEY_RIGHT", "KEY_RIGHT", "KEY_RIGHT", "KEY_ENTER"],
-}
+TAB_DASHBOARD = "📟  Dashboard"
+TAB_CLI = "⌨️  CLI Commands"
+BATCH_DEADLINE_SECONDS = 60.0
+SCREENSHOT_COMMAND_TIMEOUT = 20.0
+HUD_REFRESH_MS = 500
+SCREEN_WATCH_INTERVAL_MS = 5 * 60 * 1000
+SCREENSHOT_RETENTION_DAYS = 90
+SCREENSHOT_MAX_MB_PER_DEVICE = 500
+GALLERY_TILE = (THUMBNAIL_SIZE[0] + 16, THUMBNAIL_SIZE[1] + 44)
+SCREEN_STATE_TEXT = {"black": "BLACK SCREEN", "no_signal": "NO SIGNAL", "frozen": "FROZEN (content not changing)"}
+SPARKLINE_WIDTH = 150
+SPARKLINE_HEIGHT = 16
+HISTORY_RANGES = {"24 h": 86400, "7 days": 7 * 86400, "30 days": 30 * 86400, "1 year": 365 * 86400}
 
 POWER_MAP = {0: "OFF", 1: "ON", 2: "REBOOT"}
 MUTE_MAP = {0: "OFF", 1: "ON", 255: "UNAVAILABLE"}
@@ -83,116 +96,53 @@ UNSUPPORTED_COMMAND_HINTS = {
 }
 
 
-def normalize_device(item: dict):
-    if not isinstance(item, dict):
-        return None
+# samsung_mdc, samsungtvws (see smart_tv.py) and PIL are imported on first use: together they are
+# most of the import time, and many sessions never touch Smart TVs or screenshots.
+def mdc_commands() -> dict:
+    from samsung_mdc import MDC
 
-    ip = str(item.get("ip", "")).strip()
-    if not ip:
-        return None
+    return MDC._commands
 
-    try:
-        device_id = int(item.get("id", 0))
-    except Exception:
-        device_id = 0
 
+def _load_pil():
+    """Return ``(Image, ImageTk)``, or None when Pillow is not installed."""
     try:
-        port = int(item.get("port", 1515))
-    except Exception:
-        port = 1515
-
-    protocol = str(item.get("protocol", "AUTO")).strip().upper()
-    if protocol not in PROTOCOL_OPTIONS:
-        protocol = "AUTO"
-
-    return {
-        "ip": ip,
-        "port": port,
-        "id": device_id,
-        "protocol": protocol,
-        "site": str(item.get("site", "")).strip(),
-        "description": str(item.get("description", "")).strip(),
-    }
-
-
-def load_saved_devices() -> list[dict]:
-    if not SAVED_DEVICES_FILE.exists():
-        return []
-    try:
-        payload = json.loads(SAVED_DEVICES_FILE.read_text(encoding="utf-8"))
-        if isinstance(payload, dict):
-            payload = [payload]
-        if not isinstance(payload, list):
-            return []
-        return [d for d in (normalize_device(item) for item in payload) if d]
-    except Exception:
-        return []
-
-
-def save_saved_devices(devices: list[dict]) -> None:
-    SAVED_DEVICES_FILE.write_text(
-        json.dumps(devices, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
-
-
-def parse_imported_devices(file_name: str, raw_bytes: bytes) -> list[dict]:
-    lower_name = file_name.lower()
-
-    if lower_name.endswith(".json"):
-        payload = json.loads(raw_bytes.decode("utf-8"))
-        if isinstance(payload, dict):
-            payload = [payload]
-        if not isinstance(payload, list):
-            return []
-        return [d for d in (normalize_device(item) for item in payload) if d]
-
-    if lower_name.endswith(".csv"):
-        text = raw_bytes.decode("utf-8")
-        reader = csv.DictReader(StringIO(text))
-        parsed = []
-        for row in reader:
-            mapped = {
-                "ip": row.get("ip") or row.get("IP") or "",
-                "port": row.get("port") or row.get("PORT") or 1515,
-                "id": row.get("id") or row.get("ID") or 0,
-                "protocol": row.get("protocol") or row.get("PROTOCOL") or "AUTO",
-                "site": row.get("site") or row.get("SITE") or "",
-                "description": row.get("description") or row.get("DESCRIPTION") or "",
-            }
-            normalized = normalize_device(mapped)
-            if normalized:
-                parsed.append(normalized)
-        return parsed
-
-    return []
-
-
-def merge_devices(existing_devices: list[dict], incoming_devices: list[dict]) -> tuple[list[dict], int, int]:
-    merged = list(existing_devices)
-    index_by_ip = {device.get("ip"): idx for idx, device in enumerate(merged)}
-    added = 0
-    updated = 0
-
-    for device in incoming_devices:
-        ip = device.get("ip")
-        if ip in index_by_ip:
-            merged[index_by_ip[ip]] = device
-            updated += 1
-        else:
-            index_by_ip[ip] = len(merged)
-            merged.append(device)
-            added += 1
-
-    return merged, added, updated
-
-
-def find_device_by_ip(devices: list[dict], ip: str):
-    ip_to_find = ip.strip()
-    for device in devices:
-        if device.get("ip") == ip_to_find:
-            return device
-    return None
+        from PIL import Image, ImageTk
+    except ImportError:
+        return None
+    return Image, ImageTk
+
+
+def draw_sparkline(canvas: tk.Canvas, points, width: int, height: int) -> None:
+    """Latency line from ``(ts, reachable, latency_ms)`` points; unreachable samples as red ticks.
+
+    ``reachable`` may also be a fraction (history buckets): anything below 1 is drawn as an outage tick.
+    """
+    canvas.delete("all")
+    points = list(points)
+    if not points:
+        return
+    step = (width - 2) / max(1, len(points) - 1)
+    latencies = [latency for _, _, latency in points if latency is not None]
+    top = max(latencies) if latencies else 1.0
+    segment: list[float] = []
+    for idx, (_, reachable, latency) in enumerate(points):
+        x = 1 + idx * step
+        if reachable is not None and reachable < 1:
+            canvas.create_line(x, height, x, height * (1 - (1 - reachable) * 0.8), fill="#e74c3c")
+        if not reachable or latency is None:
+            if len(segment) >= 4:
+                canvas.create_line(*segment, fill="#2ecc71")
+            elif len(segment) == 2:
+                canvas.create_oval(segment[0] - 1, segment[1] - 1, segment[0] + 1, segment[1] + 1,
+                                   fill="#2ecc71", outline="")
+            segment = []
+            continue
+        segment += [x, height - 2 - (latency / top) * (height - 4) if top else height - 2]
+    if len(segment) >= 4:
+        canvas.create_line(*segment, fill="#2ecc71")
+    elif len(segment) == 2:
+        canvas.create_oval(segment[0] - 1, segment[1] - 1, segment[0] + 1, segment[1] + 1, fill="#2ecc71", outline="")
 
 
 def _label(code, mapping):
@@ -246,7 +196,9 @@ class SamsungDashboard(ctk.CTk):
             "bar_bg":       "#0d0d1a",
         }
 
-        self.saved_devices = load_saved_devices()
+        # Loaded in _finish_startup, after the first frame is on screen.
+        self.saved_devices: list[dict] = []
+        self._built_tabs: set[str] = set()
 
         self.selected_device_var = ctk.StringVar(value="(manual entry)")
         self.appearance_var = ctk.StringVar(value="Dark")
@@ -261,24 +213,70 @@ class SamsungDashboard(ctk.CTk):
 
         self.volume_var = ctk.IntVar(value=50)
         self.brightness_var = ctk.IntVar(value=50)
+        self.live_controls_var = ctk.BooleanVar(value=False)
+        self.target_summary_var = ctk.StringVar(value="Target: connection above")
+        self._multi_selected_ips: set[str] = set()
+        self._live_values: dict[str, int] = {}
         self.mute_var = ctk.StringVar(value="OFF")
         self.input_var = ctk.StringVar(value="HDMI1")
 
         self.status_var = ctk.StringVar(value="Status: idle")
         self.network_var = ctk.StringVar(value="Network: checking...")
-
-        self._all_cli_commands = sorted(MDC._commands.keys())
-        self.cli_command_var = ctk.StringVar(value=self._all_cli_commands[0] if self._all_cli_commands else "")
+        self.hud_var = ctk.StringVar(value="")
+        self.perf_hud_var = ctk.BooleanVar(value=False)
+        self.profile_action_var = ctk.BooleanVar(value=False)
+        self._action_profiler: SessionProfiler | None = None
+        self.session_profiler: SessionProfiler | None = None
+
+        self._all_cli_commands: list[str] = []
+        self.cli_command_var = ctk.StringVar(value="")
         self.cli_arg_var = ctk.StringVar(value="")
         self.consumer_key_var = ctk.StringVar(value=SMART_TV_KEYS[0])
         self.consumer_repeat_var = ctk.StringVar(value="1")
+        self.consumer_macro_var = ctk.StringVar(value="")
+        self._consumer_macro_menu: ctk.CTkOptionMenu | None = None
+        self._macro_engine: MacroEngine | None = None
         self.cli_log_box: ctk.CTkTextbox | None = None
         # dynamic per-field widgets rebuilt on command change
         self._cli_arg_rows: list[dict] = []   # [{"var": StringVar, "enum": list|None}, ...]
 
+        self.ui = UiDispatcher(self)
+        self.history = StatusHistory()
+        self.deferred = DeferredCommands()
+        self._deferred_counts: dict[str, int] = {}
+        self.screen_monitor = ScreenMonitor()
+        self.thumbnails = ThumbnailCache()
+        self._thumb_executor: ThreadPoolExecutor | None = None
+        self.screen_watch_var = ctk.BooleanVar(value=False)
+        self._screen_watch_job = None
+        self._screen_states: dict[str, str] = {}
+        self._screen_watch_errors: set[str] = set()
+        self._scanner: SubnetScanner | None = None
+        self._sparklines: dict[str, tk.Canvas] = {}
+        self.watchdog = StallWatchdog(self, on_stall=self._on_ui_stall)
+        self.runtime = FleetRuntime()
+
         self._build_ui()
+        STARTUP.mark("ui")
+        self._first_map_binding = self.bind("<Map>", self._on_first_map, add="+")
+
+    def _on_first_map(self, event):
+        if event.widget is not self:
+            return
+        self.unbind("<Map>", self._first_map_binding)
+        # Idle callbacks run in order, so this lands after the redraws queued by mapping the window.
+        self.after_idle(self._finish_startup)
+
+    def _finish_startup(self):
+        STARTUP.mark("first_frame")
+        self.saved_devices = load_saved_devices()
+        self._deferred_counts = self.deferred.counts()
         self._refresh_saved_devices_menu()
+        STARTUP.mark("devices")
         self._schedule_network_check()
+        self._prune_screenshots(SCREENSHOT_RETENTION_DAYS, SCREENSHOT_MAX_MB_PER_DEVICE)
+        self.log(f"Startup: {STARTUP.summary()}")
+        STARTUP.write(version=APP_VERSION, devices=len(self.saved_devices))
 
     # ── UI helpers ────────────────────────────────────────────────────────────
     def _btn(self, parent, text, command, color=None, hover=None, icon="", **kw):
@@ -342,6 +340,11 @@ class SamsungDashboard(ctk.CTk):
         self._btn(mgmt, "Delete", self.delete_selected_device, icon="🗑", color=p["danger"], hover=p["danger_hover"], height=32).grid(row=0, column=1, padx=3, pady=3, sticky="ew")
         self._btn(mgmt, "Import", self.import_devices,         icon="📥", color=p["neutral"], hover=p["neutral_hover"], height=32).grid(row=1, column=0, padx=3, pady=3, sticky="ew")
         self._btn(mgmt, "Export", self.export_devices,         icon="📤", color=p["neutral"], hover=p["neutral_hover"], height=32).grid(row=1, column=1, padx=3, pady=3, sticky="ew")
+        self._btn(mgmt, "Discover", self.discover_devices,     icon="📡", color=p["success"], hover=p["success_hover"], height=32).grid(row=2, column=0, columnspan=2, padx=3, pady=3, sticky="ew")
+        self._btn(mgmt, "Tokens in",  self.import_tokens,      icon="🔑", color=p["neutral"], hover=p["neutral_hover"], height=28).grid(row=3, column=0, padx=3, pady=3, sticky="ew")
+        self._btn(mgmt, "Tokens out", self.export_tokens,      icon="🔑", color=p["neutral"], hover=p["neutral_hover"], height=28).grid(row=3, column=1, padx=3, pady=3, sticky="ew")
+        self._btn(mgmt, "Fleet report", self.export_fleet_report, icon="📊", color=p["neutral"], hover=p["neutral_hover"], height=28).grid(row=4, column=0, padx=3, pady=3, sticky="ew")
+        self._btn(mgmt, "Audit log", self.show_audit_log,      icon="🔎", color=p["neutral"], hover=p["neutral_hover"], height=28).grid(row=4, column=1, padx=3, pady=3, sticky="ew")
 
         ctk.CTkFrame(sidebar, height=1, fg_color="#2a3a5e").grid(
             row=3, column=0, sticky="ew", padx=16, pady=4)
@@ -379,8 +382,8 @@ class SamsungDashboard(ctk.CTk):
         # ════════════════════════════════════════════════════════════════════
         # MAIN AREA – tabview
         # ════════════════════════════════════════════════════════════════════
-        tabs = ctk.CTkTabview(
-            self, corner_radius=12,
+        tabs = self.tabs = ctk.CTkTabview(
+            self, corner_radius=12, command=self._on_tab_changed,
             fg_color=p["bar_bg"],
             segmented_button_fg_color=p["card2_bg"],
             segmented_button_selected_color=p["accent"],
@@ -390,15 +393,8 @@ class SamsungDashboard(ctk.CTk):
             text_color="#e8f4fd",
         )
         tabs.grid(row=0, column=1, padx=(0, 12), pady=(12, 4), sticky="nsew")
-        tabs.add("📟  Dashboard")
-        tabs.add("⌨️  CLI Commands")
-
-        tab_dash = tabs.tab("📟  Dashboard")
-        tab_cli  = tabs.tab("⌨️  CLI Commands")
-        tab_dash.grid_columnconfigure(0, weight=1)
-        tab_dash.grid_rowconfigure(4, weight=1)
-        tab_cli.grid_columnconfigure(0, weight=1)
-        tab_cli.grid_rowconfigure(4, weight=1)
+        tabs.add(TAB_DASHBOARD)
+        tabs.add(TAB_CLI)
 
         # ── Bottom status bar ─────────────────────────────────────────────
         status_bar = ctk.CTkFrame(self, height=32, corner_radius=0, fg_color=p["card2_bg"])
@@ -410,13 +406,94 @@ class SamsungDashboard(ctk.CTk):
         ctk.CTkLabel(status_bar, textvariable=self.network_var,
                      text_color="#a0c4e0", font=ctk.CTkFont(size=11)).grid(
             row=0, column=1, padx=4, pady=4, sticky="w")
+        self.hud_label = ctk.CTkLabel(status_bar, textvariable=self.hud_var,
+                                      text_color="#d6a520", font=ctk.CTkFont(family="Consolas", size=11))
+        self.hud_label.grid(row=0, column=2, padx=(0, 14), pady=4, sticky="e")
+        self.hud_label.grid_remove()
         ctk.CTkLabel(status_bar, textvariable=self.status_var,
                      text_color="#7fb3d3", font=ctk.CTkFont(size=11)).grid(
-            row=0, column=2, padx=(0, 14), pady=4, sticky="e")
+            row=0, column=3, padx=(0, 14), pady=4, sticky="e")
+        ctk.CTkSwitch(status_bar, text="Perf", variable=self.perf_hud_var, command=self._toggle_perf_hud,
+                      width=40, switch_width=28, switch_height=14,
+                      progress_color=p["warning"], font=ctk.CTkFont(size=10)).grid(
+            row=0, column=4, padx=(0, 6), pady=4, sticky="e")
+        ctk.CTkSwitch(status_bar, text="Profile", variable=self.profile_action_var,
+                      command=self._toggle_action_profile,
+                      width=40, switch_width=28, switch_height=14,
+                      progress_color=p["danger"], font=ctk.CTkFont(size=10)).grid(
+            row=0, column=5, padx=(0, 10), pady=4, sticky="e")
+
+        self._ensure_tab_built(TAB_DASHBOARD)
+
+    # ── Performance HUD / stall watchdog ──────────────────────────────────────
+    def _toggle_perf_hud(self):
+        if self.perf_hud_var.get():
+            self.watchdog.start()
+            self.hud_label.grid()
+            self._refresh_hud()
+        else:
+            self.watchdog.stop()
+            self.hud_label.grid_remove()
 
-        # ════════════════════════════════════════════════════════════════════
-        # TAB 1 – Dashboard
-        # ════════════════════════════════════════════════════════════════════
+    def _refresh_hud(self):
+        if not self.perf_hud_var.get():
+            return
+        self.after(HUD_REFRESH_MS, self._refresh_hud)
+        ui_stats = self.watchdog.stats()
+        ui_pending = self.ui.pending()
+
+        def _show(stats):
+            self.hud_var.set(
+                f"UI {ui_stats['last_ms']:.0f}ms p95 {ui_stats['p95_ms']:.0f} max {ui_stats['max_ms']:.0f} "
+                f"stalls {ui_stats['stalls']} | ui-q {ui_pending} | tasks {stats['tasks']} "
+                f"conns {stats['connections']} | queued {stats['queued']} (max {stats['max_depth']}) "
+                f"busy {stats['busy_devices']} offline {stats['offline']}"
+            )
+
+        future = self.runtime.run(self.runtime.stats())
+        future.add_done_callback(lambda f: self._deliver_future(f, _show, lambda exc: None, "hud"))
+
+    def _toggle_action_profile(self):
+        """Profile whatever the operator does between switching Profile on and off (e.g. one fleet sweep)."""
+        if self.profile_action_var.get():
+            if self.session_profiler is not None:
+                self.log("Profiler: the whole session is already being profiled (--profile).")
+                self.profile_action_var.set(False)
+                return
+            self._action_profiler = SessionProfiler("action")
+            self._action_profiler.start(loops=[self.runtime.loop])
+            self.log("Profiler: recording; run the action, then switch Profile off.")
+            return
+
+        if self._action_profiler is None:
+            return
+        report_path = self._action_profiler.stop()
+        self._action_profiler = None
+        self.log(f"Profiler: report saved to {report_path}")
+
+    def _on_ui_stall(self, report):
+        # Runs on the watchdog's sampler thread: write the full stacks there, log the summary on Tk.
+        report.write()
+        self.ui.post(lambda: self.log(f"{report.summary()} (stacks in ui_stalls.log)"))
+
+    # ── Tabs (contents are built on first visit) ─────────────────────────────
+    def _on_tab_changed(self):
+        self._ensure_tab_built(self.tabs.get())
+
+    def _ensure_tab_built(self, name: str):
+        if name in self._built_tabs:
+            return
+        self._built_tabs.add(name)
+        tab = self.tabs.tab(name)
+        tab.grid_columnconfigure(0, weight=1)
+        tab.grid_rowconfigure(4, weight=1)
+        if name == TAB_DASHBOARD:
+            self._build_dashboard_tab(tab)
+        elif name == TAB_CLI:
+            self._build_cli_tab(tab)
+
+    def _build_dashboard_tab(self, tab_dash):
+        p = self._palette
 
         # Connection card
         conn_card = self._card(tab_dash)
@@ -464,24 +541,36 @@ class SamsungDashboard(ctk.CTk):
         qa_card = self._card(tab_dash)
         qa_card.grid(row=1, column=0, sticky="ew", padx=8, pady=5)
         self._section_label(qa_card, "  QUICK ACTIONS").grid(
-            row=0, column=0, columnspan=5, padx=14, pady=(10, 6), sticky="w")
+            row=0, column=0, columnspan=6, padx=14, pady=(10, 6), sticky="w")
         for col, (text, cmd, icon, clr, hov) in enumerate([
             ("Reboot",         self.reboot_screen,  "🔄", p["danger"],  p["danger_hover"]),
             ("Get Serial",     self.get_serial,     "🔢", p["neutral"], p["neutral_hover"]),
             ("Home (Content)", self.send_home_key,  "🏠", p["accent"],  p["accent_hover"]),
             ("Mute Toggle",    self.set_mute,       "🔇", p["warning"], p["warning_hover"]),
             ("Screenshot",     self.take_screenshot, "📸", p["success"], p["success_hover"]),
+            ("Gallery",        self.show_gallery,   "🖼", p["neutral"], p["neutral_hover"]),
         ]):
             qa_card.grid_columnconfigure(col, weight=1)
             self._btn(qa_card, text, cmd, icon=icon, color=clr, hover=hov, height=38).grid(
                 row=1, column=col, padx=8, pady=(0, 10), sticky="ew")
+        ctk.CTkSwitch(qa_card, text="Watch screens (capture selection every 5 min; alert on black / no signal / frozen)",
+                      variable=self.screen_watch_var, command=self._toggle_screen_watch,
+                      progress_color=p["success"], font=ctk.CTkFont(size=11)).grid(
+            row=2, column=0, columnspan=6, padx=14, pady=(0, 10), sticky="w")
 
         # Controls card (volume + brightness)
         ctrl_card = self._card(tab_dash)
         ctrl_card.grid(row=2, column=0, sticky="ew", padx=8, pady=5)
         self._section_label(ctrl_card, "  CONTROLS").grid(
-            row=0, column=0, columnspan=4, padx=14, pady=(10, 4), sticky="w")
+            row=0, column=0, columnspan=2, padx=14, pady=(10, 4), sticky="w")
         ctrl_card.grid_columnconfigure((0, 1, 2, 3), weight=1)
+        ctk.CTkLabel(ctrl_card, textvariable=self.target_summary_var,
+                     font=ctk.CTkFont(size=11), text_color="#7fb3d3").grid(
+            row=0, column=2, padx=4, pady=(10, 4), sticky="e")
+        ctk.CTkSwitch(ctrl_card, text="Live sliders", variable=self.live_controls_var,
+                      command=self._live_values.clear,
+                      progress_color=p["accent"], font=ctk.CTkFont(size=11)).grid(
+            row=0, column=3, padx=14, pady=(10, 4), sticky="e")
 
         self.vol_val_label = ctk.CTkLabel(ctrl_card, text="50", width=32,
                                           font=ctk.CTkFont(size=12, weight="bold"),
@@ -492,7 +581,7 @@ class SamsungDashboard(ctk.CTk):
         self.vol_val_label.grid(row=1, column=1, padx=4, pady=(0, 2), sticky="w")
         ctk.CTkSlider(ctrl_card, from_=0, to=100, variable=self.volume_var,
                       progress_color=p["accent"], button_color=p["accent_hover"],
-                      command=lambda v: self.vol_val_label.configure(text=str(int(v)))
+                      command=lambda v: self._on_level_slide("volume", v, self.vol_val_label)
                       ).grid(row=2, column=0, columnspan=2, padx=14, pady=(0, 4), sticky="ew")
         self._btn(ctrl_card, "Set Volume", self.set_volume,
                   icon="▶", height=32).grid(row=3, column=0, columnspan=2, padx=14, pady=(0, 10), sticky="ew")
@@ -506,7 +595,7 @@ class SamsungDashboard(ctk.CTk):
         self.bri_val_label.grid(row=1, column=3, padx=4, pady=(0, 2), sticky="w")
         ctk.CTkSlider(ctrl_card, from_=0, to=100, variable=self.brightness_var,
                       progress_color=p["warning"], button_color=p["warning_hover"],
-                      command=lambda v: self.bri_val_label.configure(text=str(int(v)))
+                      command=lambda v: self._on_level_slide("brightness", v, self.bri_val_label)
                       ).grid(row=2, column=2, columnspan=2, padx=14, pady=(0, 4), sticky="ew")
         self._btn(ctrl_card, "Set Brightness", self.set_brightness,
                   icon="▶", color=p["warning"], hover=p["warning_hover"],
@@ -542,10 +631,12 @@ class SamsungDashboard(ctk.CTk):
             text_color="#a0c4e0",
         )
         self.log_box.grid(row=1, column=0, sticky="nsew", padx=10, pady=(0, 10))
+        self.log("Dashboard ready.")
 
-        # ════════════════════════════════════════════════════════════════════
-        # TAB 2 – CLI Commands
-        # ════════════════════════════════════════════════════════════════════
+    def _build_cli_tab(self, tab_cli):
+        p = self._palette
+        self._all_cli_commands = sorted(mdc_commands().keys())
+        self.cli_command_var.set(self._all_cli_commands[0] if self._all_cli_commands else "")
 
         cli_top_card = self._card(tab_cli)
         cli_top_card.grid(row=0, column=0, sticky="ew", padx=8, pady=(8, 5))
@@ -612,13 +703,33 @@ class SamsungDashboard(ctk.CTk):
             self._btn(
                 hdmi_macro_row,
                 hdmi_name,
-                command=lambda n=hdmi_name: self.cli_send_consumer_hdmi_macro(n),
+                command=lambda n=hdmi_name: self.run_smart_tv_macro(n),
                 icon="🎛",
                 color=p["neutral"],
                 hover=p["neutral_hover"],
                 height=30,
             ).grid(row=0, column=idx, padx=(0 if idx == 0 else 4, 0), sticky="ew")
 
+        ctk.CTkLabel(consumer_card, text="Macro:", text_color="#a0c4e0",
+                     font=ctk.CTkFont(size=12)).grid(row=3, column=0, padx=(14, 6), pady=(0, 10), sticky="w")
+        self._consumer_macro_menu = ctk.CTkOptionMenu(
+            consumer_card,
+            variable=self.consumer_macro_var,
+            values=[""],
+            fg_color=p["bar_bg"],
+            button_color=p["accent"],
+            button_hover_color=p["accent_hover"],
+            corner_radius=8,
+        )
+        self._consumer_macro_menu.grid(row=3, column=1, padx=8, pady=(0, 10), sticky="ew")
+        self._btn(consumer_card, "↻", self._reload_smart_tv_macros,
+                  color=p["neutral"], hover=p["neutral_hover"],
+                  width=40, height=30).grid(row=3, column=2, padx=(8, 6), pady=(0, 10), sticky="w")
+        self._btn(consumer_card, "Run Macro", lambda: self.run_smart_tv_macro(self.consumer_macro_var.get()),
+                  icon="🎛", color=p["warning"], hover=p["warning_hover"],
+                  width=120, height=34).grid(row=3, column=4, padx=(0, 14), pady=(0, 10), sticky="e")
+        self._reload_smart_tv_macros()
+
         args_card = self._card(tab_cli)
         args_card.grid(row=2, column=0, sticky="ew", padx=8, pady=5)
         args_card.grid_columnconfigure(0, weight=1)
@@ -669,7 +780,6 @@ class SamsungDashboard(ctk.CTk):
         self.cli_log_box.grid(row=1, column=0, sticky="nsew", padx=10, pady=(0, 10))
 
         self._on_cli_command_picked(self.cli_command_var.get())
-        self.log("Dashboard ready.")
 
     def log(self, text: str):
         timestamp = time.strftime("%H:%M:%S")
@@ -734,7 +844,7 @@ class SamsungDashboard(ctk.CTk):
             widget.destroy()
         self._cli_arg_rows.clear()
 
-        command = MDC._commands.get(command_name)
+        command = mdc_commands().get(command_name)
         data_fields = getattr(command, "DATA", []) if command else []
 
         if not data_fields:
@@ -898,7 +1008,7 @@ class SamsungDashboard(ctk.CTk):
         if not command_name:
             return
 
-        command = MDC._commands.get(command_name)
+        command = mdc_commands().get(command_name)
         if command and not getattr(command, 'GET', False):
             self.cli_log(f"{command_name}: this command does not support GET (read).")
             return
@@ -960,15 +1070,7 @@ class SamsungDashboard(ctk.CTk):
             self.status_var.set(f"Status: CLI GET {command_name} failed")
 
         self.status_var.set(f"Status: CLI GET {command_name}...")
-
-        def _thread():
-            try:
-                result = asyncio.run(self._execute_mdc(_worker))
-                self.after(0, lambda: _on_success(result))
-            except Exception as exc:
-                self.after(0, lambda exc=exc: _on_error(exc))
-
-        threading.Thread(target=_thread, daemon=True).start()
+        self._submit_mdc(_worker, _on_success, _on_error, policy=READ_RETRY)
 
     def cli_set(self):
         if self._effective_protocol() != "SIGNAGE_MDC":
@@ -979,7 +1081,7 @@ class SamsungDashboard(ctk.CTk):
         if not command_name:
             return
 
-        command = MDC._commands.get(command_name)
+        command = mdc_commands().get(command_name)
         if command and not getattr(command, 'SET', False):
             self.cli_log(f"{command_name}: this command does not support SET (write).")
             return
@@ -1029,20 +1131,25 @@ class SamsungDashboard(ctk.CTk):
             self.cli_log(f"{command_name}({', '.join(str(a) for a in args_tuple)}) → {result}")
             self.log(f"CLI SET {command_name} OK")
 
+        try:
+            target = (*self._validate_connection_fields()[:3], "SIGNAGE_MDC")
+        except Exception:
+            target = None
+
         def _on_error(exc):
+            # Timer SETs fall back between timer_13 and timer_15 at send time, so they are not replayed later.
+            if target and command_name not in ("timer_13", "timer_15") and self._defer_if_offline(
+                    f"CLI SET {command_name}", target, Operation(command_name, args_tuple), exc):
+                self.cli_log(f"{command_name} SET queued: device offline, it will be sent when it is back online.")
+                return
             self.cli_log(f"{command_name} SET failed: {self._friendly_mdc_error(command_name, exc)}")
             self.status_var.set(f"Status: CLI SET {command_name} failed")
 
         self.status_var.set(f"Status: CLI SET {command_name}...")
-
-        def _thread():
-            try:
-                result = asyncio.run(self._execute_mdc(_worker))
-                self.after(0, lambda: _on_success(result))
-            except Exception as exc:
-                self.after(0, lambda exc=exc: _on_error(exc))
-
-        threading.Thread(target=_thread, daemon=True).start()
+        supersede_key = f"cli:{command_name}"
+        if command_name == "timer_15":
+            supersede_key += f":{args_tuple[0]}"
+        self._submit_mdc(_worker, _on_success, _on_error, supersede_key=supersede_key)
 
     def cli_send_consumer_key(self):
         if self._effective_protocol() != "SMART_TV_WS":
@@ -1065,8 +1172,8 @@ class SamsungDashboard(ctk.CTk):
         if repeat > 20:
             repeat = 20
 
-        def _smart_tv_worker(tv):
-            self._smarttv_send_keys(tv, key, times=repeat)
+        async def _smart_tv_worker(tv):
+            await tv.send_keys(key, times=repeat)
             return f"{key} x{repeat}"
 
         self._run_async_action(
@@ -1076,26 +1183,53 @@ class SamsungDashboard(ctk.CTk):
             on_success=lambda result: self.cli_log(f"Consumer CLI → {result}"),
         )
 
-    def cli_send_consumer_hdmi_macro(self, hdmi_name: str):
-        if self._effective_protocol() != "SMART_TV_WS":
-            self.cli_log("HDMI macro is Smart TV only. Set Protocol to SMART_TV_WS (or AUTO + port 8002/8001).")
+    def _reload_smart_tv_macros(self):
+        try:
+            names = list(load_macros())
+        except Exception as exc:
+            self.cli_log(f"Macros file error: {exc}")
             return
+        if self._consumer_macro_menu is not None:
+            self._consumer_macro_menu.configure(values=names)
+        if self.consumer_macro_var.get() not in names:
+            self.consumer_macro_var.set(names[0] if names else "")
 
-        sequence = SMART_TV_HDMI_MACROS.get(hdmi_name)
-        if not sequence:
-            self.cli_log(f"Unknown HDMI macro: {hdmi_name}")
+    def run_smart_tv_macro(self, name: str):
+        """Run a key macro on every selected Smart TV (or the Connection-card TV) at the same time."""
+        try:
+            steps = load_macros().get(name)
+            targets = [target for target in self._selected_targets() if target[3] == "SMART_TV_WS"]
+        except Exception as exc:
+            self.cli_log(f"Macro {name}: {exc}")
+            return
+        if steps is None:
+            self.cli_log(f"Unknown macro: {name}")
+            return
+        if not targets:
+            self.cli_log("Macros are Smart TV only. Tick Smart TV devices, or set Protocol to SMART_TV_WS "
+                         "(or AUTO + port 8002/8001).")
             return
 
-        def _smart_tv_worker(tv):
-            self._smarttv_send_sequence(tv, sequence)
-            return f"{hdmi_name} ({' -> '.join(sequence)})"
+        if self._macro_engine is None:
+            self._macro_engine = MacroEngine(self.runtime)
+        devices = [{"ip": ip, "port": port, "id": display_id} for ip, port, display_id, _ in targets]
 
-        self._run_async_action(
-            f"Smart TV {hdmi_name}",
-            mdc_worker=None,
-            smart_tv_worker=_smart_tv_worker,
-            on_success=lambda result: self.cli_log(f"Consumer HDMI macro → {result}"),
-        )
+        def _on_done(rows):
+            for row in rows:
+                if row["ok"]:
+                    self.cli_log(f"Macro {name} → {row['device']} OK in {row['elapsed_ms']} ms "
+                                 f"({row['model']}, {row.get('delay', 0):.2f} s between keys)")
+                else:
+                    self.cli_log(f"Macro {name} → {row['device']} failed: {row['error']}")
+            ok = sum(1 for row in rows if row["ok"])
+            self.status_var.set(f"Status: macro {name} OK on {ok}/{len(rows)} TV(s)")
+
+        self.cli_log(f"Macro {name} ({describe(steps)}) → {len(devices)} TV(s)")
+        self.status_var.set(f"Status: macro {name} on {len(devices)} TV(s)...")
+        future = self.runtime.run(self._macro_engine.run_many(devices, name, steps))
+        future.add_done_callback(lambda f: self._deliver_future(
+            f, _on_done, lambda exc: self.cli_log(f"Macro {name} failed: {exc}"),
+        ))
 
     def _validate_connection_fields(self) -> tuple[str, int, int, str]:
         ip = self.ip_var.get().strip()
@@ -1119,116 +1253,105 @@ class SamsungDashboard(ctk.CTk):
         return ip, port, display_id, protocol
 
     def _effective_protocol(self) -> str:
-        protocol = self.protocol_var.get().strip().upper()
-        if protocol not in PROTOCOL_OPTIONS:
-            protocol = "AUTO"
-
-        if protocol != "AUTO":
-            return protocol
-
         try:
             port = int(self.port_var.get().strip())
         except Exception:
             port = 1515
 
-        return "SIGNAGE_MDC" if port == 1515 else "SMART_TV_WS"
+        return resolve_protocol(self.protocol_var.get(), port)
+
+    def _selected_targets(self) -> list[tuple[str, int, int, str]]:
+        """(ip, port, display_id, protocol) for every ticked saved device, or the Connection card."""
+        if self._multi_selected_ips:
+            return [
+                (device["ip"], int(device["port"]), int(device["id"]),
+                 resolve_protocol(device["protocol"], device["port"]))
+                for device in self.saved_devices
+                if device["ip"] in self._multi_selected_ips
+            ]
 
-    async def _execute_mdc(self, worker):
         ip, port, display_id, _ = self._validate_connection_fields()
-        target = f"{ip}:{port}"
-        async with MDC(target) as mdc:
-            return await worker(mdc, display_id)
+        return [(ip, port, display_id, self._effective_protocol())]
+
+    async def _execute_mdc(self, worker, ip: str, port: int, display_id: int, policy: RetryPolicy = UNSAFE_RETRY,
+                           timeout_overrides: dict | None = None, deadline: Deadline | None = None):
+        return await self.runtime.call_mdc(ip, port, display_id, worker, policy, timeout_overrides, deadline)
 
-    def _execute_smart_tv_ws(self, worker):
-        if not _SMARTTVWS_AVAILABLE:
-            raise RuntimeError("samsungtvws is not installed. Run: pip install samsungtvws")
+    def _run_async_action(self, action_name: str, mdc_worker=None, smart_tv_worker=None, on_success=None,
+                          supersede_key: str | None = None, policy: RetryPolicy = UNSAFE_RETRY,
+                          timeout_overrides: dict | None = None, on_error=None, deferrable: Operation | None = None):
+        """Run one action on the Connection-card device.
 
-        ip, port, _, _ = self._validate_connection_fields()
-        token_dir = Path.home() / "Documents" / "SamsungMDC" / "tokens"
-        token_dir.mkdir(parents=True, exist_ok=True)
-        token_file = token_dir / f"tv_token_{ip.replace('.', '_')}.txt"
+        ``deferrable`` is the action as an :class:`Operation`; when the device
+        turns out to be offline it is queued and replayed once the device is back.
+        """
+        self.status_var.set(f"Status: {action_name}...")
 
-        tv = SamsungTVWS(ip, port=port, token_file=str(token_file), name="SamsungPy Hybrid")
         try:
-            return worker(tv)
+            ip, port, display_id, _ = self._validate_connection_fields()
+            protocol = self._effective_protocol()
+            if protocol == "SIGNAGE_MDC":
+                if not mdc_worker:
+                    raise RuntimeError(f"{action_name} is not available for MDC in this screen.")
+                factory = lambda: self._execute_mdc(mdc_worker, ip, port, display_id, policy, timeout_overrides)
+            else:
+                if not smart_tv_worker:
+                    raise RuntimeError(f"{action_name} is not available for Smart TV WebSocket.")
+                factory = lambda: self.runtime.call_smart_tv(ip, port, smart_tv_worker, policy, timeout_overrides)
         except Exception as exc:
-            raise RuntimeError(self._format_smart_tv_error(exc, ip, port)) from exc
-
-    @staticmethod
-    def _format_smart_tv_error(exc: Exception, ip: str, port: int) -> str:
-        text = str(exc)
-        kind = exc.__class__.__name__
-
-        if kind == "UnauthorizedError" or "ms.channel.unauthorized" in text:
-            return (
-                f"Smart TV authorization required on {ip}:{port}. "
-                "Look at the TV and allow the remote request for SamsungPy Hybrid, then retry."
-            )
-
-        if kind in ("ConnectionFailure", "TimeoutError"):
-            return (
-                f"Smart TV connection failed on {ip}:{port}. "
-                "Ensure TV is ON, same network, and use Auto Probe (ports 8002/8001)."
-            )
-
-        return f"Smart TV command failed on {ip}:{port}: {text or kind}"
-
-    @staticmethod
-    def _smarttv_send_key(tv, key: str) -> None:
-        SamsungDashboard._smarttv_send_keys(tv, key, times=1)
+            self._action_error(action_name, exc)
+            return
 
-    @staticmethod
-    def _smarttv_send_keys(tv, key: str, times: int = 1) -> None:
-        if not hasattr(tv, "send_key"):
-            raise RuntimeError("Connected Smart TV client does not expose send_key().")
+        def _on_error(exc):
+            target = (ip, port, display_id, protocol)
+            if deferrable is None or not self._defer_if_offline(action_name, target, deferrable, exc):
+                self._action_error(action_name, exc)
+            if on_error:
+                on_error(exc)
+
+        self._submit_device_job(
+            device_key(ip, port, display_id),
+            factory,
+            lambda result: self._action_success(action_name, result, on_success),
+            _on_error,
+            supersede_key=supersede_key,
+        )
 
+    def _submit_mdc(self, worker, on_success, on_error, priority: int = PRIORITY_INTERACTIVE,
+                    supersede_key: str | None = None, policy: RetryPolicy = UNSAFE_RETRY):
         try:
-            tv.open()
-            for _ in range(max(1, int(times))):
-                tv.send_key(key)
-        finally:
-            try:
-                tv.close()
-            except Exception:
-                pass
-
-    @staticmethod
-    def _smarttv_send_sequence(tv, keys: list[str], key_press_delay: float = 0.6) -> None:
-        if not hasattr(tv, "send_key"):
-            raise RuntimeError("Connected Smart TV client does not expose send_key().")
+            ip, port, display_id, _ = self._validate_connection_fields()
+        except Exception as exc:
+            on_error(exc)
+            return
 
-        try:
-            tv.open()
-            for key in keys:
-                try:
-                    tv.send_key(key, key_press_delay=key_press_delay)
-                except TypeError:
-                    tv.send_key(key)
-        finally:
-            try:
-                tv.close()
-            except Exception:
-                pass
+        self._submit_device_job(
+            device_key(ip, port, display_id),
+            lambda: self._execute_mdc(worker, ip, port, display_id, policy),
+            on_success,
+            on_error,
+            priority=priority,
+            supersede_key=supersede_key,
+        )
 
-    def _run_async_action(self, action_name: str, mdc_worker=None, smart_tv_worker=None, on_success=None):
-        self.status_var.set(f"Status: {action_name}...")
+    def _submit_device_job(self, key: str, factory, on_success, on_error, priority: int = PRIORITY_INTERACTIVE,
+                           supersede_key: str | None = None, ui_key=None):
+        """Queue ``factory`` on the device's command queue and report back on the Tk thread.
 
-        def _thread_target():
-            try:
-                protocol = self._effective_protocol()
-                if protocol == "SIGNAGE_MDC":
-                    if not mdc_worker:
-                        raise RuntimeError(f"{action_name} is not available for MDC in this screen.")
-                    result = asyncio.run(self._execute_mdc(mdc_worker))
-                else:
-                    if not smart_tv_worker:
-                        raise RuntimeError(f"{action_name} is not available for Smart TV WebSocket.")
-                    result = self._execute_smart_tv_ws(smart_tv_worker)
-                self.after(0, lambda: self._action_success(action_name, result, on_success))
-            except Exception as exc:
-                self.after(0, lambda exc=exc: self._action_error(action_name, exc))
+        Results posted with the same ``ui_key`` coalesce when several arrive within one frame.
+        """
+        future = self.runtime.submit(key, factory, priority, supersede_key)
+        future.add_done_callback(lambda f: self._deliver_future(f, on_success, on_error, ui_key))
 
-        threading.Thread(target=_thread_target, daemon=True).start()
+    def _deliver_future(self, future, on_success, on_error, ui_key=None):
+        try:
+            result = future.result()
+        except SupersededError:
+            return
+        except Exception as exc:
+            self.ui.post(lambda exc=exc: on_error(exc), ui_key)
+            return
+        self.ui.post(lambda: on_success(result), ui_key)
 
     def _action_success(self, action_name: str, result, on_success=None):
         self.status_var.set(f"Status: {action_name} OK")
@@ -1241,6 +1364,58 @@ class SamsungDashboard(ctk.CTk):
         self.status_var.set(f"Status: {action_name} failed")
         self.log(f"{action_name} failed: {exc}")
 
+    # ── Deferred commands (SETs waiting for offline devices) ─────────────────
+    def _defer_if_offline(self, action_name: str, target: tuple, operation: Operation, exc: Exception) -> bool:
+        """Queue a SET that failed because its device is offline; False when it was not queued."""
+        ip, port, display_id, protocol = target
+        if not is_offline(exc):
+            return False
+        if not self.deferred.add({"ip": ip, "port": port, "id": display_id, "protocol": protocol}, operation):
+            return False
+        self.status_var.set(f"Status: {action_name} queued (device offline)")
+        self.log(f"{action_name} on {ip}: device offline, queued until it is back online")
+        self._refresh_deferred_counts()
+        return True
+
+    def _refresh_deferred_counts(self):
+        counts = self.deferred.counts()
+        if counts != self._deferred_counts:
+            self._deferred_counts = counts
+            self._rebuild_devices_list()
+
+    def _replay_deferred(self):
+        """Try each device with queued SETs; the replay only sends once the device answers a probe."""
+        for ip in self._deferred_counts:
+            future = self.runtime.run(self.deferred.replay(self.runtime, ip))
+            future.add_done_callback(lambda f, ip=ip: self._deliver_future(
+                f, self._on_deferred_replayed,
+                lambda exc, ip=ip: self.log(f"Replaying queued commands on {ip} failed: {exc}"),
+            ))
+
+    def _on_deferred_replayed(self, rows: list[dict]):
+        if not rows:
+            return
+        for row in rows:
+            operation = row["operation"]
+            what = f"{operation['command']} {', '.join(str(arg) for arg in operation['args'])}"
+            if row["ok"]:
+                self.log(f"Queued {what} sent to {row['device']}")
+            else:
+                self.log(f"Queued {what} on {row['device']} failed: {row['error']}")
+        self._refresh_deferred_counts()
+
+    def _discard_deferred(self, ip: str):
+        entries = self.deferred.pending(ip)
+        summary = "\n".join(f"• {entry['command']} {', '.join(str(arg) for arg in entry['args'])}"
+                            for entry in entries)
+        if entries and messagebox.askyesno(
+            "Queued commands",
+            f"{len(entries)} command(s) are waiting for {ip} to come back online:\n\n{summary}\n\nDiscard them?",
+        ):
+            self.deferred.discard(ip)
+            self.log(f"Discarded {len(entries)} queued command(s) for {ip}")
+        self._refresh_deferred_counts()
+
     def _refresh_saved_devices_menu(self):
         values = ["(manual entry)"] + [device["ip"] for device in self.saved_devices]
         if self.selected_device_var.get() not in values:
@@ -1250,6 +1425,8 @@ class SamsungDashboard(ctk.CTk):
 
     def _rebuild_devices_list(self):
         """Repopulate the scrollable sidebar device list, honoring the search filter."""
+        self._update_target_summary()
+        self._sparklines.clear()
         for widget in self.devices_scroll.winfo_children():
             widget.destroy()
 
@@ -1315,6 +1492,20 @@ class SamsungDashboard(ctk.CTk):
 
             top_row = ctk.CTkFrame(info, fg_color="transparent")
             top_row.pack(fill="x", anchor="w")
+
+            def _make_multi_toggle(captured_ip=ip):
+                def _toggle():
+                    if captured_ip in self._multi_selected_ips:
+                        self._multi_selected_ips.discard(captured_ip)
+                    else:
+                        self._multi_selected_ips.add(captured_ip)
+                    self._update_target_summary()
+                return _toggle
+
+            ctk.CTkCheckBox(top_row, text="", width=20,
+                            checkbox_width=16, checkbox_height=16,
+                            variable=ctk.BooleanVar(value=ip in self._multi_selected_ips),
+                            command=_make_multi_toggle()).pack(side="left", padx=(0, 4))
             ctk.CTkLabel(top_row, text=site,
                          font=ctk.CTkFont(size=12, weight="bold"),
                          text_color="#e8f4fd").pack(side="left", anchor="w")
@@ -1340,9 +1531,28 @@ class SamsungDashboard(ctk.CTk):
                           font=ctk.CTkFont(size=10, weight="bold"),
                           command=_make_protocol_pick()).pack(side="right", padx=(8, 0))
 
+            queued = self._deferred_counts.get(ip)
+            if queued:
+                ctk.CTkButton(top_row, text=f"⏳ {queued}",
+                              fg_color=p["warning"],
+                              hover_color=p["warning"],
+                              corner_radius=6,
+                              width=36,
+                              height=20,
+                              text_color="#ffffff",
+                              font=ctk.CTkFont(size=10, weight="bold"),
+                              command=lambda captured_ip=ip: self._discard_deferred(captured_ip),
+                              ).pack(side="right", padx=(4, 0))
+
             ctk.CTkLabel(info, text=f"{ip}:{port}  ·  ID {did}  ·  {protocol}" + (f"  ·  {desc}" if desc else ""),
                          font=ctk.CTkFont(size=10), text_color="#7fb3d3").pack(anchor="w")
 
+            sparkline = tk.Canvas(info, width=SPARKLINE_WIDTH, height=SPARKLINE_HEIGHT,
+                                  bg=card_color, highlightthickness=0)
+            sparkline.pack(anchor="w", pady=(2, 0))
+            draw_sparkline(sparkline, self.history.recent(ip), SPARKLINE_WIDTH, SPARKLINE_HEIGHT)
+            self._sparklines[ip] = sparkline
+
             btns = ctk.CTkFrame(card, fg_color="transparent")
             btns.grid(row=1, column=0, padx=8, pady=(2, 8), sticky="ew")
             btns.grid_columnconfigure((0, 1), weight=1)
@@ -1374,9 +1584,133 @@ class SamsungDashboard(ctk.CTk):
                 font=ctk.CTkFont(size=11, weight="bold"),
                 command=_make_connect(),
             ).grid(row=0, column=1, sticky="ew")
+            ctk.CTkButton(
+                btns, text="📈", width=30, height=26, corner_radius=6,
+                fg_color=p["neutral"], hover_color=p["neutral_hover"],
+                font=ctk.CTkFont(size=11),
+                command=lambda captured_ip=ip: self.show_device_history(captured_ip),
+            ).grid(row=0, column=2, padx=(4, 0))
 
         self.devices_scroll.grid_columnconfigure(0, weight=1)
 
+    # ── Status history ───────────────────────────────────────────────────────
+    def _record_sample(self, ip: str, reachable: bool, **fields):
+        if not ip:
+            return
+        self.history.record(ip, reachable, **fields)
+        sparkline = self._sparklines.get(ip)
+        if sparkline is not None and sparkline.winfo_exists():
+            draw_sparkline(sparkline, self.history.recent(ip), SPARKLINE_WIDTH, SPARKLINE_HEIGHT)
+
+    def show_device_history(self, ip: str):
+        """Per-device history window: uptime/latency chart plus power and reachability changes."""
+        p = self._palette
+        device = find_device_by_ip(self.saved_devices, ip) or {}
+        popup = ctk.CTkToplevel(self)
+        popup.title(f"History – {device.get('site') or ip} ({ip})")
+        popup.geometry("720x520")
+        popup.grid_columnconfigure(0, weight=1)
+        popup.grid_rowconfigure(3, weight=1)
+
+        range_var = ctk.StringVar(value="24 h")
+        summary_var = ctk.StringVar(value="")
+        chart_width, chart_height = 680, 120
+
+        ctk.CTkSegmentedButton(popup, values=list(HISTORY_RANGES), variable=range_var,
+                               command=lambda _: _refresh()).grid(row=0, column=0, padx=12, pady=(12, 4), sticky="w")
+        ctk.CTkLabel(popup, textvariable=summary_var, text_color="#a0c4e0",
+                     font=ctk.CTkFont(size=12), justify="left").grid(row=1, column=0, padx=14, pady=4, sticky="w")
+        chart = tk.Canvas(popup, width=chart_width, height=chart_height, bg=p["bar_bg"], highlightthickness=0)
+        chart.grid(row=2, column=0, padx=12, pady=4)
+        events_box = ctk.CTkTextbox(popup, wrap="none", corner_radius=8, fg_color=p["bar_bg"],
+                                    font=ctk.CTkFont(family="Consolas", size=12), text_color="#a0c4e0")
+        events_box.grid(row=3, column=0, sticky="nsew", padx=12, pady=(4, 12))
+
+        def _when(ts):
+            return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) if ts else "never"
+
+        def _refresh():
+            since = time.time() - HISTORY_RANGES[range_var.get()]
+            summary = self.history.summary(ip, since)
+            uptime = f"{summary['uptime_pct']:.1f}%" if summary["uptime_pct"] is not None else "n/a"
+            latency = f"{summary['latency_avg_ms']:.0f} ms" if summary["latency_avg_ms"] is not None else "n/a"
+            summary_var.set(
+                f"Samples: {summary['samples']}   Reachable: {uptime}   Avg latency: {latency}   "
+                f"Last seen: {_when(summary['last_seen'])}\n"
+                f"Last power state: {summary['power'] or 'unknown'} (at {_when(summary['power_at'])})"
+            )
+            draw_sparkline(chart, self.history.series(ip, since, points=chart_width // 4), chart_width, chart_height)
+
+            events_box.delete("1.0", "end")
+            changes = self.history.changes(ip, since)
+            if not changes:
+                events_box.insert("end", "No power or reachability changes in this range.\n")
+            for ts, field, before, after in changes:
+                if field == "reachable":
+                    text = "came back ONLINE" if after else "went OFFLINE"
+                else:
+                    text = f"power {before} -> {after}"
+                events_box.insert("end", f"{_when(ts)}  {text}\n")
+
+        _refresh()
+
+    def show_audit_log(self):
+        """Search every command sent to a device, by device, command and time range, newest first."""
+        p = self._palette
+        popup = ctk.CTkToplevel(self)
+        popup.title("Audit log")
+        popup.geometry("980x560")
+        popup.grid_columnconfigure(0, weight=1)
+        popup.grid_rowconfigure(2, weight=1)
+
+        device_var = ctk.StringVar(value=self.ip_var.get().strip())
+        command_var = ctk.StringVar(value="")
+        range_var = ctk.StringVar(value="7 days")
+        failed_var = ctk.BooleanVar(value=False)
+        count_var = ctk.StringVar(value="")
+
+        top = ctk.CTkFrame(popup, fg_color="transparent")
+        top.grid(row=0, column=0, padx=12, pady=(12, 4), sticky="ew")
+        ctk.CTkLabel(top, text="Device IP:", text_color="#a0c4e0").grid(row=0, column=0, padx=(0, 4))
+        device_entry = ctk.CTkEntry(top, textvariable=device_var, width=130, placeholder_text="all devices")
+        device_entry.grid(row=0, column=1)
+        ctk.CTkLabel(top, text="Command:", text_color="#a0c4e0").grid(row=0, column=2, padx=(10, 4))
+        ctk.CTkComboBox(top, variable=command_var, values=[""] + AUDIT.commands(), width=170,
+                        command=lambda _: _search()).grid(row=0, column=3)
+        ctk.CTkSegmentedButton(top, values=list(HISTORY_RANGES), variable=range_var,
+                               command=lambda _: _search()).grid(row=0, column=4, padx=(10, 0))
+        ctk.CTkCheckBox(top, text="Failed only", variable=failed_var, command=lambda: _search(),
+                        width=20).grid(row=0, column=5, padx=(10, 0))
+        self._btn(top, "Search", lambda: _search(), icon="🔎", width=90, height=30).grid(row=0, column=6, padx=(10, 0))
+        device_entry.bind("<Return>", lambda _: _search())
+
+        ctk.CTkLabel(popup, textvariable=count_var, text_color="#a0c4e0",
+                     font=ctk.CTkFont(size=12)).grid(row=1, column=0, padx=14, pady=2, sticky="w")
+        results_box = ctk.CTkTextbox(popup, wrap="none", corner_radius=8, fg_color=p["bar_bg"],
+                                     font=ctk.CTkFont(family="Consolas", size=12), text_color="#a0c4e0")
+        results_box.grid(row=2, column=0, sticky="nsew", padx=12, pady=(4, 12))
+
+        def _search():
+            since = time.time() - HISTORY_RANGES[range_var.get()]
+            command = command_var.get().strip() or None
+            entries = AUDIT.search(device_var.get().strip() or None, command, since, failed_only=failed_var.get())
+            results_box.delete("1.0", "end")
+            results_box.insert("end", "".join(format_entry(entry) + "\n" for entry in entries)
+                               or "No commands match.\n")
+            shown = f"newest {len(entries)}" if len(entries) >= SEARCH_LIMIT else str(len(entries))
+            count_var.set(f"{shown} command(s), newest first  ·  journal: {AUDIT.journal.parent}")
+
+        _search()
+
+    def _update_target_summary(self):
+        saved_ips = {device["ip"] for device in self.saved_devices}
+        self._multi_selected_ips &= saved_ips
+        count = len(self._multi_selected_ips)
+        if count:
+            self.target_summary_var.set(f"Target: {count} selected device{'s' if count != 1 else ''}")
+        else:
+            self.target_summary_var.set("Target: connection above")
+
     def _on_selected_device(self, selected_ip: str):
         if selected_ip == "(manual entry)":
             return
@@ -1471,34 +1805,199 @@ class SamsungDashboard(ctk.CTk):
         Path(file_path).write_text(json.dumps(self.saved_devices, ensure_ascii=False, indent=2), encoding="utf-8")
         self.log(f"Exported {len(self.saved_devices)} devices")
 
+    def export_fleet_report(self):
+        """Stream live data for the ticked devices (or all saved devices) to CSV or JSON Lines."""
+        devices = [device for device in self.saved_devices if device["ip"] in self._multi_selected_ips]
+        devices = devices or list(self.saved_devices)
+        if not devices:
+            messagebox.showinfo("Fleet report", "No devices to report on.")
+            return
+
+        file_path = filedialog.asksaveasfilename(
+            title="Fleet report",
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("JSON Lines", "*.jsonl")],
+        )
+        if not file_path:
+            return
+
+        path = Path(file_path)
+        report = FleetReport(self.runtime)
+        start = time.perf_counter()
+        self.log(f"Fleet report: reading {len(devices)} device(s) into {path} ...")
+        future = self.runtime.run(report.export(devices, path, format_for(path)))
+        future.add_done_callback(lambda f: self._deliver_future(
+            f,
+            lambda count: self.log(f"Fleet report: {count} device(s) written to {path} "
+                                   f"in {time.perf_counter() - start:.1f}s"),
+            lambda exc: self.log(f"Fleet report failed: {exc}"),
+        ))
+
+    def import_tokens(self):
+        """Merge Smart TV pairing tokens exported on another laptop, so its TVs need no new approval."""
+        file_path = filedialog.askopenfilename(
+            title="Import Smart TV tokens",
+            filetypes=[("JSON files", "*.json"), ("All files", "*.*")],
+        )
+        if not file_path:
+            return
+
+        try:
+            count = TOKENS.import_file(Path(file_path))
+        except Exception as exc:
+            messagebox.showerror("Import failed", str(exc))
+            return
+        self.log(f"Imported {count} Smart TV token(s) (tokens already on this laptop were kept)")
+
+    def export_tokens(self):
+        if not TOKENS.all():
+            messagebox.showinfo("Export", "No Smart TV tokens to export yet.")
+            return
+
+        file_path = filedialog.asksaveasfilename(
+            title="Export Smart TV tokens",
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json")],
+        )
+        if not file_path:
+            return
+
+        count = TOKENS.export(Path(file_path))
+        self.log(f"Exported {count} Smart TV token(s). Keep the file private: a token lets anyone control that TV.")
+
+    def discover_devices(self):
+        if self._scanner is not None:
+            if messagebox.askyesno("Discover devices", "A scan is running. Stop it and keep the devices found so far?"):
+                self._scanner.cancelled = True
+                self.log("Discovery: stopping the scan...")
+            return
+
+        cidr_text = ctk.CTkInputDialog(
+            title="Discover devices",
+            text="CIDR range(s) to scan, comma-separated\n(e.g. 10.20.0.0/22, 10.20.8.0/24)",
+        ).get_input()
+        if not cidr_text or not cidr_text.strip():
+            return
+
+        try:
+            hosts = expand_cidrs(cidr_text.replace(" ", ",").split(","))
+        except ValueError as exc:
+            messagebox.showerror("Discover devices", str(exc))
+            return
+        if not hosts:
+            return
+
+        site = ctk.CTkInputDialog(
+            title="Discover devices",
+            text="Site name for newly found devices (optional):",
+        ).get_input() or ""
+
+        self.status_var.set("Status: Discovery...")
+        self.log(f"Discovery: scanning {len(hosts)} hosts on ports 1515/8002/8001...")
+
+        def _progress(scanned, total, hits):
+            self.ui.post(
+                lambda: self.status_var.set(f"Status: Discovery {scanned}/{total} hosts, {hits} found"),
+                "discovery_progress",
+            )
+
+        def _on_error(exc):
+            self._scanner = None
+            self._action_error("Discovery", exc)
+
+        # Clicking Discover again while this runs offers to stop it.
+        scanner = self._scanner = SubnetScanner(self.runtime)
+        future = self.runtime.run(scanner.scan(hosts, _progress))
+        future.add_done_callback(lambda f: self._deliver_future(
+            f,
+            lambda found: self._apply_discovered(found, site.strip()),
+            _on_error,
+        ))
+
+    def _apply_discovered(self, found: list[dict], site: str):
+        """Merge scan hits into saved devices, keeping site/description of already saved ones."""
+        cancelled = self._scanner is not None and self._scanner.cancelled
+        self._scanner = None
+        incoming = []
+        for hit in found:
+            existing = find_device_by_ip(self.saved_devices, hit["ip"])
+            candidate = dict(existing) if existing else {"id": hit["id"], "site": site}
+            if not candidate.get("description"):
+                candidate["description"] = hit.get("description", "")
+            candidate.update(ip=hit["ip"], port=hit["port"], protocol=hit["protocol"])
+            normalized = normalize_device(candidate)
+            if normalized:
+                incoming.append(normalized)
+            if hit.get("enrich_error"):
+                self.log(f"Discovery: {hit['ip']} found but details unavailable: {hit['enrich_error']}")
+
+        self.status_var.set("Status: Discovery stopped" if cancelled else "Status: Discovery OK")
+        if cancelled:
+            self.log("Discovery stopped: keeping the devices found before the scan was stopped")
+        if not incoming:
+            self.log("Discovery: no MDC or Smart TV devices found")
+            return
+
+        self.saved_devices, added_count, updated_count = merge_devices(self.saved_devices, incoming)
+        save_saved_devices(self.saved_devices)
+        self._refresh_saved_devices_menu()
+        mdc_count = sum(1 for device in incoming if device["protocol"] == "SIGNAGE_MDC")
+        self.log(
+            f"Discovery complete: {len(incoming)} found ({mdc_count} MDC, {len(incoming) - mdc_count} Smart TV), "
+            f"{added_count} added, {updated_count} updated"
+        )
+
     def _schedule_network_check(self):
-        def _check():
-            ip = self.ip_var.get().strip()
-            if not ip:
-                self.after(0, lambda: self.network_var.set("Network: no IP"))
-                self.after(0, lambda: self.net_dot.configure(text_color="#e74c3c"))
+        self.after(10000, self._schedule_network_check)
+        self._replay_deferred()
+
+        def _apply(elapsed):
+            if elapsed is None:
+                self.network_var.set("Network: OFFLINE")
+                self.net_dot.configure(text_color="#e74c3c")
             else:
-                try:
-                    port = int(self.port_var.get().strip())
-                    start = time.perf_counter()
-                    with socket.create_connection((ip, port), timeout=1.5):
-                        elapsed = int((time.perf_counter() - start) * 1000)
-                        self.after(0, lambda: self.network_var.set(f"Network: ONLINE ({elapsed} ms)"))
-                        self.after(0, lambda: self.net_dot.configure(text_color="#2ecc71"))
-                except Exception:
-                    self.after(0, lambda: self.network_var.set("Network: OFFLINE"))
-                    self.after(0, lambda: self.net_dot.configure(text_color="#e74c3c"))
-            self.after(10000, self._schedule_network_check)
-
-        threading.Thread(target=_check, daemon=True).start()
+                self.network_var.set(f"Network: ONLINE ({elapsed} ms)")
+                self.net_dot.configure(text_color="#2ecc71")
+
+        ip = self.ip_var.get().strip()
+        if not ip:
+            self.network_var.set("Network: no IP")
+            self.net_dot.configure(text_color="#e74c3c")
+            return
 
-    @staticmethod
-    def _probe_port(ip: str, port: int, timeout: float = 1.0) -> bool:
         try:
-            with socket.create_connection((ip, port), timeout=timeout):
-                return True
+            port = int(self.port_var.get().strip())
         except Exception:
-            return False
+            _apply(None)
+            return
+
+        async def _check():
+            start = time.perf_counter()
+            if not await self.runtime.probe(ip, port):
+                return None
+            return int((time.perf_counter() - start) * 1000)
+
+        def _on_result(elapsed):
+            self._record_sample(ip, elapsed is not None, latency_ms=elapsed)
+            _apply(elapsed)
+
+        # Background priority: an operator action on the same panel always goes first,
+        # and a check still waiting behind one is replaced by the next tick.
+        self._submit_device_job(
+            device_key(ip, port, self._display_id_or_default()),
+            _check,
+            _on_result,
+            lambda exc: _on_result(None),
+            priority=PRIORITY_BACKGROUND,
+            supersede_key="network_check",
+            ui_key="network_check",
+        )
+
+    def _display_id_or_default(self) -> int:
+        try:
+            return int(self.id_var.get().strip())
+        except Exception:
+            return 0
 
     def _persist_detected_profile(self, ip: str, port: int, protocol: str) -> None:
         existing = find_device_by_ip(self.saved_devices, ip)
@@ -1528,61 +2027,60 @@ class SamsungDashboard(ctk.CTk):
             return
 
         self.status_var.set("Status: Auto Probe...")
+        display_id = self._display_id_or_default()
 
-        def _thread_target():
-            candidates = [
-                (1515, "SIGNAGE_MDC"),
-                (8002, "SMART_TV_WS"),
-                (8001, "SMART_TV_WS"),
-            ]
-
-            found_port = None
-            found_protocol = None
-
-            for port, protocol in candidates:
-                if self._probe_port(ip, port, timeout=1.2):
-                    found_port = port
-                    found_protocol = protocol
-                    break
-
-            def _apply_result():
-                if found_port is None or found_protocol is None:
-                    self.status_var.set("Status: Auto Probe failed")
-                    self.network_var.set("Network: OFFLINE")
-                    self.net_dot.configure(text_color="#e74c3c")
-                    self.log("Auto probe: no supported control ports reachable (1515/8002/8001)")
-                    return
-
-                self.port_var.set(str(found_port))
-                self.protocol_var.set(found_protocol)
-                self._persist_detected_profile(ip, found_port, found_protocol)
-                self.status_var.set("Status: Auto Probe OK")
-                self.network_var.set(f"Network: ONLINE (port {found_port})")
-                self.net_dot.configure(text_color="#2ecc71")
-                self.log(f"Auto probe: selected {found_protocol} on {ip}:{found_port}")
-                if callable(on_done):
-                    on_done()
+        async def _probe():
+            candidates = PROBE_CANDIDATES
 
-            self.after(0, _apply_result)
+            # Probe every candidate at once (an offline host costs one adaptive timeout,
+            # not three) and keep the first reachable one in preference order.
+            results = await asyncio.gather(*(
+                self.runtime.queue.submit(
+                    device_key(ip, port, display_id),
+                    lambda port=port: self.runtime.probe(ip, port, fail_fast=False),
+                )
+                for port, _ in candidates
+            ))
+            for (port, protocol), reachable in zip(candidates, results):
+                if reachable:
+                    return port, protocol
+            return None, None
+
+        def _apply_result(found):
+            found_port, found_protocol = found
+            if found_port is None or found_protocol is None:
+                self.status_var.set("Status: Auto Probe failed")
+                self.network_var.set("Network: OFFLINE")
+                self.net_dot.configure(text_color="#e74c3c")
+                self.log("Auto probe: no supported control ports reachable (1515/8002/8001)")
+                return
 
-        threading.Thread(target=_thread_target, daemon=True).start()
+            self.port_var.set(str(found_port))
+            self.protocol_var.set(found_protocol)
+            self._persist_detected_profile(ip, found_port, found_protocol)
+            self.status_var.set("Status: Auto Probe OK")
+            self.network_var.set(f"Network: ONLINE (port {found_port})")
+            self.net_dot.configure(text_color="#2ecc71")
+            self.log(f"Auto probe: selected {found_protocol} on {ip}:{found_port}")
+            if callable(on_done):
+                on_done()
+
+        future = self.runtime.run(_probe())
+        future.add_done_callback(
+            lambda f: self._deliver_future(f, _apply_result, lambda exc: self._action_error("Auto Probe", exc))
+        )
 
     def get_status(self):
         async def _mdc_worker(mdc: MDC, display_id: int):
             return await mdc.status(display_id)
 
-        def _smart_tv_worker(tv):
-            info = {}
-            if hasattr(tv, "rest_device_info"):
-                try:
-                    info = tv.rest_device_info()
-                except Exception:
-                    info = {}
-            return info
+        ip = self.ip_var.get().strip()
 
         def _on_success(result):
             if isinstance(result, tuple):
                 decoded = decode_status(result)
+                self._record_sample(ip, True, power=decoded["power"], volume=decoded["volume"],
+                                    input_source=decoded["input_source"], mute=decoded["mute"])
                 self.log(
                     "Power: {power}, Volume: {volume}, Mute: {mute}, Input: {input_source}, Aspect: {picture_aspect}".format(
                         **decoded
@@ -1590,28 +2088,38 @@ class SamsungDashboard(ctk.CTk):
                 )
                 return
 
-            device_name = result.get("device", {}).get("name") if isinstance(result, dict) else None
-            model_name = result.get("device", {}).get("modelName") if isinstance(result, dict) else None
+            device = result.get("device", {}) if isinstance(result, dict) else {}
+            device_name = device.get("name")
+            model_name = device.get("modelName")
+            self._record_sample(ip, True, power=device.get("PowerState"))
             self.log(f"Smart TV reachable. Device: {device_name or 'N/A'}, Model: {model_name or 'N/A'}")
 
-        self._run_async_action("Status", _mdc_worker, _smart_tv_worker, _on_success)
+        def _on_error(exc):
+            # A NAK or unsupported command still means the panel answered.
+            self._record_sample(ip, not is_transient(exc))
+
+        self._run_async_action("Status", _mdc_worker, lambda tv: tv.device_info(), _on_success, policy=READ_RETRY,
+                               on_error=_on_error)
 
     def get_serial(self):
         async def _mdc_worker(mdc: MDC, display_id: int):
             return await mdc.serial_number(display_id)
 
-        def _smart_tv_worker(tv):
+        async def _smart_tv_worker(tv):
             return "Not available on Smart TV WebSocket API"
 
-        self._run_async_action("Serial", _mdc_worker, _smart_tv_worker, lambda serial: self.log(f"Serial: {serial}"))
+        self._run_async_action(
+            "Serial", _mdc_worker, _smart_tv_worker, lambda serial: self.log(f"Serial: {serial}"),
+            policy=READ_RETRY,
+        )
 
     def reboot_screen(self):
         async def _mdc_worker(mdc: MDC, display_id: int):
             await mdc.power(display_id, ("REBOOT",))
             return None
 
-        def _smart_tv_worker(tv):
-            self._smarttv_send_key(tv, "KEY_POWER")
+        async def _smart_tv_worker(tv):
+            await tv.send_key("KEY_POWER")
             return None
 
         self._run_async_action("Reboot", _mdc_worker, _smart_tv_worker)
@@ -1621,35 +2129,75 @@ class SamsungDashboard(ctk.CTk):
             await mdc.virtual_remote(display_id, ("KEY_CONTENT",))
             return None
 
-        def _smart_tv_worker(tv):
-            self._smarttv_send_key(tv, "KEY_HOME")
+        async def _smart_tv_worker(tv):
+            await tv.send_key("KEY_HOME")
             return None
 
         self._run_async_action("Home", _mdc_worker, _smart_tv_worker)
 
     def set_volume(self):
-        value = int(self.volume_var.get())
+        self._set_level("volume", int(self.volume_var.get()), "Volume")
 
-        async def _mdc_worker(mdc: MDC, display_id: int):
-            await mdc.volume(display_id, (value,))
-            return value
+    def set_brightness(self):
+        self._set_level("brightness", int(self.brightness_var.get()), "Brightness")
 
-        def _smart_tv_worker(tv):
-            raise RuntimeError("Absolute volume set is not supported in hybrid mode for Smart TVs.")
+    def _on_level_slide(self, command_name: str, value, value_label):
+        value = int(value)
+        value_label.configure(text=str(value))
+        if not self.live_controls_var.get() or self._live_values.get(command_name) == value:
+            return
+        self._live_values[command_name] = value
+        self._set_level(command_name, value, command_name.capitalize(), live=True)
 
-        self._run_async_action("Set volume", _mdc_worker, _smart_tv_worker, lambda result: self.log(f"Volume set to {result}"))
+    def _set_level(self, command_name: str, value: int, label: str, live: bool = False):
+        """Send an absolute volume/brightness to every selected MDC target.
 
-    def set_brightness(self):
-        value = int(self.brightness_var.get())
+        Each send shares the ``command_name`` supersede key, so while a panel is
+        busy only the newest value stays queued for it: dragging a slider
+        produces at most one in-flight command per device and then the latest value.
+        """
+        action_name = f"{'Live' if live else 'Set'} {label.lower()}"
+        try:
+            targets = self._selected_targets()
+        except Exception as exc:
+            self._action_error(action_name, exc)
+            return
+
+        mdc_targets = [t for t in targets if t[3] == "SIGNAGE_MDC"]
+        skipped = len(targets) - len(mdc_targets)
+        if not mdc_targets:
+            if not live:
+                self._action_error(action_name, RuntimeError(f"{label} control is not supported on Smart TV WebSocket API."))
+            return
+        if skipped and not live:
+            self.log(f"{action_name}: skipped {skipped} Smart TV device(s); absolute {label.lower()} needs MDC.")
 
         async def _mdc_worker(mdc: MDC, display_id: int):
-            await mdc.brightness(display_id, (value,))
+            await getattr(mdc, command_name)(display_id, (value,))
             return value
 
-        def _smart_tv_worker(tv):
-            raise RuntimeError("Brightness control is not supported on Smart TV WebSocket API.")
-
-        self._run_async_action("Set brightness", _mdc_worker, _smart_tv_worker, lambda result: self.log(f"Brightness set to {result}"))
+        def _on_success(result, ip):
+            self.status_var.set(f"Status: {action_name} {result} OK")
+            if not live:
+                self.log(f"{label} set to {result} on {ip}")
+
+        # A button press fanned out over a selection must not trickle in minutes later;
+        # live drags are already bounded by superseding.
+        deadline = None if live else Deadline(BATCH_DEADLINE_SECONDS)
+        self.status_var.set(f"Status: {action_name} {value}...")
+        for ip, port, display_id, _ in mdc_targets:
+            self._submit_device_job(
+                device_key(ip, port, display_id),
+                lambda ip=ip, port=port, display_id=display_id: self._execute_mdc(
+                    _mdc_worker, ip, port, display_id, SET_RETRY, deadline=deadline),
+                lambda result, ip=ip: _on_success(result, ip),
+                lambda exc, target=(ip, port, display_id, "SIGNAGE_MDC"): self._defer_if_offline(
+                    action_name, target, Operation(command_name, (value,)), exc,
+                ) or self._action_error(f"{action_name} on {target[0]}", exc),
+                supersede_key=command_name,
+                # Live results only update the status line; a burst of them needs just the newest.
+                ui_key=f"live:{command_name}:{ip}" if live else None,
+            )
 
     def set_input_source(self):
         source = self.input_var.get().strip()
@@ -1658,10 +2206,15 @@ class SamsungDashboard(ctk.CTk):
             await mdc.input_source(display_id, (source,))
             return source
 
-        def _smart_tv_worker(tv):
+        async def _smart_tv_worker(tv):
             raise RuntimeError("Direct input source switching is not supported on Smart TV WebSocket API.")
 
-        self._run_async_action("Set input", _mdc_worker, _smart_tv_worker, lambda result: self.log(f"Input source set to {result}"))
+        self._run_async_action(
+            "Set input", _mdc_worker, _smart_tv_worker, lambda result: self.log(f"Input source set to {result}"),
+            supersede_key="input_source",
+            policy=SET_RETRY,
+            deferrable=Operation("input_source", (source,)),
+        )
 
     def set_mute(self):
         current = self.mute_var.get().strip().upper()
@@ -1672,11 +2225,89 @@ class SamsungDashboard(ctk.CTk):
             await mdc.mute(display_id, (next_state,))
             return next_state
 
-        def _smart_tv_worker(tv):
-            self._smarttv_send_key(tv, "KEY_MUTE")
+        async def _smart_tv_worker(tv):
+            await tv.send_key("KEY_MUTE")
             return next_state
 
-        self._run_async_action("Mute", _mdc_worker, _smart_tv_worker, lambda result: self.log(f"Mute set to {result}"))
+        self._run_async_action("Mute", _mdc_worker, _smart_tv_worker, lambda result: self.log(f"Mute set to {result}"),
+                               deferrable=Operation("mute", (next_state,)))
+
+    # ── Screen watch (periodic capture + analysis) ─────────────────────────────
+    def _toggle_screen_watch(self):
+        if self._screen_watch_job is not None:
+            self.after_cancel(self._screen_watch_job)
+            self._screen_watch_job = None
+        if not self.screen_watch_var.get():
+            self.log("Screen watch stopped.")
+            return
+        if _load_pil() is None:
+            self.log("Screen watch needs Pillow to decode captures. Run: pip install pillow")
+            self.screen_watch_var.set(False)
+            return
+        self.log("Screen watch started.")
+        self._screen_watch_errors.clear()
+        self._screen_watch_tick()
+
+    def _screen_watch_tick(self):
+        self._screen_watch_job = self.after(SCREEN_WATCH_INTERVAL_MS, self._screen_watch_tick)
+        try:
+            targets = [t for t in self._selected_targets() if t[3] == "SIGNAGE_MDC"]
+        except Exception:
+            return
+
+        async def _capture(mdc: MDC, display_id: int):
+            if not hasattr(mdc, "screen_capture"):
+                raise RuntimeError("screen_capture is not supported by this python-samsung-mdc version or device.")
+            return await mdc.screen_capture(display_id)
+
+        for ip, port, display_id, _ in targets:
+            async def _job(ip=ip, port=port, display_id=display_id):
+                image = await self.runtime.queue.submit(
+                    device_key(ip, port, display_id),
+                    lambda: self.runtime.call_mdc(ip, port, display_id, _capture, READ_RETRY,
+                                                  {"command": SCREENSHOT_COMMAND_TIMEOUT}),
+                    PRIORITY_BACKGROUND,
+                    "screen_watch",
+                )
+                # Decoding and analysis run in the process pool, outside the device's queue slot.
+                return image, await self.screen_monitor.analyze(ip, image)
+
+            future = self.runtime.run(_job())
+            future.add_done_callback(lambda f, ip=ip: self._deliver_future(
+                f,
+                lambda result: self._on_screen_verdict(ip, *result),
+                lambda exc, ip=ip: self._on_screen_watch_error(ip, exc),
+                f"screen_watch:{ip}",
+            ))
+
+    def _on_screen_watch_error(self, ip: str, exc: BaseException):
+        # Reachability is already reported by the network check and history; anything else is logged once.
+        if is_offline(exc) or ip in self._screen_watch_errors:
+            return
+        self._screen_watch_errors.add(ip)
+        self.log(f"Screen watch: cannot analyze {ip}: {exc}")
+
+    def _on_screen_verdict(self, ip: str, image_bytes: bytes, verdict: dict):
+        self._screen_watch_errors.discard(ip)
+        state = verdict["state"]
+        previous = self._screen_states.get(ip, STATE_OK)
+        self._screen_states[ip] = state
+        if state == previous:
+            return
+        if state == STATE_OK:
+            self.log(f"Screen watch: {ip} recovered (content OK).")
+            return
+
+        docs = Path.home() / "Documents" / "SamsungMDC"
+        docs.mkdir(parents=True, exist_ok=True)
+        out_path = docs / f"screenshot_{ip.replace('.', '_')}_{time.strftime('%Y%m%d_%H%M%S')}.jpg"
+        out_path.write_bytes(image_bytes)
+        self.status_var.set(f"Status: {ip} {SCREEN_STATE_TEXT[state]}")
+        self.log(
+            f"⚠ Screen watch: {ip} {SCREEN_STATE_TEXT[state]} "
+            f"(mean luma {verdict['mean']:.0f}, std {verdict['std']:.0f}, "
+            f"{verdict['identical_captures']} identical capture(s)). Capture saved: {out_path}"
+        )
 
     def take_screenshot(self):
         """Capture a screenshot from the Samsung display and show/save it."""
@@ -1685,7 +2316,7 @@ class SamsungDashboard(ctk.CTk):
                 raise RuntimeError("screen_capture is not supported by this python-samsung-mdc version or device.")
             return await mdc.screen_capture(display_id)
 
-        def _smart_tv_worker(tv):
+        async def _smart_tv_worker(tv):
             raise RuntimeError("Screenshot capture is not supported on Smart TV WebSocket API.")
 
         def _on_success(image_bytes: bytes):
@@ -1697,58 +2328,264 @@ class SamsungDashboard(ctk.CTk):
             out_path = docs / f"screenshot_{ip}_{ts}.jpg"
             out_path.write_bytes(image_bytes)
             self.log(f"Screenshot saved: {out_path}")
+            self._show_screenshot_preview(image_bytes, out_path, f"Screenshot – {self.ip_var.get()}")
+
+        self._run_async_action(
+            "Screenshot", _mdc_worker, _smart_tv_worker, _on_success,
+            policy=READ_RETRY,
+            timeout_overrides={"command": SCREENSHOT_COMMAND_TIMEOUT},
+        )
+
+    # ── Screenshot gallery ──────────────────────────────────────────────────
+    def _prune_screenshots(self, max_age_days: float | None, max_mb_per_device: float | None, on_done=None):
+        """Apply the retention policy off the Tk thread and log what was removed."""
+        async def _prune():
+            return await asyncio.to_thread(
+                lambda: apply_retention(
+                    list_captures(),
+                    max_age_days,
+                    int(max_mb_per_device * 1024 * 1024) if max_mb_per_device else None,
+                )
+            )
+
+        def _report(removed):
+            if removed:
+                freed_mb = sum(capture.size for capture in removed) / (1024 * 1024)
+                self.log(f"Screenshot retention: removed {len(removed)} capture(s), {freed_mb:.1f} MB freed")
+            if on_done:
+                on_done(removed)
+
+        future = self.runtime.run(_prune())
+        future.add_done_callback(lambda f: self._deliver_future(
+            f, _report, lambda exc: self.log(f"Screenshot retention failed: {exc}")))
+
+    def show_gallery(self):
+        """Browse saved screenshots. Only tiles in view are created; their thumbnails come from the LRU cache."""
+        pil = _load_pil()
+        if pil is None:
+            messagebox.showinfo("Gallery", "Install Pillow to browse screenshots: pip install pillow")
+            return
+        Image, ImageTk = pil
+        if self._thumb_executor is None:
+            self._thumb_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="thumbnails")
+
+        p = self._palette
+        tile_w, tile_h = GALLERY_TILE
+        popup = ctk.CTkToplevel(self)
+        popup.title("Screenshot gallery")
+        popup.geometry("920x640")
+        popup.grid_columnconfigure(0, weight=1)
+        popup.grid_rowconfigure(1, weight=1)
+
+        device_var = ctk.StringVar(value="All devices")
+        count_var = ctk.StringVar(value="")
+        days_var = ctk.StringVar(value=str(SCREENSHOT_RETENTION_DAYS))
+        mb_var = ctk.StringVar(value=str(SCREENSHOT_MAX_MB_PER_DEVICE))
+
+        top = ctk.CTkFrame(popup, fg_color="transparent")
+        top.grid(row=0, column=0, columnspan=2, padx=10, pady=(10, 4), sticky="ew")
+        top.grid_columnconfigure(1, weight=1)
+        device_menu = ctk.CTkOptionMenu(top, variable=device_var, values=["All devices"],
+                                        command=lambda _: _reload(), fg_color=p["bar_bg"],
+                                        button_color=p["accent"], button_hover_color=p["accent_hover"])
+        device_menu.grid(row=0, column=0, padx=(0, 8))
+        ctk.CTkLabel(top, textvariable=count_var, text_color="#a0c4e0",
+                     font=ctk.CTkFont(size=12)).grid(row=0, column=1, sticky="w")
+        ctk.CTkLabel(top, text="Keep days:", text_color="#a0c4e0").grid(row=0, column=2, padx=(8, 4))
+        ctk.CTkEntry(top, textvariable=days_var, width=56).grid(row=0, column=3)
+        ctk.CTkLabel(top, text="Max MB/device:", text_color="#a0c4e0").grid(row=0, column=4, padx=(8, 4))
+        ctk.CTkEntry(top, textvariable=mb_var, width=64).grid(row=0, column=5)
+        self._btn(top, "Prune", lambda: _prune(), icon="🧹", color=p["danger"], hover=p["danger_hover"],
+                  width=90, height=30).grid(row=0, column=6, padx=(8, 0))
+
+        canvas = tk.Canvas(popup, bg=p["bar_bg"], highlightthickness=0, yscrollincrement=tile_h // 4)
+        canvas.grid(row=1, column=0, sticky="nsew", padx=(10, 0), pady=(0, 10))
+        scrollbar = ctk.CTkScrollbar(popup, command=lambda *args: (canvas.yview(*args), _render_visible()))
+        scrollbar.grid(row=1, column=1, sticky="ns", padx=(0, 10), pady=(0, 10))
+        canvas.configure(yscrollcommand=scrollbar.set)
+
+        state = {"shown": [], "cols": 0}
+        tiles: dict[int, object] = {}  # tile index -> PhotoImage (None until its thumbnail arrives)
+
+        def _wanted(idx, capture):
+            return idx in tiles and idx < len(state["shown"]) and state["shown"][idx] is capture
+
+        def _drop_tile(idx):
+            canvas.delete(f"tile{idx}")
+            tiles.pop(idx, None)
+
+        def _show_thumb(idx, capture, data):
+            if not popup.winfo_exists() or not _wanted(idx, capture):
+                return
+            photo = ImageTk.PhotoImage(Image.open(BytesIO(data)))
+            row, col = divmod(idx, state["cols"])
+            canvas.create_image(col * tile_w + 8, row * tile_h + 8, anchor="nw", image=photo, tags=(f"tile{idx}",))
+            tiles[idx] = photo
+
+        def _load_thumb(idx, capture):
+            if not _wanted(idx, capture):
+                return None
+            try:
+                return self.thumbnails.load(capture)
+            except Exception:
+                return None
+
+        def _create_tile(idx):
+            capture = state["shown"][idx]
+            row, col = divmod(idx, state["cols"])
+            x, y = col * tile_w + 8, row * tile_h + 8
+            tag = f"tile{idx}"
+            canvas.create_rectangle(x, y, x + THUMBNAIL_SIZE[0], y + THUMBNAIL_SIZE[1],
+                                    fill=p["card_bg"], outline="#1e3a5f", tags=(tag,))
+            taken = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(capture.taken_at))
+            canvas.create_text(x, y + THUMBNAIL_SIZE[1] + 4, anchor="nw", fill="#a0c4e0",
+                               text=f"{capture.device}\n{taken}", font=("Consolas", 9), tags=(tag,))
+            canvas.tag_bind(tag, "<Button-1>", lambda _e, c=capture: _open(c))
+            tiles[idx] = None
+
+            data = self.thumbnails.get(capture)
+            if data is not None:
+                _show_thumb(idx, capture, data)
+                return
+
+            def _loaded(future):
+                data = future.result()
+                if data is not None:
+                    self.ui.post(lambda: _show_thumb(idx, capture, data), ("thumb", idx, capture.path))
 
-            # Show preview popup
-            if not _PIL_AVAILABLE:
-                messagebox.showinfo("Screenshot", f"Saved to {out_path}\n(Install Pillow to enable preview)")
+            self._thumb_executor.submit(_load_thumb, idx, capture).add_done_callback(_loaded)
+
+        def _render_visible():
+            cols = state["cols"]
+            if not cols:
+                return
+            top_y = canvas.canvasy(0)
+            first = max(0, int(top_y // tile_h) - 1) * cols
+            last = min(len(state["shown"]), (int((top_y + canvas.winfo_height()) // tile_h) + 2) * cols)
+            for idx in [i for i in tiles if i < first or i >= last]:
+                _drop_tile(idx)
+            for idx in range(first, last):
+                if idx not in tiles:
+                    _create_tile(idx)
+
+        def _layout(_event=None):
+            cols = max(1, canvas.winfo_width() // tile_w)
+            if cols != state["cols"]:
+                for idx in list(tiles):
+                    _drop_tile(idx)
+                state["cols"] = cols
+            rows = math.ceil(len(state["shown"]) / cols)
+            canvas.configure(scrollregion=(0, 0, cols * tile_w, max(rows * tile_h, canvas.winfo_height())))
+            _render_visible()
+
+        def _reload():
+            captures = list_captures()
+            devices = sorted({capture.device for capture in captures})
+            device_menu.configure(values=["All devices"] + devices)
+            selected = device_var.get()
+            state["shown"] = [c for c in captures if selected == "All devices" or c.device == selected]
+            total_mb = sum(capture.size for capture in state["shown"]) / (1024 * 1024)
+            count_var.set(f"{len(state['shown'])} capture(s) · {total_mb:.1f} MB")
+            for idx in list(tiles):
+                _drop_tile(idx)
+            canvas.yview_moveto(0)
+            _layout()
+
+        def _open(capture):
+            try:
+                image_bytes = capture.path.read_bytes()
+            except OSError as exc:
+                self.log(f"Gallery: cannot open {capture.path.name}: {exc}")
                 return
+            self._show_screenshot_preview(image_bytes, capture.path, f"Screenshot – {capture.device}", grab=False)
 
+        def _prune():
             try:
-                img = Image.open(BytesIO(image_bytes))
-                img.thumbnail((960, 600))
+                days = float(days_var.get()) if days_var.get().strip() else None
+                max_mb = float(mb_var.get()) if mb_var.get().strip() else None
+            except ValueError:
+                messagebox.showerror("Gallery", "Keep days and Max MB/device must be numbers (or empty).", parent=popup)
+                return
+            if not messagebox.askyesno("Gallery", "Delete captures outside this retention policy?", parent=popup):
+                return
+            self._prune_screenshots(days, max_mb, on_done=lambda _: popup.winfo_exists() and _reload())
+
+        def _wheel(event):
+            step = -1 if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0 else 1
+            canvas.yview_scroll(step * 4, "units")
+            _render_visible()
+
+        canvas.bind("<Configure>", _layout)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            canvas.bind(sequence, _wheel)
+        _reload()
+
+    def _show_screenshot_preview(self, image_bytes: bytes, out_path: Path, title: str, grab: bool = True):
+        pil = _load_pil()
+        if pil is None:
+            messagebox.showinfo("Screenshot", f"Saved to {out_path}\n(Install Pillow to enable preview)")
+            return
 
-                popup = ctk.CTkToplevel(self)
-                popup.title(f"Screenshot – {self.ip_var.get()}")
+        Image, ImageTk = pil
+        try:
+            img = Image.open(BytesIO(image_bytes))
+            # Decode straight at preview scale; the full-resolution bitmap is never built.
+            img.draft("RGB", (960, 600))
+            img.thumbnail((960, 600))
+
+            popup = ctk.CTkToplevel(self)
+            popup.title(title)
+            if grab:
                 popup.grab_set()
 
-                photo = ImageTk.PhotoImage(img)
-                # keep reference so GC doesn't destroy it
-                popup._photo_ref = photo
+            photo = ImageTk.PhotoImage(img)
+            # keep reference so GC doesn't destroy it
+            popup._photo_ref = photo
 
-                lbl = tk.Label(popup, image=photo, bg="#0d0d1a")
-                lbl.pack(padx=10, pady=10)
+            lbl = tk.Label(popup, image=photo, bg="#0d0d1a")
+            lbl.pack(padx=10, pady=10)
 
-                def _save_as():
-                    dest = filedialog.asksaveasfilename(
-                        title="Save screenshot",
-                        defaultextension=".jpg",
-                        initialfile=out_path.name,
-                        filetypes=[("JPEG", "*.jpg"), ("PNG", "*.png"), ("All files", "*.*")],
-                    )
-                    if dest:
-                        Path(dest).write_bytes(image_bytes)
-                        self.log(f"Screenshot saved as: {dest}")
-
-                btn_row = ctk.CTkFrame(popup, fg_color="transparent")
-                btn_row.pack(pady=(0, 10))
-                ctk.CTkButton(btn_row, text="💾  Save As…", command=_save_as,
-                              fg_color=self._palette["accent"],
-                              hover_color=self._palette["accent_hover"],
-                              width=130, height=32).pack(side="left", padx=6)
-                ctk.CTkButton(btn_row, text="Close", command=popup.destroy,
-                              fg_color=self._palette["neutral"],
-                              hover_color=self._palette["neutral_hover"],
-                              width=90, height=32).pack(side="left", padx=6)
-            except Exception as exc:
-                self.log(f"Screenshot preview error: {exc}")
-                messagebox.showinfo("Screenshot", f"Saved to {out_path}")
-
-        self._run_async_action("Screenshot", _mdc_worker, _smart_tv_worker, _on_success)
-
-
-def main() -> None:
+            def _save_as():
+                dest = filedialog.asksaveasfilename(
+                    title="Save screenshot",
+                    defaultextension=".jpg",
+                    initialfile=out_path.name,
+                    filetypes=[("JPEG", "*.jpg"), ("PNG", "*.png"), ("All files", "*.*")],
+                )
+                if dest:
+                    Path(dest).write_bytes(image_bytes)
+                    self.log(f"Screenshot saved as: {dest}")
+
+            btn_row = ctk.CTkFrame(popup, fg_color="transparent")
+            btn_row.pack(pady=(0, 10))
+            ctk.CTkButton(btn_row, text="💾  Save As…", command=_save_as,
+                          fg_color=self._palette["accent"],
+                          hover_color=self._palette["accent_hover"],
+                          width=130, height=32).pack(side="left", padx=6)
+            ctk.CTkButton(btn_row, text="Close", command=popup.destroy,
+                          fg_color=self._palette["neutral"],
+                          hover_color=self._palette["neutral_hover"],
+                          width=90, height=32).pack(side="left", padx=6)
+        except Exception as exc:
+            self.log(f"Screenshot preview error: {exc}")
+            messagebox.showinfo("Screenshot", f"Saved to {out_path}")
+
+
+def main(profile: bool = False) -> None:
+    AUDIT.source = "dashboard"
     app = SamsungDashboard()
-    app.mainloop()
+    if profile:
+        app.session_profiler = SessionProfiler("dashboard")
+        app.session_profiler.start(loops=[app.runtime.loop])
+        app.log("Profiler: profiling this session; the report is written on exit.")
+    try:
+        app.mainloop()
+    finally:
+        if app.session_profiler is not None:
+            print(f"Profile report: {app.session_profiler.stop()}")
+        app.history.close()
+        AUDIT.close()
+        app.screen_monitor.shutdown()
 
 
 if __name__ == "__main__":
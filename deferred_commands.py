@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from command_queue import PRIORITY_BACKGROUND, device_key
+from devices import resolve_protocol
+from operations import Operation, run_operation, to_jsonable
+from resilience import is_offline
+
+DEFERRED_DB_FILE = Path.home() / "Documents" / "SamsungMDC" / "deferred_commands.db"
+MAX_AGE_SECONDS = 7 * 86400
+REPLAY_PROBE_TIMEOUT = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    device TEXT NOT NULL,
+    ip TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    display_id INTEGER NOT NULL,
+    protocol TEXT NOT NULL,
+    command TEXT NOT NULL,
+    args TEXT NOT NULL,
+    supersede TEXT NOT NULL,
+    queued REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    UNIQUE (device, supersede)
+);
+"""
+
+
+def can_defer(device: dict, operation: Operation) -> bool:
+    """Only MDC SETs that a newer value replaces are deferred.
+
+    Special commands (key presses, reboots, Smart TV actions) have no
+    supersede key, so they are never replayed later.
+    """
+    if operation.supersede_key() is None:
+        return False
+    return resolve_protocol(device.get("protocol", "AUTO"), int(device["port"])) == "SIGNAGE_MDC"
+
+
+class DeferredCommands:
+    """SETs for unreachable devices, kept in SQLite until the device answers again.
+
+    Each device keeps at most one pending entry per supersede key (the command
+    name, or ``timer_15:<id>``), so a newer value replaces the older one and
+    moves to the end; replay sends what is left in the order it was queued.
+    Entries older than ``max_age`` are dropped instead of being replayed.
+
+    The file is shared by the dashboard and the control daemon. Calls are
+    short single-row statements, but the event loop should still run them
+    through ``asyncio.to_thread``.
+    """
+
+    def __init__(self, path: Path = DEFERRED_DB_FILE, max_age: float = MAX_AGE_SECONDS):
+        self.path = path
+        self.max_age = max_age
+        self._replaying: set[str] = set()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _query(self, sql: str, params=()) -> list[dict]:
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def _execute(self, sql: str, params=()) -> int:
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute(sql, params).rowcount
+        finally:
+            conn.close()
+
+    # ── Queueing ─────────────────────────────────────────────────────────────
+    def add(self, device: dict, operation: Operation) -> bool:
+        """Queue ``operation`` for ``device``, replacing a pending one with the same supersede key."""
+        if not can_defer(device, operation):
+            return False
+        port, display_id = int(device["port"]), int(device["id"])
+        self._execute(
+            "INSERT OR REPLACE INTO pending (device, ip, port, display_id, protocol, command, args, supersede, queued)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (device_key(device["ip"], port, display_id), device["ip"], port, display_id,
+             device.get("protocol", "AUTO"), operation.command, json.dumps(to_jsonable(operation.args)),
+             operation.supersede_key(), time.time()),
+        )
+        return True
+
+    def pending(self, ip: str | None = None) -> list[dict]:
+        """Pending entries, oldest first, for one IP or every device."""
+        where, params = ("WHERE ip = ?", (ip,)) if ip else ("", ())
+        rows = self._query(f"SELECT * FROM pending {where} ORDER BY id", params)
+        for row in rows:
+            row["args"] = json.loads(row["args"])
+        return rows
+
+    def counts(self) -> dict[str, int]:
+        """Pending entry count per IP."""
+        return {row["ip"]: row["n"] for row in self._query("SELECT ip, COUNT(*) AS n FROM pending GROUP BY ip")}
+
+    def discard(self, ip: str | None = None, entry_id: int | None = None) -> int:
+        if entry_id is not None:
+            return self._execute("DELETE FROM pending WHERE id = ?", (entry_id,))
+        if ip:
+            return self._execute("DELETE FROM pending WHERE ip = ?", (ip,))
+        return self._execute("DELETE FROM pending")
+
+    def expire(self) -> int:
+        return self._execute("DELETE FROM pending WHERE queued < ?", (time.time() - self.max_age,))
+
+    def _note_attempt(self, entry_id: int, error: str) -> None:
+        self._execute("UPDATE pending SET attempts = attempts + 1, last_error = ? WHERE id = ?", (error, entry_id))
+
+    # ── Replay ───────────────────────────────────────────────────────────────
+    async def replay(self, runtime, ip: str, probe: bool = True) -> list[dict]:
+        """Send ``ip``'s pending entries in order; must be awaited on the runtime loop.
+
+        With ``probe`` the device is checked first and nothing is sent while
+        it is still down. A failure that means the device went away again
+        stops the replay and keeps the remaining entries; a rejected command
+        (NAK, bad value) is dropped and reported, since resending it would
+        never succeed. Returns one result row per entry that was tried.
+        """
+        if ip in self._replaying:
+            return []
+        self._replaying.add(ip)
+        try:
+            await asyncio.to_thread(self.expire)
+            entries = await asyncio.to_thread(self.pending, ip)
+            if not entries:
+                return []
+            if probe:
+                first = entries[0]
+                if not await runtime.probe(ip, first["port"], REPLAY_PROBE_TIMEOUT, fail_fast=True):
+                    return []
+
+            rows = []
+            for entry in entries:
+                device = {"ip": ip, "port": entry["port"], "id": entry["display_id"], "protocol": entry["protocol"]}
+                operation = Operation(entry["command"], entry["args"])
+                row = {"id": entry["id"], "device": ip, "operation": operation.to_dict(), "queued": entry["queued"]}
+                try:
+                    await run_operation(runtime, device, operation, PRIORITY_BACKGROUND)
+                except Exception as exc:
+                    error = str(exc) or exc.__class__.__name__
+                    row.update(ok=False, error=error)
+                    rows.append(row)
+                    if is_offline(exc):
+                        await asyncio.to_thread(self._note_attempt, entry["id"], error)
+                        break
+                    await asyncio.to_thread(self.discard, None, entry["id"])
+                    continue
+                row["ok"] = True
+                rows.append(row)
+                # Only delete the row that was sent: a newer value queued meanwhile replaced it with a new id.
+                await asyncio.to_thread(self.discard, None, entry["id"])
+            return rows
+        finally:
+            self._replaying.discard(ip)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Show or clear SETs waiting for offline devices")
+    parser.add_argument("--device", help="Only this IP")
+    parser.add_argument("--clear", action="store_true", help="Discard the pending entries instead of listing them")
+    args = parser.parse_args()
+
+    deferred = DeferredCommands()
+    if args.clear:
+        print(f"Discarded {deferred.discard(args.device)} pending command(s)")
+        return
+    for entry in deferred.pending(args.device):
+        queued = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["queued"]))
+        note = f"  ({entry['attempts']} failed replay(s): {entry['last_error']})" if entry["attempts"] else ""
+        print(f"{queued}  {entry['ip']:<15}  {entry['command']} {entry['args']}{note}")
+
+
+if __name__ == "__main__":
+    main()
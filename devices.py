@@ -0,0 +1,172 @@
+import csv
+import hashlib
+import json
+import marshal
+import os
+from io import StringIO
+from pathlib import Path
+
+SAVED_DEVICES_FILE = Path("saved_devices.json")
+SAVED_DEVICES_CACHE = SAVED_DEVICES_FILE.with_suffix(".cache")
+DEVICE_CACHE_FORMAT = 2
+PROTOCOL_OPTIONS = ["AUTO", "SIGNAGE_MDC", "SMART_TV_WS"]
+
+
+def normalize_device(item: dict):
+    if not isinstance(item, dict):
+        return None
+
+    ip = str(item.get("ip", "")).strip()
+    if not ip:
+        return None
+
+    try:
+        device_id = int(item.get("id", 0))
+    except Exception:
+        device_id = 0
+
+    try:
+        port = int(item.get("port", 1515))
+    except Exception:
+        port = 1515
+
+    protocol = str(item.get("protocol", "AUTO")).strip().upper()
+    if protocol not in PROTOCOL_OPTIONS:
+        protocol = "AUTO"
+
+    return {
+        "ip": ip,
+        "port": port,
+        "id": device_id,
+        "protocol": protocol,
+        "site": str(item.get("site", "")).strip(),
+        "description": str(item.get("description", "")).strip(),
+    }
+
+
+def _devices_file_signature(stat: os.stat_result, raw: bytes) -> tuple:
+    # The content hash catches same-size rewrites within the filesystem's mtime resolution.
+    digest = hashlib.blake2b(raw, digest_size=16).digest()
+    return DEVICE_CACHE_FORMAT, marshal.version, stat.st_mtime_ns, stat.st_size, digest
+
+
+def _read_devices_cache(signature: tuple):
+    """Normalized devices from the binary cache, or None when it is missing or stale."""
+    try:
+        cached_signature, devices = marshal.loads(SAVED_DEVICES_CACHE.read_bytes())
+    except Exception:
+        return None
+    return devices if cached_signature == signature else None
+
+
+def _write_devices_cache(signature: tuple, devices: list[dict]) -> None:
+    temp_file = SAVED_DEVICES_CACHE.with_name(SAVED_DEVICES_CACHE.name + ".tmp")
+    try:
+        temp_file.write_bytes(marshal.dumps((signature, devices)))
+        os.replace(temp_file, SAVED_DEVICES_CACHE)
+    except Exception:
+        pass
+
+
+def load_saved_devices() -> list[dict]:
+    """Load saved devices, reusing the binary cache while the JSON file is unchanged."""
+    try:
+        stat = SAVED_DEVICES_FILE.stat()
+        raw = SAVED_DEVICES_FILE.read_bytes()
+    except OSError:
+        return []
+    signature = _devices_file_signature(stat, raw)
+
+    cached = _read_devices_cache(signature)
+    if cached is not None:
+        return cached
+
+    try:
+        payload = json.loads(raw.decode("utf-8"))
+        if isinstance(payload, dict):
+            payload = [payload]
+        if not isinstance(payload, list):
+            return []
+        devices = [d for d in (normalize_device(item) for item in payload) if d]
+    except Exception:
+        return []
+    _write_devices_cache(signature, devices)
+    return devices
+
+
+def save_saved_devices(devices: list[dict]) -> None:
+    raw = json.dumps(devices, ensure_ascii=False, indent=2).encode("utf-8")
+    SAVED_DEVICES_FILE.write_bytes(raw)
+    # Cache what load_saved_devices would return for this file, not the caller's list.
+    normalized = [d for d in (normalize_device(item) for item in devices) if d]
+    _write_devices_cache(_devices_file_signature(SAVED_DEVICES_FILE.stat(), raw), normalized)
+
+
+def parse_imported_devices(file_name: str, raw_bytes: bytes) -> list[dict]:
+    lower_name = file_name.lower()
+
+    if lower_name.endswith(".json"):
+        payload = json.loads(raw_bytes.decode("utf-8"))
+        if isinstance(payload, dict):
+            payload = [payload]
+        if not isinstance(payload, list):
+            return []
+        return [d for d in (normalize_device(item) for item in payload) if d]
+
+    if lower_name.endswith(".csv"):
+        text = raw_bytes.decode("utf-8")
+        reader = csv.DictReader(StringIO(text))
+        parsed = []
+        for row in reader:
+            mapped = {
+                "ip": row.get("ip") or row.get("IP") or "",
+                "port": row.get("port") or row.get("PORT") or 1515,
+                "id": row.get("id") or row.get("ID") or 0,
+                "protocol": row.get("protocol") or row.get("PROTOCOL") or "AUTO",
+                "site": row.get("site") or row.get("SITE") or "",
+                "description": row.get("description") or row.get("DESCRIPTION") or "",
+            }
+            normalized = normalize_device(mapped)
+            if normalized:
+                parsed.append(normalized)
+        return parsed
+
+    return []
+
+
+def merge_devices(existing_devices: list[dict], incoming_devices: list[dict]) -> tuple[list[dict], int, int]:
+    merged = list(existing_devices)
+    index_by_ip = {device.get("ip"): idx for idx, device in enumerate(merged)}
+    added = 0
+    updated = 0
+
+    for device in incoming_devices:
+        ip = device.get("ip")
+        if ip in index_by_ip:
+            merged[index_by_ip[ip]] = device
+            updated += 1
+        else:
+            index_by_ip[ip] = len(merged)
+            merged.append(device)
+            added += 1
+
+    return merged, added, updated
+
+
+def find_device_by_ip(devices: list[dict], ip: str):
+    ip_to_find = ip.strip()
+    for device in devices:
+        if device.get("ip") == ip_to_find:
+            return device
+    return None
+
+
+def resolve_protocol(protocol: str, port: int) -> str:
+    protocol = str(protocol).strip().upper()
+    if protocol not in PROTOCOL_OPTIONS:
+        protocol = "AUTO"
+
+    if protocol != "AUTO":
+        return protocol
+
+    return "SIGNAGE_MDC" if int(port) == 1515 else "SMART_TV_WS"
@@ -0,0 +1,139 @@
+import asyncio
+import ipaddress
+import time
+
+from command_queue import device_key
+from fleet_runtime import PROBE_CANDIDATES, probe_port
+from resilience import READ_RETRY
+from smart_tv import AsyncSmartTV
+
+DISCOVERY_PORTS = tuple(port for port, _ in PROBE_CANDIDATES)
+MAX_SCAN_HOSTS = 65536
+
+
+class RateLimiter:
+    """Token bucket: at most ``rate`` acquisitions per second, bursts up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def expand_cidrs(cidrs: list[str]) -> list[str]:
+    """Host addresses for comma/space separated CIDRs or single IPs, de-duplicated in order."""
+    hosts: dict[str, None] = {}
+    for cidr in cidrs:
+        cidr = cidr.strip()
+        if not cidr:
+            continue
+        network = ipaddress.ip_network(cidr, strict=False)
+        if network.num_addresses > MAX_SCAN_HOSTS:
+            raise ValueError(f"{cidr} is larger than a /16; split it into smaller ranges.")
+        addresses = network.hosts() if network.num_addresses > 2 else iter(network)
+        for address in addresses:
+            hosts[str(address)] = None
+    return list(hosts)
+
+
+def classify_ports(open_ports) -> tuple[int, str] | None:
+    """Pick (port, protocol) the way Auto Probe does: 1515 first, then 8002, then 8001."""
+    for port, protocol in PROBE_CANDIDATES:
+        if port in open_ports:
+            return port, protocol
+    return None
+
+
+class SubnetScanner:
+    """Concurrent TCP sweep of CIDR ranges for MDC / Smart TV control ports.
+
+    ``concurrency`` workers pull (host, port) pairs from one shared iterator, so
+    memory stays flat for a /16, and every connect waits on a token bucket
+    capped at ``rate`` connects per second. Hits are enriched through the
+    runtime (serial number over MDC, ``rest_device_info`` for Smart TVs).
+    """
+
+    def __init__(self, runtime, concurrency: int = 512, rate: float = 400.0, timeout: float = 0.8,
+                 enrich_concurrency: int = 32):
+        self.runtime = runtime
+        self.concurrency = concurrency
+        self.enrich_concurrency = enrich_concurrency
+        self.rate = rate
+        self.timeout = timeout
+        self.cancelled = False
+
+    async def scan(self, hosts: list[str], on_progress=None) -> list[dict]:
+        limiter = RateLimiter(self.rate)
+        pairs = ((host, port) for host in hosts for port in DISCOVERY_PORTS)
+        open_ports: dict[str, set[int]] = {}
+        total = len(hosts) * len(DISCOVERY_PORTS)
+        done = 0
+        last_report = 0.0
+
+        async def _worker():
+            nonlocal done, last_report
+            for host, port in pairs:
+                if self.cancelled:
+                    return
+                await limiter.acquire()
+                if await probe_port(host, port, self.timeout):
+                    open_ports.setdefault(host, set()).add(port)
+                done += 1
+                now = time.monotonic()
+                if on_progress and (now - last_report > 0.25 or done == total):
+                    last_report = now
+                    on_progress(done // len(DISCOVERY_PORTS), len(hosts), len(open_ports))
+
+        await asyncio.gather(*(_worker() for _ in range(min(self.concurrency, max(1, total)))))
+
+        found = []
+        for host in hosts:
+            match = classify_ports(open_ports.get(host, ()))
+            if match:
+                found.append({"ip": host, "port": match[0], "id": 0, "protocol": match[1]})
+
+        enrich_slots = asyncio.Semaphore(self.enrich_concurrency)
+        await asyncio.gather(*(self._enrich(device, enrich_slots) for device in found))
+        return found
+
+    async def _enrich(self, device: dict, slots: asyncio.Semaphore) -> None:
+        async with slots:
+            await self._enrich_one(device)
+
+    async def _enrich_one(self, device: dict) -> None:
+        ip, port = device["ip"], device["port"]
+        try:
+            if device["protocol"] == "SIGNAGE_MDC":
+                async def _serial(mdc, display_id):
+                    return await mdc.serial_number(display_id)
+
+                serial = await self.runtime.queue.submit(
+                    device_key(ip, port, device["id"]),
+                    lambda: self.runtime.call_mdc(ip, port, device["id"], _serial, READ_RETRY),
+                )
+                device["serial_number"] = str(serial[0]) if serial else ""
+                device["description"] = f"S/N {device['serial_number']}" if device["serial_number"] else ""
+            else:
+                info = await self.runtime.queue.submit(
+                    device_key(ip, port, device["id"]),
+                    lambda: self.runtime.call(ip, port, lambda: AsyncSmartTV(ip, port, 3).rest_device_info(),
+                                              READ_RETRY),
+                )
+                details = info.get("device", {}) if isinstance(info, dict) else {}
+                name = details.get("name") or ""
+                model = details.get("modelName") or ""
+                device["description"] = " · ".join(part for part in (name, model) if part)
+        except Exception as exc:
+            device["description"] = ""
+            device["enrich_error"] = str(exc)
@@ -0,0 +1,337 @@
+import argparse
+import asyncio
+import json
+import random
+import socket
+import struct
+import threading
+import time
+from dataclasses import asdict, dataclass, fields, replace
+from pathlib import Path
+
+CHUNK_SIZE = 16 * 1024
+
+
+def _reset(writer: asyncio.StreamWriter) -> None:
+    """Drop the connection with an RST; a plain ``abort()`` closes it with a FIN, which reads as a clean EOF."""
+    sock = writer.get_extra_info("socket")
+    if sock is not None:
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        except OSError:
+            pass
+    writer.transport.abort()
+
+
+@dataclass(frozen=True)
+class FaultProfile:
+    """Network conditions between a client and one target.
+
+    ``latency`` (+ up to ``jitter``) is added to every chunk in each
+    direction, without holding back the chunks behind it, and twice over to
+    the start of each connection for the TCP handshake. ``bandwidth``
+    caps each direction in bytes per second (0 = unlimited).
+
+    Per connection, ``reset_rate`` is the chance it is reset (RST) after up
+    to ``reset_after`` seconds, and ``half_open_rate`` the chance that after
+    ``half_open_after`` seconds the far end silently vanishes: the socket
+    stays open but nothing is delivered either way and no FIN or RST comes,
+    like a VPN tunnel that dropped.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    bandwidth: int = 0
+    reset_rate: float = 0.0
+    reset_after: float = 0.0
+    half_open_rate: float = 0.0
+    half_open_after: float = 0.0
+
+    def updated(self, changes: dict) -> "FaultProfile":
+        known = {field.name for field in fields(self)}
+        unknown = set(changes) - known
+        if unknown:
+            raise ValueError(f"Unknown fault setting(s): {', '.join(sorted(unknown))}")
+        return replace(self, **changes)
+
+
+PROFILES = {
+    "lan": FaultProfile(),
+    "vpn": FaultProfile(latency=0.04, jitter=0.02, bandwidth=250_000),
+    "bad-vpn": FaultProfile(latency=0.15, jitter=0.1, bandwidth=64_000, reset_rate=0.05, reset_after=5.0,
+                            half_open_rate=0.02, half_open_after=1.0),
+    "flaky": FaultProfile(latency=0.02, jitter=0.01, reset_rate=0.2, reset_after=2.0, half_open_rate=0.05),
+}
+
+
+def resolve_profile(spec) -> FaultProfile:
+    """A profile from a preset name, a dict of settings, or a dict with ``"profile"`` plus overrides."""
+    if isinstance(spec, FaultProfile):
+        return spec
+    if isinstance(spec, str):
+        if spec not in PROFILES:
+            raise ValueError(f"Unknown fault profile {spec!r} (known: {', '.join(PROFILES)})")
+        return PROFILES[spec]
+    spec = dict(spec or {})
+    return resolve_profile(spec.pop("profile", "lan")).updated(spec)
+
+
+def parse_address(text: str, default_port: int | None = None) -> tuple[str, int]:
+    host, _, port = str(text).rpartition(":")
+    if not host:
+        if default_port is None:
+            raise ValueError(f"{text!r} needs a port (host:port)")
+        return str(text), default_port
+    return host, int(port)
+
+
+class FaultProxy:
+    """Forwards one local address to one target, applying a :class:`FaultProfile`.
+
+    ``profile`` can be replaced at any time and applies to data forwarded
+    from then on (new connections for resets and half-open). A ``script``
+    changes it on a timeline: ``[{"at": 30, "latency": 0.3}, {"at": 60,
+    "profile": "lan"}]`` (seconds from :meth:`start`; each step is applied to
+    the profile in effect, or names a preset with ``"profile"``).
+    """
+
+    def __init__(self, target: tuple[str, int], listen: tuple[str, int] = ("127.0.0.1", 0),
+                 profile: FaultProfile | None = None, script: list[dict] | None = None):
+        self.target = target
+        self.listen = listen
+        self.profile = profile or FaultProfile()
+        self.script = sorted(script or [], key=lambda step: float(step.get("at", 0)))
+        self.stats = {"connections": 0, "failed_upstream": 0, "resets": 0, "half_open": 0,
+                      "bytes_up": 0, "bytes_down": 0}
+        self._server: asyncio.AbstractServer | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, *self.listen)
+        # With port 0 the OS picked one; ``listen`` is where clients connect.
+        self.listen = self._server.sockets[0].getsockname()[:2]
+        if self.script:
+            self._spawn(self._run_script())
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run_script(self) -> None:
+        started = time.monotonic()
+        for step in self.script:
+            await asyncio.sleep(max(0.0, started + float(step.get("at", 0)) - time.monotonic()))
+            changes = {key: value for key, value in step.items() if key != "at"}
+            base = resolve_profile(changes.pop("profile")) if "profile" in changes else self.profile
+            self.profile = base.updated(changes)
+
+    # ── Connections ──────────────────────────────────────────────────────────
+    async def _handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        profile = self.profile
+        # The client's connect returned at once; holding back the first byte a round trip stands in for the handshake.
+        handshake = 2 * profile.latency + random.uniform(0, profile.jitter)
+        if handshake > 0:
+            await asyncio.sleep(handshake)
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(*self.target)
+        except OSError:
+            # Refuse the way the target did, with a reset rather than an accepted-then-closed socket.
+            self.stats["failed_upstream"] += 1
+            _reset(client_writer)
+            return
+
+        # The connection's fate is decided up front, so a rate of 0.05 means 5 % of connections.
+        cut = asyncio.Event()
+        if random.random() < profile.reset_rate:
+            self._spawn(self._reset_later(random.uniform(0, profile.reset_after), client_writer, upstream_writer))
+        elif random.random() < profile.half_open_rate:
+            self._spawn(self._half_open_later(profile.half_open_after, cut))
+
+        up = self._spawn(self._pipe(client_reader, upstream_writer, "bytes_up", cut))
+        down = self._spawn(self._pipe(upstream_reader, client_writer, "bytes_down", cut))
+        await asyncio.gather(up, down, return_exceptions=True)
+        for writer in (client_writer, upstream_writer):
+            writer.close()
+
+    async def _reset_later(self, delay: float, *writers: asyncio.StreamWriter) -> None:
+        await asyncio.sleep(delay)
+        self.stats["resets"] += 1
+        for writer in writers:
+            _reset(writer)
+
+    async def _half_open_later(self, delay: float, cut: asyncio.Event) -> None:
+        await asyncio.sleep(delay)
+        self.stats["half_open"] += 1
+        cut.set()
+
+    async def _pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, counter: str,
+                    cut: asyncio.Event) -> None:
+        """Copy one direction; a reader task stamps chunks so latency does not limit throughput."""
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def _deliver():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    if not cut.is_set() and writer.can_write_eof():
+                        writer.write_eof()
+                    return
+                due, data = item
+                await asyncio.sleep(max(0.0, due - time.monotonic()))
+                if cut.is_set():
+                    continue
+                writer.write(data)
+                await writer.drain()
+                self.stats[counter] += len(data)
+                bandwidth = self.profile.bandwidth
+                if bandwidth > 0:
+                    await asyncio.sleep(len(data) / bandwidth)
+
+        delivery = self._spawn(_deliver())
+        last_due = 0.0
+        try:
+            while True:
+                data = await reader.read(CHUNK_SIZE)
+                if not data:
+                    break
+                if cut.is_set():
+                    continue
+                profile = self.profile
+                last_due = max(last_due, time.monotonic() + profile.latency + random.uniform(0, profile.jitter))
+                queue.put_nowait((last_due, data))
+            # Half-open: the far end never learns that this side closed.
+            if not cut.is_set():
+                queue.put_nowait(None)
+                await delivery
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            delivery.cancel()
+
+
+class ProxyGroup:
+    """Several :class:`FaultProxy` instances on one event loop on a background thread.
+
+    :meth:`from_rules` builds them from a JSON rules file::
+
+        {"ports": {"1515": "vpn", "8001": {"profile": "vpn", "latency": 0.2}},
+         "routes": [{"target": "192.168.1.50:1515", "listen": "127.0.0.1:11515",
+                     "script": [{"at": 30, "half_open_rate": 1.0}]}]}
+
+    A route without its own ``profile`` gets the one for its target port
+    from ``ports``, or ``default`` (LAN conditions unless given).
+    """
+
+    def __init__(self, proxies: list[FaultProxy]):
+        self.proxies = proxies
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="fault-proxy", daemon=True)
+
+    @classmethod
+    def from_rules(cls, rules: dict) -> "ProxyGroup":
+        ports = {int(port): spec for port, spec in (rules.get("ports") or {}).items()}
+        default = rules.get("default", "lan")
+        proxies = []
+        for route in rules.get("routes") or []:
+            target = parse_address(route["target"])
+            spec = route.get("profile", ports.get(target[1], default))
+            if "overrides" in route:
+                spec = {**(spec if isinstance(spec, dict) else {"profile": spec}), **route["overrides"]}
+            proxies.append(FaultProxy(target, parse_address(route.get("listen", "127.0.0.1:0")),
+                                      resolve_profile(spec), route.get("script")))
+        return cls(proxies)
+
+    @classmethod
+    def in_front_of(cls, targets: list[tuple[str, int]], profile, listen_host: str = "127.0.0.1") -> "ProxyGroup":
+        """One proxy per target on an ephemeral port of ``listen_host``, all with the same profile."""
+        profile = resolve_profile(profile)
+        return cls([FaultProxy(target, (listen_host, 0), profile) for target in targets])
+
+    def start(self) -> "ProxyGroup":
+        self._thread.start()
+        self._on_loop(proxy.start for proxy in self.proxies)
+        return self
+
+    def stop(self) -> None:
+        self._on_loop(proxy.stop for proxy in self.proxies)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def _on_loop(self, functions) -> None:
+        async def _all():
+            await asyncio.gather(*(function() for function in functions))
+
+        asyncio.run_coroutine_threadsafe(_all(), self.loop).result()
+
+    def set_profile(self, profile) -> None:
+        profile = resolve_profile(profile)
+        for proxy in self.proxies:
+            self.loop.call_soon_threadsafe(setattr, proxy, "profile", profile)
+
+    def mapping(self) -> dict[tuple[str, int], tuple[str, int]]:
+        """Target address -> proxy address."""
+        return {proxy.target: proxy.listen for proxy in self.proxies}
+
+    def totals(self) -> dict:
+        totals = {}
+        for proxy in self.proxies:
+            for name, value in proxy.stats.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TCP proxy that adds latency, bandwidth limits, resets and "
+                                                 "half-open connections in front of panels or TVs")
+    parser.add_argument("--rules", type=Path, help="JSON rules file (see ProxyGroup)")
+    parser.add_argument("--target", action="append", default=[], metavar="HOST:PORT",
+                        help="Target to proxy (repeatable); listens on --listen-host, consecutive ports from --listen-port")
+    parser.add_argument("--listen-host", default="127.0.0.1")
+    parser.add_argument("--listen-port", type=int, default=0, help="First listening port (0 = any free port)")
+    parser.add_argument("--profile", default="vpn", help=f"Preset for --target: {', '.join(PROFILES)}")
+    for field in fields(FaultProfile):
+        parser.add_argument(f"--{field.name.replace('_', '-')}", type=type(field.default), dest=field.name,
+                            help=f"Override the preset's {field.name}")
+    parser.add_argument("--list-profiles", action="store_true")
+    args = parser.parse_args()
+
+    if args.list_profiles:
+        for name, profile in PROFILES.items():
+            print(f"{name}: {asdict(profile)}")
+        return
+    if not args.rules and not args.target:
+        parser.error("Give --rules or at least one --target")
+
+    rules = json.loads(args.rules.read_text(encoding="utf-8")) if args.rules else {"routes": []}
+    overrides = {field.name: getattr(args, field.name) for field in fields(FaultProfile)
+                 if getattr(args, field.name) is not None}
+    for index, target in enumerate(args.target):
+        port = args.listen_port + index if args.listen_port else 0
+        rules["routes"].append({"target": target, "listen": f"{args.listen_host}:{port}",
+                                "profile": {"profile": args.profile, **overrides}})
+
+    group = ProxyGroup.from_rules(rules).start()
+    for proxy in group.proxies:
+        print(f"{proxy.listen[0]}:{proxy.listen[1]} -> {proxy.target[0]}:{proxy.target[1]}  {asdict(proxy.profile)}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        group.stop()
+        print(group.totals())
+
+
+if __name__ == "__main__":
+    main()
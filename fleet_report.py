@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+
+from command_queue import PRIORITY_BACKGROUND
+from devices import load_saved_devices, resolve_protocol
+from operations import Operation, run_operation, to_jsonable
+from resilience import is_nak, is_offline
+from screenshot_gallery import SCREENSHOT_DIR, list_captures
+from status_history import HISTORY_DB_FILE, fleet_summary
+
+FORMATS = ("csv", "jsonl")
+DEFAULT_CONCURRENCY = 64
+HISTORY_DAYS = 7.0
+STATUS_FIELDS = ("power", "volume", "mute", "input_source", "picture_aspect")
+# Reads that show which features a panel model has; a NAK means the model lacks it.
+CAPABILITY_PROBES = ("software_version", "brightness", "screen_mute", "launcher_url_address", "error_status")
+SMART_TV_CAPABILITIES = ("status", "key", "keys", "reboot")
+
+COLUMNS = (
+    "ip", "port", "display_id", "protocol", "site", "description",
+    "reachable", "latency_ms", *STATUS_FIELDS, "model", "serial",
+    "uptime_pct", "latency_avg_ms", "latency_max_ms", "samples",
+    "capabilities", "last_screenshot", "last_screenshot_at", "error", "checked_at",
+)
+HISTORY_COLUMNS = {"uptime_pct", "latency_avg_ms", "latency_max_ms", "samples"}
+SCREENSHOT_COLUMNS = {"last_screenshot", "last_screenshot_at"}
+_DONE = object()
+
+
+def parse_columns(text: str | None) -> tuple[str, ...]:
+    """Columns from a comma-separated list, in the order given; all columns when empty."""
+    if not text:
+        return COLUMNS
+    columns = tuple(name.strip() for name in text.split(",") if name.strip())
+    unknown = [name for name in columns if name not in COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)} (known: {', '.join(COLUMNS)})")
+    return columns
+
+
+def _scalar(value):
+    """A read result as one cell: single-value tuples unwrapped, longer ones joined."""
+    value = to_jsonable(value)
+    if isinstance(value, list):
+        return value[0] if len(value) == 1 else " ".join(str(item) for item in value)
+    return value
+
+
+def _stamp(ts: float | None) -> str | None:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) if ts else None
+
+
+class FleetReport:
+    """Live per-device fleet data, one row per device, as results arrive.
+
+    Up to ``concurrency`` devices are read at a time and finished rows wait
+    in a queue of that size, so memory does not grow with the fleet. Only the
+    reads the chosen ``columns`` need are sent: ``serial`` and ``model`` cost
+    one MDC read each and ``capabilities`` one per probe in
+    ``CAPABILITY_PROBES``. History columns cover the last ``history_days``
+    of :mod:`status_history`. Must be used on the runtime loop.
+    """
+
+    def __init__(self, runtime, columns=COLUMNS, history_days: float = HISTORY_DAYS,
+                 concurrency: int = DEFAULT_CONCURRENCY, history_file: Path = HISTORY_DB_FILE,
+                 screenshot_dir: Path = SCREENSHOT_DIR):
+        self.runtime = runtime
+        self.columns = tuple(columns)
+        self.history_days = history_days
+        self.concurrency = max(1, concurrency)
+        self.history_file = history_file
+        self.screenshot_dir = screenshot_dir
+        self._history: dict[str, dict] = {}
+        self._captures: dict[str, object] = {}
+
+    def _wants(self, *columns: str) -> bool:
+        return any(column in self.columns for column in columns)
+
+    async def _load_context(self) -> None:
+        if self._wants(*HISTORY_COLUMNS):
+            since = time.time() - self.history_days * 86400
+            self._history = await asyncio.to_thread(fleet_summary, since, self.history_file)
+        if self._wants(*SCREENSHOT_COLUMNS):
+            captures = await asyncio.to_thread(list_captures, self.screenshot_dir)
+            self._captures = {}
+            for capture in captures:  # newest first
+                self._captures.setdefault(capture.device, capture)
+
+    async def _read(self, device: dict, command: str):
+        return await run_operation(self.runtime, device, Operation(command), PRIORITY_BACKGROUND)
+
+    async def _optional_read(self, device: dict, command: str):
+        try:
+            return _scalar(await self._read(device, command))
+        except Exception:
+            return None
+
+    async def _probe(self, device: dict, command: str) -> bool | None:
+        """True if the panel answers ``command``, False on a NAK, None when the read itself failed."""
+        try:
+            await self._read(device, command)
+        except Exception as exc:
+            return False if is_nak(exc) else None
+        return True
+
+    async def device_row(self, device: dict) -> dict:
+        ip = device["ip"]
+        protocol = resolve_protocol(device.get("protocol", "AUTO"), int(device["port"]))
+        row = {"ip": ip, "port": int(device["port"]), "display_id": int(device.get("id", 0)), "protocol": protocol,
+               "site": device.get("site"), "description": device.get("description"),
+               "checked_at": _stamp(time.time())}
+
+        start = time.perf_counter()
+        try:
+            status = await self._read(device, "status")
+        except Exception as exc:
+            # A NAK still means the device answered.
+            row["reachable"] = not is_offline(exc)
+            row["error"] = str(exc) or exc.__class__.__name__
+            status = None
+        else:
+            row["reachable"] = True
+            row["latency_ms"] = int((time.perf_counter() - start) * 1000)
+
+        if status is not None and protocol == "SIGNAGE_MDC":
+            values = to_jsonable(status)
+            row.update({name: values[index] for index, name in enumerate(STATUS_FIELDS) if index < len(values)})
+            if self._wants("serial"):
+                row["serial"] = await self._optional_read(device, "serial_number")
+            if self._wants("model"):
+                row["model"] = await self._optional_read(device, "model_name")
+            if self._wants("capabilities"):
+                probes = {command: await self._probe(device, command) for command in CAPABILITY_PROBES}
+                unknown = [command for command, answered in probes.items() if answered is None]
+                if unknown:
+                    # A timeout says nothing about the model; only a NAK means unsupported.
+                    row.setdefault("error", f"capability probe failed: {', '.join(unknown)}")
+                else:
+                    row["capabilities"] = " ".join(["status", *(command for command, ok in probes.items() if ok)])
+        elif status is not None:
+            details = status.get("device", {}) if isinstance(status, dict) else {}
+            row["power"] = details.get("PowerState")
+            row["model"] = details.get("modelName")
+            row["capabilities"] = " ".join(SMART_TV_CAPABILITIES)
+
+        history = self._history.get(ip)
+        if history:
+            row.update(history)
+        capture = self._captures.get(ip)
+        if capture is not None:
+            row["last_screenshot"] = str(capture.path)
+            row["last_screenshot_at"] = _stamp(capture.taken_at)
+        return {column: row.get(column) for column in self.columns}
+
+    async def rows(self, devices):
+        """Yield a row per device in the order they finish; ``devices`` may be any iterable."""
+        await self._load_context()
+        pending = iter(devices)
+        finished: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+
+        async def _worker():
+            for device in pending:  # the workers share one iterator
+                await finished.put(await self.device_row(device))
+
+        failures: list[BaseException] = []
+
+        async def _all():
+            try:
+                await asyncio.gather(*(_worker() for _ in range(self.concurrency)))
+            except Exception as exc:
+                failures.append(exc)
+            await finished.put(_DONE)
+
+        producer = asyncio.create_task(_all())
+        try:
+            while (row := await finished.get()) is not _DONE:
+                yield row
+        finally:
+            producer.cancel()
+        if failures:
+            raise failures[0]
+
+    async def export(self, devices, path: Path | None, fmt: str) -> int:
+        """Stream the report to ``path`` (stdout when None), a row at a time; returns the row count."""
+        writer = await asyncio.to_thread(ReportWriter, path, fmt, self.columns)
+        count = 0
+        try:
+            async for row in self.rows(devices):
+                await asyncio.to_thread(writer.write, row)
+                count += 1
+        finally:
+            await asyncio.to_thread(writer.close)
+        return count
+
+
+class ReportWriter:
+    """CSV (header row first) or JSON Lines, line-buffered so a partial report is readable while it grows."""
+
+    def __init__(self, path: Path | None, fmt: str, columns):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown report format {fmt!r} (use {' or '.join(FORMATS)})")
+        self.fmt = fmt
+        self._file = open(path, "w", encoding="utf-8", newline="", buffering=1) if path else sys.stdout
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.DictWriter(self._file, fieldnames=list(columns), lineterminator="\n")
+            self._csv.writeheader()
+
+    def write(self, row: dict) -> None:
+        if self._csv is not None:
+            self._csv.writerow(row)
+        else:
+            self._file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def close(self) -> None:
+        if self._file is sys.stdout:
+            self._file.flush()
+        else:
+            self._file.close()
+
+
+def format_for(path: Path | None, default: str = "csv") -> str:
+    if path is not None and path.suffix.lower() in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if path is not None and path.suffix.lower() == ".csv":
+        return "csv"
+    return default
+
+
+def main() -> None:
+    from fleet_runtime import FleetRuntime
+
+    parser = argparse.ArgumentParser(description="Stream a live fleet report (status, serial, uptime, ...) "
+                                                 "to CSV or JSON Lines")
+    parser.add_argument("--out", type=Path, help="Report file (.csv or .jsonl); stdout when omitted")
+    parser.add_argument("--format", choices=FORMATS, help="Defaults to the --out extension, else csv")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--site", action="append", help="Only devices of this site (repeatable)")
+    target.add_argument("--devices", nargs="+", metavar="IP", help="Only these saved devices")
+    parser.add_argument("--columns", help="Comma-separated columns, in order (see --list-columns)")
+    parser.add_argument("--list-columns", action="store_true")
+    parser.add_argument("--history-days", type=float, default=HISTORY_DAYS, help="Window for uptime/latency stats")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    args = parser.parse_args()
+
+    if args.list_columns:
+        print("\n".join(COLUMNS))
+        return
+    try:
+        columns = parse_columns(args.columns)
+    except ValueError as exc:
+        parser.error(str(exc))
+    devices = load_saved_devices()
+    if args.site:
+        devices = [device for device in devices if device["site"] in args.site]
+    elif args.devices:
+        devices = [device for device in devices if device["ip"] in args.devices]
+    if not devices:
+        parser.error("No saved devices match")
+
+    runtime = FleetRuntime()
+    report = FleetReport(runtime, columns, args.history_days, args.concurrency)
+    start = time.perf_counter()
+    count = runtime.run(report.export(devices, args.out, args.format or format_for(args.out))).result()
+    print(f"{count} device(s) reported in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+import asyncio
+import functools
+import threading
+import time
+
+from audit_log import AUDIT
+from command_queue import PRIORITY_INTERACTIVE, CommandQueue, device_key
+from resilience import UNSAFE_RETRY, BreakerRegistry, DeviceConnectError, RetryPolicy, call_with_retry
+from smart_tv import execute_smart_tv
+from timeouts import Deadline, EndpointTimeouts, TimeoutRegistry
+
+# Control ports in Auto Probe preference order.
+PROBE_CANDIDATES = [
+    (1515, "SIGNAGE_MDC"),
+    (8002, "SMART_TV_WS"),
+    (8001, "SMART_TV_WS"),
+]
+
+
+def endpoint_key(ip: str, port: int) -> str:
+    return f"{ip}:{port}"
+
+
+@functools.cache
+def _mdc_commands_by_code() -> dict:
+    """``(cmd, subcmd)`` -> samsung_mdc command object, to name the frames in the audit log."""
+    from samsung_mdc import MDC
+
+    return {(command.CMD, command.SUBCMD): command for command in MDC._commands.values()}
+
+
+def _audit_mdc(ip: str, port: int, display_id: int, cmd, data, start: float, response=None, error=None) -> None:
+    code = tuple(cmd) if isinstance(cmd, (tuple, list)) else (cmd,)
+    command = _mdc_commands_by_code().get((code[0], code[1] if len(code) > 1 else None))
+    name = command.name if command is not None else "0x" + "".join(f"{part:02x}" for part in code)
+    latency_ms = (time.perf_counter() - start) * 1000
+    if error is not None:
+        AUDIT.record(ip, name, data, ok=False, latency_ms=latency_ms, error=str(error) or error.__class__.__name__,
+                     port=port, display_id=display_id)
+        return
+    ack, _, payload = response
+    result = payload
+    if ack and command is not None:
+        try:
+            result = tuple(command.parse_response_data(payload))
+        except Exception:
+            pass  # journal the raw bytes
+    AUDIT.record(ip, name, data, ok=ack, result=result, latency_ms=latency_ms, error=None if ack else "NAK",
+                 port=port, display_id=display_id)
+
+
+@functools.cache
+def _timed_mdc_class():
+    """Build the MDC subclass on first use so samsung_mdc is not imported at startup."""
+    from samsung_mdc import MDC
+
+    class _TimedMDC(MDC):
+        """MDC client that feeds every command round trip into an RTT estimator and the audit log."""
+
+        def __init__(self, target, estimator=None, **kwargs):
+            super().__init__(target, **kwargs)
+            self._estimator = estimator
+            ip, _, port = target.rpartition(":")
+            self._endpoint = (ip, int(port))
+
+        async def send(self, cmd, display_id, data=b""):
+            start = time.perf_counter()
+            try:
+                response = await super().send(cmd, display_id, data)
+            except Exception as exc:
+                if isinstance(exc, TimeoutError) and self._estimator is not None:
+                    self._estimator.backoff()
+                _audit_mdc(*self._endpoint, display_id, cmd, data, start, error=exc)
+                raise
+            if self._estimator is not None:
+                self._estimator.sample(time.perf_counter() - start)
+            _audit_mdc(*self._endpoint, display_id, cmd, data, start, response)
+            return response
+
+    return _TimedMDC
+
+
+async def open_mdc(ip: str, port: int, timeouts: EndpointTimeouts | None = None,
+                   connect_timeout: float | None = None, command_timeout: float | None = None):
+    """Open an MDC connection, feeding the connect time into ``timeouts``; raises DeviceConnectError."""
+    kwargs = {}
+    if connect_timeout is not None:
+        kwargs["connect_timeout"] = connect_timeout
+    if command_timeout is not None:
+        kwargs["timeout"] = command_timeout
+
+    mdc = _timed_mdc_class()(endpoint_key(ip, port), timeouts.command if timeouts else None, **kwargs)
+    start = time.perf_counter()
+    try:
+        await mdc.open()
+    except Exception as exc:
+        if timeouts is not None and isinstance(exc, TimeoutError):
+            timeouts.connect.backoff()
+        raise DeviceConnectError(f"{ip}:{port} unreachable ({exc or exc.__class__.__name__})") from exc
+    if timeouts is not None:
+        timeouts.connect.sample(time.perf_counter() - start)
+    return mdc
+
+
+async def execute_mdc(ip: str, port: int, display_id: int, worker, timeouts: EndpointTimeouts | None = None,
+                      connect_timeout: float | None = None, command_timeout: float | None = None):
+    mdc = await open_mdc(ip, port, timeouts, connect_timeout, command_timeout)
+    try:
+        return await worker(mdc, display_id)
+    finally:
+        if mdc.is_opened:
+            await mdc.close()
+
+
+async def _close_quietly(mdc) -> None:
+    try:
+        if mdc.is_opened:
+            await mdc.close()
+    except Exception:
+        pass
+
+
+class _Session:
+    __slots__ = ("mdc", "lock", "last_used")
+
+    def __init__(self):
+        self.mdc = None
+        self.lock = asyncio.Lock()
+        self.last_used = 0.0
+
+
+class MdcSessions:
+    """Keeps one MDC connection per endpoint open between commands.
+
+    A connection is reused while it is younger than ``idle_timeout`` seconds
+    since its last command, closed by a reaper afterwards, and dropped after
+    any failure other than a NAK (a timed-out or desynchronised stream is
+    never reused). Displays daisy-chained behind one IP share the connection
+    one command at a time. Must be used from one event loop.
+    """
+
+    def __init__(self, idle_timeout: float = 20.0):
+        self.idle_timeout = idle_timeout
+        self._sessions: dict[str, _Session] = {}
+        self._reaper: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return sum(1 for session in self._sessions.values() if session.mdc is not None)
+
+    async def execute(self, ip: str, port: int, display_id: int, worker, timeouts: EndpointTimeouts | None = None,
+                      connect_timeout: float | None = None, command_timeout: float | None = None):
+        session = self._sessions.setdefault(endpoint_key(ip, port), _Session())
+        async with session.lock:
+            mdc = session.mdc
+            if mdc is not None and (not mdc.is_opened or mdc.reader.at_eof()):
+                # The panel closed its side while the connection sat idle.
+                await _close_quietly(mdc)
+                mdc = session.mdc = None
+            if mdc is None:
+                mdc = session.mdc = await open_mdc(ip, port, timeouts, connect_timeout, command_timeout)
+            elif command_timeout is not None:
+                mdc.timeout = command_timeout
+
+            try:
+                result = await worker(mdc, display_id)
+            except BaseException as exc:
+                if type(exc).__name__ != "NAKError":
+                    session.mdc = None
+                    await _close_quietly(mdc)
+                raise
+            finally:
+                session.last_used = time.monotonic()
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+        return result
+
+    async def _reap(self) -> None:
+        while len(self):
+            await asyncio.sleep(max(1.0, self.idle_timeout / 2))
+            now = time.monotonic()
+            for session in list(self._sessions.values()):
+                if session.mdc is not None and not session.lock.locked() and now - session.last_used >= self.idle_timeout:
+                    mdc, session.mdc = session.mdc, None
+                    await _close_quietly(mdc)
+
+    async def close(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for session in self._sessions.values():
+            async with session.lock:
+                if session.mdc is not None:
+                    mdc, session.mdc = session.mdc, None
+                    await _close_quietly(mdc)
+
+
+async def open_probe(ip: str, port: int, timeout: float) -> None:
+    """Open and immediately close a TCP connection; raises on failure."""
+    _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except Exception:
+        pass
+
+
+async def probe_port(ip: str, port: int, timeout: float = 1.0) -> bool:
+    try:
+        await open_probe(ip, port, timeout)
+    except Exception:
+        return False
+    return True
+
+
+class FleetRuntime:
+    """Owns the background asyncio loop that all device I/O is funnelled through.
+
+    Every command goes through one :class:`CommandQueue`, so two actions can
+    never talk to the same device at the same time, and through a per-endpoint
+    circuit breaker, so a sweep over known-down panels fails fast. Connect and
+    command timeouts come from per-device measured round-trip times.
+
+    With ``keepalive`` (seconds) MDC connections stay open between commands
+    (see :class:`MdcSessions`); by default every command opens its own, so
+    other MDC clients can still reach the panel between commands.
+    """
+
+    def __init__(self, breaker_threshold: int = 3, breaker_reset: float = 15.0, keepalive: float = 0.0):
+        self.loop = asyncio.new_event_loop()
+        self.queue = CommandQueue()
+        self.breakers = BreakerRegistry(threshold=breaker_threshold, reset_timeout=breaker_reset)
+        self.timeouts = TimeoutRegistry()
+        self.sessions = MdcSessions(keepalive) if keepalive > 0 else None
+        self.open_connections = 0
+        self._thread = threading.Thread(target=self._run_loop, name="fleet-runtime", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro):
+        """Schedule a coroutine on the runtime loop; returns a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def submit(self, key: str, factory, priority: int = PRIORITY_INTERACTIVE, supersede_key: str | None = None):
+        """Thread-safe :meth:`CommandQueue.submit`; returns a concurrent Future."""
+        async def _enqueue():
+            return await self.queue.submit(key, factory, priority, supersede_key)
+
+        return self.run(_enqueue())
+
+    async def call(self, ip: str, port: int, factory, policy: RetryPolicy = UNSAFE_RETRY,
+                   deadline: Deadline | None = None):
+        """Await ``factory()`` under the endpoint's circuit breaker with ``policy`` retries."""
+        endpoint = endpoint_key(ip, port)
+
+        async def _tracked():
+            self.open_connections += 1
+            try:
+                return await factory()
+            finally:
+                self.open_connections -= 1
+
+        return await call_with_retry(self.breakers.get(endpoint), endpoint, _tracked, policy, deadline)
+
+    async def stats(self) -> dict:
+        """Snapshot of runtime load, taken on the loop thread."""
+        depths = self.queue.depths()
+        return {
+            "tasks": len(asyncio.all_tasks()) - 1,
+            "connections": self.open_connections,
+            "queued": sum(depths.values()),
+            "max_depth": max(depths.values(), default=0),
+            "busy_devices": len(self.queue.active()),
+            "offline": len(self.breakers.open_endpoints()),
+            "sessions": len(self.sessions) if self.sessions is not None else 0,
+        }
+
+    async def call_mdc(self, ip: str, port: int, display_id: int, worker, policy: RetryPolicy = UNSAFE_RETRY,
+                       overrides: dict | None = None, deadline: Deadline | None = None):
+        """Run an MDC worker with adaptive timeouts.
+
+        ``overrides`` may pin ``"connect"`` and/or ``"command"`` timeouts (in
+        seconds) for slow operations; ``deadline`` caps both for batch jobs.
+        """
+        timing = self.timeouts.get(ip, port)
+        overrides = overrides or {}
+
+        execute = self.sessions.execute if self.sessions is not None else execute_mdc
+
+        async def _attempt():
+            return await execute(
+                ip, port, display_id, worker, timing,
+                connect_timeout=timing.connect_timeout(overrides.get("connect"), deadline),
+                command_timeout=timing.command_timeout(overrides.get("command"), deadline),
+            )
+
+        return await self.call(ip, port, _attempt, policy, deadline)
+
+    async def call_smart_tv(self, ip: str, port: int, worker, policy: RetryPolicy = UNSAFE_RETRY,
+                            overrides: dict | None = None, deadline: Deadline | None = None):
+        """Await a Smart TV ``worker(tv)`` (an :class:`smart_tv.AsyncSmartTV`) with the adaptive command timeout."""
+        timing = self.timeouts.get(ip, port)
+        timeout = timing.command_timeout((overrides or {}).get("command"), deadline)
+        return await self.call(ip, port, lambda: execute_smart_tv(worker, ip, port, timeout), policy, deadline)
+
+    async def probe(self, ip: str, port: int, timeout: float | None = None, fail_fast: bool = True) -> bool:
+        """TCP reachability check that feeds the breaker and the RTT estimator.
+
+        With ``fail_fast`` an open breaker answers ``False`` without a connect
+        attempt; operator-initiated probes pass ``False`` to always try.
+        ``timeout`` overrides the adaptive connect timeout.
+        """
+        breaker = self.breakers.get(endpoint_key(ip, port))
+        timing = self.timeouts.get(ip, port)
+        if fail_fast and not breaker.allow():
+            return False
+
+        start = time.perf_counter()
+        try:
+            await open_probe(ip, port, timing.connect_timeout(timeout))
+        except Exception as exc:
+            if isinstance(exc, TimeoutError):
+                timing.connect.backoff()
+            breaker.record_failure()
+            return False
+        except BaseException:
+            breaker.release_trial()
+            raise
+        timing.connect.sample(time.perf_counter() - start)
+        breaker.record_success()
+        return True
+
+    def submit_mdc(self, ip: str, port: int, display_id: int, worker, priority: int = PRIORITY_INTERACTIVE,
+                   supersede_key: str | None = None, policy: RetryPolicy = UNSAFE_RETRY,
+                   overrides: dict | None = None, deadline: Deadline | None = None):
+        return self.submit(
+            device_key(ip, port, display_id),
+            lambda: self.call_mdc(ip, port, display_id, worker, policy, overrides, deadline),
+            priority,
+            supersede_key,
+        )
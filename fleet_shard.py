@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from pathlib import Path
+
+from command_queue import PRIORITY_BACKGROUND
+from devices import load_saved_devices
+from operations import Operation, OperationError, run_operation, to_jsonable
+from resilience import is_transient
+
+DEFAULT_CONCURRENCY = 256
+MIN_SHARD_SIZE = 64
+BATCH_SIZE = 64
+BATCH_INTERVAL = 0.2
+POLL_INTERVAL = 1.0
+
+
+def _capture_row(ip: str, image: bytes, capture_dir: Path, analyze: bool) -> dict:
+    """Save a capture the way the dashboard names them, so the gallery picks it up; optionally classify it."""
+    capture_dir.mkdir(parents=True, exist_ok=True)
+    path = capture_dir / f"screenshot_{ip.replace('.', '_')}_{time.strftime('%Y%m%d_%H%M%S')}.jpg"
+    path.write_bytes(image)
+    result = {"path": str(path), "bytes": len(image)}
+    if analyze:
+        from screen_analysis import analyze_capture, classify
+
+        features = analyze_capture(image)
+        result.update(state=classify(features), mean=round(features["mean"], 1), std=round(features["std"], 1))
+    return result
+
+
+def _run_shard(items: list[tuple[int, dict]], operation: Operation, options: dict, results) -> None:
+    from fleet_runtime import FleetRuntime
+
+    runtime = FleetRuntime(keepalive=options["keepalive"])
+    limit = asyncio.Semaphore(options["concurrency"])
+    capture_dir = Path(options["capture_dir"]) if options.get("capture_dir") else None
+    batch: list[tuple[int, dict]] = []
+    flushed = time.monotonic()
+
+    def _flush() -> None:
+        nonlocal flushed
+        if batch:
+            results.put(list(batch))
+            batch.clear()
+        flushed = time.monotonic()
+
+    async def _one(index: int, device: dict) -> None:
+        async with limit:
+            start = time.perf_counter()
+            try:
+                result = await run_operation(runtime, device, operation, PRIORITY_BACKGROUND)
+                if capture_dir is not None and isinstance(result, (bytes, bytearray)):
+                    # Decoding and writing captures here keeps them off the coordinating process.
+                    result = await asyncio.to_thread(_capture_row, device["ip"], bytes(result), capture_dir,
+                                                     options["analyze"])
+                row = {"device": device["ip"], "ok": True, "result": to_jsonable(result)}
+            except Exception as exc:
+                row = {"device": device["ip"], "ok": False, "error": str(exc) or exc.__class__.__name__,
+                       "transient": is_transient(exc)}
+            row["elapsed_ms"] = int((time.perf_counter() - start) * 1000)
+        batch.append((index, row))
+        if len(batch) >= BATCH_SIZE or time.monotonic() - flushed >= BATCH_INTERVAL:
+            _flush()
+
+    async def _all() -> None:
+        await asyncio.gather(*(_one(index, device) for index, device in items))
+        if runtime.sessions is not None:
+            await runtime.sessions.close()
+
+    try:
+        runtime.run(_all()).result()
+    finally:
+        _flush()
+        runtime.loop.call_soon_threadsafe(runtime.loop.stop)
+
+
+def _shard_main(shard: int, items: list[tuple[int, dict]], operation: dict, options: dict, results) -> None:
+    """Entry point of a shard process: its own runtime (event loop, queues, breakers, connection pool)."""
+    try:
+        _run_shard(items, Operation(operation["command"], operation["args"]), options, results)
+    finally:
+        results.put((shard, None))
+
+
+class ShardedFleet:
+    """Runs one operation over a large device list in several processes.
+
+    The devices are dealt round-robin to up to ``workers`` shard processes
+    (never fewer than ``MIN_SHARD_SIZE`` devices per shard), so every shard
+    gets a similar mix of fast and slow sites. Each shard runs its own
+    :class:`fleet_runtime.FleetRuntime` with up to ``concurrency`` devices in
+    flight, and with ``keepalive`` keeps its MDC connections open between
+    commands. Rows come back in batches and :meth:`run` yields them in input
+    order as soon as each one and all before it have arrived, holding only
+    the out-of-order rows in memory.
+
+    Shards do not share the dashboard's or the daemon's command queues and
+    circuit breakers, so a sharded job should not run alongside other
+    commands to the same devices. With ``capture_dir``, ``screen_capture``
+    results are written there by the shard (``analyze`` also classifies the
+    frame) and the row carries the file path instead of the image.
+    """
+
+    def __init__(self, workers: int | None = None, concurrency: int = DEFAULT_CONCURRENCY, keepalive: float = 0.0,
+                 capture_dir: Path | None = None, analyze: bool = False):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.options = {"concurrency": max(1, concurrency), "keepalive": keepalive,
+                        "capture_dir": str(capture_dir) if capture_dir else None, "analyze": analyze}
+
+    def shard_count(self, devices: int) -> int:
+        return max(1, min(self.workers, math.ceil(devices / MIN_SHARD_SIZE)))
+
+    def run(self, devices: list[dict], operation: Operation):
+        """Yield one result row per device, in the order of ``devices``."""
+        operation.validate()
+        shards = self.shard_count(len(devices))
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        outstanding: list[dict[int, str]] = []
+        processes = []
+        for shard in range(shards):
+            items = [(index, devices[index]) for index in range(shard, len(devices), shards)]
+            outstanding.append({index: device["ip"] for index, device in items})
+            process = context.Process(target=_shard_main, name=f"fleet-shard-{shard}", daemon=True,
+                                      args=(shard, items, operation.to_dict(), self.options, results))
+            process.start()
+            processes.append(process)
+
+        arrived: dict[int, dict] = {}
+        next_index = 0
+        running = set(range(shards))
+        try:
+            while running:
+                try:
+                    message = results.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    for shard in list(running):
+                        if not processes[shard].is_alive():
+                            # Died without its final message (killed, out of memory): fail what it still owed.
+                            running.discard(shard)
+                            self._fail_rest(outstanding[shard], arrived, processes[shard].exitcode)
+                    message = None
+                if isinstance(message, tuple):
+                    shard = message[0]
+                    running.discard(shard)
+                    processes[shard].join()
+                    self._fail_rest(outstanding[shard], arrived, processes[shard].exitcode)
+                elif message:
+                    for index, row in message:
+                        outstanding[index % shards].pop(index, None)
+                        arrived[index] = row
+                while next_index in arrived:
+                    yield arrived.pop(next_index)
+                    next_index += 1
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+
+    @staticmethod
+    def _fail_rest(owed: dict[int, str], arrived: dict[int, dict], exitcode: int | None) -> None:
+        for index, ip in owed.items():
+            arrived[index] = {"device": ip, "ok": False, "error": f"Shard process exited with code {exitcode}",
+                              "transient": True}
+        owed.clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run one operation over many saved devices in several processes")
+    parser.add_argument("command", help="Operation, e.g. status, volume, screen_capture")
+    parser.add_argument("args", nargs="*", help="Operation arguments (JSON values, or plain strings)")
+    parser.add_argument("--site", action="append", help="Only devices of this site (repeatable)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Shard processes")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Devices in flight per shard")
+    parser.add_argument("--keepalive", type=float, default=0.0, help="Keep MDC connections open this long (s)")
+    parser.add_argument("--capture-dir", type=Path, help="Save screen_capture images here instead of returning them")
+    parser.add_argument("--analyze", action="store_true", help="Classify captures (black / no signal)")
+    parser.add_argument("--out", type=Path, help="Write JSON Lines here instead of stdout")
+    args = parser.parse_args()
+
+    values = []
+    for value in args.args:
+        try:
+            values.append(json.loads(value))
+        except ValueError:
+            values.append(value)
+    try:
+        operation = Operation(args.command, values)
+        operation.validate()
+    except OperationError as exc:
+        parser.error(str(exc))
+    devices = load_saved_devices()
+    if args.site:
+        devices = [device for device in devices if device["site"] in args.site]
+    if not devices:
+        parser.error("No saved devices match")
+
+    fleet = ShardedFleet(args.workers, args.concurrency, args.keepalive, args.capture_dir, args.analyze)
+    out = args.out.open("w", encoding="utf-8") if args.out else sys.stdout
+    ok = 0
+    start = time.perf_counter()
+    try:
+        for row in fleet.run(devices, operation):
+            ok += row["ok"]
+            out.write(json.dumps(row) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{ok}/{len(devices)} OK in {time.perf_counter() - start:.1f}s over "
+          f"{fleet.shard_count(len(devices))} shard(s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -1,3 +1,7 @@
+import startup_timing  # noqa: F401 -- first import: starts the startup clock for the timing report
+
+import argparse
+import multiprocessing
 import os
 import sys
 import subprocess
@@ -45,5 +49,14 @@ def create_desktop_shortcut():
 
 
 if __name__ == "__main__":
+    # Screen watch analyses captures in a process pool; frozen executables need this on Windows.
+    multiprocessing.freeze_support()
+    parser = argparse.ArgumentParser(description="Samsung MDC dashboard")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the session (cProfile + asyncio task timing); report written to Documents/SamsungMDC/profiles on exit",
+    )
+    args, _ = parser.parse_known_args()
     create_desktop_shortcut()
-    main()
+    main(profile=args.profile)
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import threading
+import time
+
+from audit_log import AUDIT
+from command_queue import PRIORITY_BACKGROUND
+from devices import load_saved_devices, resolve_protocol
+from fault_proxy import PROFILES, ProxyGroup
+from fleet_runtime import FleetRuntime
+from operations import Operation, run_operation
+
+# python-samsung-mdc's STATUS reply: power on, volume 25, unmuted, HDMI1, 16:9, no N/A fields.
+_STATUS_REPLY = bytes([1, 25, 0, 0x21, 0x10, 0, 0])
+
+
+async def _simulated_panel(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Minimal MDC panel: ACKs every frame, answering STATUS with fixed values and other commands with their data."""
+    from samsung_mdc.connection import pack_response
+
+    try:
+        while True:
+            header = await reader.readexactly(4)
+            data = await reader.readexactly(header[3] + 1)
+            command, display_id = header[1], header[2]
+            payload = _STATUS_REPLY if command == 0x00 else (data[:-1] or bytes([50]))
+            writer.write(pack_response(command, display_id, True, payload))
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+class SimulatedPanels:
+    """``count`` MDC panels on consecutive ports of 127.0.0.1, on a background loop."""
+
+    def __init__(self, count: int):
+        self.count = count
+        self.targets: list[tuple[str, int]] = []
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="simulated-panels", daemon=True).start()
+
+    def start(self) -> "SimulatedPanels":
+        async def _start():
+            for _ in range(self.count):
+                server = await asyncio.start_server(_simulated_panel, "127.0.0.1", 0)
+                self.targets.append(server.sockets[0].getsockname()[:2])
+
+        asyncio.run_coroutine_threadsafe(_start(), self.loop).result()
+        return self
+
+
+def _percentile(values: list[float], share: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def _rounds(runtime: FleetRuntime, devices: list[dict], operation: Operation, rounds: int) -> dict:
+    latencies, errors = [], {}
+
+    async def _one(device: dict) -> None:
+        start = time.perf_counter()
+        try:
+            await run_operation(runtime, device, operation, PRIORITY_BACKGROUND)
+        except Exception as exc:
+            name = exc.__class__.__name__
+            errors[name] = errors.get(name, 0) + 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(_one(device) for device in devices))
+    return {"wall_s": time.perf_counter() - start, "latencies": latencies, "errors": errors}
+
+
+def run_benchmark(targets: list[tuple[str, int, int]], operation: Operation, profile: str, rounds: int,
+                  keepalive: float) -> dict:
+    """``rounds`` of ``operation`` on every target (ip, port, display id) through a proxy with ``profile``."""
+    proxies = ProxyGroup.in_front_of([(ip, port) for ip, port, _ in targets], profile).start()
+    runtime = FleetRuntime(keepalive=keepalive)
+    try:
+        mapping = proxies.mapping()
+        devices = []
+        for ip, port, display_id in targets:
+            proxy_ip, proxy_port = mapping[(ip, port)]
+            devices.append({"ip": proxy_ip, "port": proxy_port, "id": display_id, "protocol": "SIGNAGE_MDC"})
+        result = runtime.run(_rounds(runtime, devices, operation, rounds)).result()
+    finally:
+        if runtime.sessions is not None:
+            runtime.run(runtime.sessions.close()).result()
+        runtime.loop.call_soon_threadsafe(runtime.loop.stop)
+        proxies.stop()
+    latencies = result["latencies"]
+    return {
+        "profile": profile,
+        "keepalive": keepalive,
+        "ops": rounds * len(targets),
+        "ok": len(latencies),
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "wall_s": result["wall_s"],
+        "connections": proxies.totals()["connections"],
+        "errors": result["errors"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure how MDC operations degrade over slow or lossy links")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--simulate", type=int, metavar="N", help="Use N simulated panels")
+    target.add_argument("--site", help="Saved MDC devices of this site")
+    target.add_argument("--devices", nargs="+", metavar="IP", help="These saved MDC devices")
+    parser.add_argument("--operation", default="status", help="Command to run (a read; default status)")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--profiles", nargs="+", default=["lan", "vpn", "bad-vpn"], choices=list(PROFILES))
+    parser.add_argument("--keepalive", type=float, default=20.0,
+                        help="Also run with MDC connections kept open this long (0 = only a connection per command)")
+    args = parser.parse_args()
+
+    operation = Operation(args.operation)
+    if not operation.is_read:
+        parser.error("Only reads are benchmarked; a SET would change the panels")
+    # Every frame goes to a local proxy port, never straight to the panel: keep benchmarks out of the audit log.
+    AUDIT.enabled = False
+    if args.simulate:
+        targets = [(ip, port, 0) for ip, port in SimulatedPanels(args.simulate).start().targets]
+    else:
+        saved = [device for device in load_saved_devices()
+                 if resolve_protocol(device["protocol"], device["port"]) == "SIGNAGE_MDC"
+                 and (device["site"] == args.site if args.site else device["ip"] in args.devices)]
+        if not saved:
+            parser.error("No saved MDC devices match")
+        targets = [(device["ip"], int(device["port"]), int(device["id"])) for device in saved]
+
+    print(f"{args.rounds} x {operation} on {len(targets)} panel(s)")
+    print(f"{'profile':<9} {'keepalive':>9} {'ok':>9} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'wall s':>7} "
+          f"{'conns':>6}  errors")
+    for profile in args.profiles:
+        for keepalive in ([0.0, args.keepalive] if args.keepalive > 0 else [0.0]):
+            row = run_benchmark(targets, operation, profile, args.rounds, keepalive)
+            errors = ", ".join(f"{name} x{count}" for name, count in sorted(row["errors"].items()))
+            print(f"{row['profile']:<9} {row['keepalive']:>9.0f} {row['ok']:>4}/{row['ops']:<4} "
+                  f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['max_ms']:>8.1f} {row['wall_s']:>7.2f} "
+                  f"{row['connections']:>6}  {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import base64
+import enum
+import time
+
+from command_queue import PRIORITY_INTERACTIVE, device_key
+from devices import resolve_protocol
+from resilience import READ_RETRY, SET_RETRY, UNSAFE_RETRY, RetryPolicy
+from timeouts import Deadline
+
+# Absolute SETs: sending the same value twice is harmless, so they retry like reads.
+ABSOLUTE_SETS = {"volume", "brightness", "input_source"}
+COMMAND_TIMEOUTS = {"screen_capture": 20.0}
+
+# Operations that are not a single MDC command, available on both protocols.
+STATUS = "status"
+REBOOT = "reboot"
+KEY = "key"
+KEYS = "keys"
+SPECIAL_COMMANDS = {STATUS, REBOOT, KEY, KEYS}
+
+
+class OperationError(ValueError):
+    """An operation spec that is malformed or cannot run on the target device."""
+
+
+class Operation:
+    """A device command as plain data, so it can be sent over HTTP, stored and replayed.
+
+    ``{"command": "volume", "args": [30]}`` sets the volume; the same command
+    without ``args`` reads it. ``command`` is any python-samsung-mdc command
+    name or one of ``status``, ``reboot``, ``key`` (``[key, times]``) and
+    ``keys`` (a key sequence), which also work on Smart TVs.
+    """
+
+    __slots__ = ("command", "args")
+
+    def __init__(self, command: str, args=()):
+        self.command = str(command).strip().lower()
+        self.args = tuple(args)
+
+    @classmethod
+    def from_dict(cls, data) -> "Operation":
+        if not isinstance(data, dict) or not str(data.get("command", "")).strip():
+            raise OperationError('An operation needs a "command"')
+        args = data.get("args", [])
+        if not isinstance(args, (list, tuple)):
+            args = [args]
+        operation = cls(data["command"], args)
+        operation.validate()
+        return operation
+
+    def to_dict(self) -> dict:
+        return {"command": self.command, "args": list(self.args)}
+
+    def __repr__(self) -> str:
+        return f"Operation({self.command!r}, {list(self.args)!r})"
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Operation) and (self.command, self.args) == (other.command, other.args)
+
+    def __hash__(self) -> int:
+        return hash((self.command, self.args))
+
+    def validate(self) -> None:
+        if self.command in (KEY, KEYS):
+            if not self.args or not all(isinstance(key, str) for key in self.args[:1 if self.command == KEY else None]):
+                raise OperationError(f"{self.command} needs key name(s), e.g. KEY_HOME")
+            return
+        if self.command in SPECIAL_COMMANDS or self.command == "screen_capture":
+            return
+
+        from samsung_mdc import MDC
+
+        command = MDC._commands.get(self.command)
+        if command is None:
+            raise OperationError(f"Unknown command: {self.command}")
+        if self.is_read and not command.GET:
+            raise OperationError(f"{self.command} does not support GET (read)")
+        if not self.is_read and not command.SET:
+            raise OperationError(f"{self.command} does not support SET (write)")
+
+    @property
+    def is_read(self) -> bool:
+        if self.command in (STATUS, "screen_capture"):
+            return True
+        if self.command in SPECIAL_COMMANDS:
+            return False
+        return not self.args
+
+    def policy(self) -> RetryPolicy:
+        if self.is_read:
+            return READ_RETRY
+        if self.command in ABSOLUTE_SETS:
+            return SET_RETRY
+        return UNSAFE_RETRY
+
+    def supersede_key(self) -> str | None:
+        """Queued SETs of the same command replace each other, as in the dashboard."""
+        if self.is_read or self.command in SPECIAL_COMMANDS:
+            return None
+        if self.command == "timer_15":
+            return f"{self.command}:{self.args[0]}"
+        return self.command
+
+    def timeout_overrides(self) -> dict | None:
+        timeout = COMMAND_TIMEOUTS.get(self.command)
+        return {"command": timeout} if timeout else None
+
+    async def run_mdc(self, mdc, display_id: int):
+        if self.command == STATUS:
+            return await mdc.status(display_id)
+        if self.command == REBOOT:
+            return await mdc.power(display_id, ("REBOOT",))
+        if self.command == KEY:
+            key, times = self.args[0], int(self.args[1]) if len(self.args) > 1 else 1
+            for _ in range(max(1, times)):
+                await mdc.virtual_remote(display_id, (key,))
+            return None
+        if self.command == KEYS:
+            for key in self.args:
+                await mdc.virtual_remote(display_id, (key,))
+            return None
+        if self.command == "screen_capture" and not hasattr(mdc, "screen_capture"):
+            raise OperationError("screen_capture is not supported by this python-samsung-mdc version or device.")
+
+        method = getattr(mdc, self.command)
+        if self.is_read:
+            return await method(display_id)
+        return await method(display_id, self.args)
+
+    async def run_smart_tv(self, tv):
+        if self.command == STATUS:
+            # Unlike the dashboard's status button, an unanswered REST call is a failure here.
+            return await tv.rest_device_info()
+        if self.command == REBOOT:
+            return await tv.send_key("KEY_POWER")
+        if self.command == KEY:
+            return await tv.send_keys(self.args[0], times=int(self.args[1]) if len(self.args) > 1 else 1)
+        if self.command == KEYS:
+            return await tv.send_sequence(list(self.args))
+        raise OperationError(f"{self.command} is not available on Smart TV WebSocket API.")
+
+
+async def run_operation(runtime, device: dict, operation: Operation, priority: int = PRIORITY_INTERACTIVE,
+                        deadline: Deadline | None = None):
+    """Queue ``operation`` on ``device``'s command queue; must be awaited on the runtime loop.
+
+    ``device`` has the saved-devices shape (``ip``, ``port``, ``id``, ``protocol``).
+    """
+    ip, port, display_id = device["ip"], int(device["port"]), int(device["id"])
+    policy = operation.policy()
+    overrides = operation.timeout_overrides()
+    if resolve_protocol(device.get("protocol", "AUTO"), port) == "SIGNAGE_MDC":
+        factory = lambda: runtime.call_mdc(ip, port, display_id, operation.run_mdc, policy, overrides, deadline)
+    else:
+        if operation.command not in SPECIAL_COMMANDS:
+            raise OperationError(f"{operation.command} is not available on Smart TV WebSocket API.")
+        factory = lambda: runtime.call_smart_tv(ip, port, operation.run_smart_tv, policy, overrides, deadline)
+    return await runtime.queue.submit(device_key(ip, port, display_id), factory, priority, operation.supersede_key())
+
+
+def to_jsonable(value):
+    """MDC results (enums, tuples, bytes, times) as JSON-ready values; bytes become ``{"base64": ...}``."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value.name if isinstance(value, enum.Enum) else value
+    if isinstance(value, enum.Enum):
+        return value.name
+    if isinstance(value, (bytes, bytearray)):
+        return {"base64": base64.b64encode(bytes(value)).decode("ascii")}
+    if isinstance(value, dict):
+        return {str(key): to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, time.struct_time):
+        return time.strftime("%Y-%m-%dT%H:%M:%S", value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
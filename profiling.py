@@ -0,0 +1,129 @@
+import asyncio
+import cProfile
+import io
+import pstats
+import threading
+import time
+from pathlib import Path
+
+PROFILE_DIR = Path.home() / "Documents" / "SamsungMDC" / "profiles"
+
+
+class TaskTimer:
+    """Wall time of every asyncio task, grouped by coroutine name, via the loop's task factory."""
+
+    def __init__(self):
+        self.totals: dict[str, list] = {}  # name -> [count, total seconds, max seconds]
+
+    def install(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Must run on ``loop``'s thread."""
+        previous = loop.get_task_factory()
+
+        def _factory(loop, coro, **kwargs):
+            if previous is not None:
+                task = previous(loop, coro, **kwargs)
+            else:
+                task = asyncio.Task(coro, loop=loop, **kwargs)
+            name = getattr(coro, "__qualname__", type(coro).__name__)
+            started = time.perf_counter()
+            task.add_done_callback(lambda _: self._record(name, time.perf_counter() - started))
+            return task
+
+        loop.set_task_factory(_factory)
+        self._restore = lambda: loop.set_task_factory(previous)
+
+    def uninstall(self) -> None:
+        restore = getattr(self, "_restore", None)
+        if restore:
+            restore()
+
+    def _record(self, name: str, seconds: float) -> None:
+        entry = self.totals.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+    def report(self, limit: int = 30) -> str:
+        rows = sorted(self.totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        lines = [f"{'count':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9}  task"]
+        for name, (count, total, longest) in rows:
+            lines.append(f"{count:>7} {total:>9.3f} {total / count * 1000:>9.1f} {longest * 1000:>9.1f}  {name}")
+        return "\n".join(lines)
+
+
+class SessionProfiler:
+    """cProfile plus asyncio task timing for a session or a single operator action.
+
+    cProfile only sees the thread that enables it, so each attached event loop
+    running on another thread (the dashboard's fleet runtime) gets its own
+    profile on that thread; the stats are merged into one report on
+    :meth:`stop`. Worker threads from ``asyncio.to_thread`` are not profiled.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.profile = cProfile.Profile()
+        self.tasks = TaskTimer()
+        self._loop_profiles: list[tuple[asyncio.AbstractEventLoop, cProfile.Profile]] = []
+        self._started = 0.0
+
+    def start(self, loops=()) -> None:
+        self._started = time.perf_counter()
+        for loop in loops:
+            self.attach_loop(loop)
+        self.profile.enable()
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        if _running_loop() is loop:
+            self.tasks.install(loop)
+            return
+        profile = cProfile.Profile()
+        self._loop_profiles.append((loop, profile))
+
+        def _attach():
+            self.tasks.install(loop)
+            profile.enable()
+
+        loop.call_soon_threadsafe(_attach)
+
+    def stop(self) -> Path:
+        """Stop profiling and write ``<name>_<timestamp>.prof`` (pstats) and a ``.txt`` report; returns the report."""
+        self.profile.disable()
+        elapsed = time.perf_counter() - self._started
+        for loop, profile in self._loop_profiles:
+            done = threading.Event()
+
+            def _detach(profile=profile, done=done):
+                profile.disable()
+                self.tasks.uninstall()
+                done.set()
+
+            loop.call_soon_threadsafe(_detach)
+            done.wait(5)
+        if not self._loop_profiles:
+            self.tasks.uninstall()
+
+        stats = pstats.Stats(self.profile)
+        for _, profile in self._loop_profiles:
+            stats.add(profile)
+
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        base = PROFILE_DIR / f"{self.name}_{time.strftime('%Y%m%d_%H%M%S')}"
+        stats.dump_stats(str(base.with_suffix(".prof")))
+
+        text = io.StringIO()
+        text.write(f"{self.name}: {elapsed:.2f}s profiled\n\n")
+        stats.stream = text
+        stats.sort_stats("cumulative").print_stats(40)
+        text.write("\nasyncio tasks by total wall time\n")
+        text.write(self.tasks.report() + "\n")
+        report_path = base.with_suffix(".txt")
+        report_path.write_text(text.getvalue(), encoding="utf-8")
+        return report_path
+
+
+def _running_loop():
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
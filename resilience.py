@@ -0,0 +1,218 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+
+from timeouts import Deadline, DeadlineExceeded
+
+# Exception class names from the websocket / samsungtvws stacks that mean "could not reach the TV".
+_TRANSIENT_NAMES = {
+    "ConnectionFailure",
+    "WebSocketTimeoutException",
+    "WebSocketConnectionClosedException",
+    "WebSocketAddressException",
+    "HttpApiError",
+}
+
+
+class DeviceConnectError(ConnectionError):
+    """Opening the connection failed, so nothing was sent to the device."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The device is known to be down; the call was rejected without touching the network."""
+
+
+def _chain(exc: BaseException):
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__
+
+
+def is_unauthorized(exc: BaseException) -> bool:
+    """True when a Smart TV refused the remote connection (``ms.channel.unauthorized``)."""
+    return any(type(item).__name__ == "UnauthorizedError" or "ms.channel.unauthorized" in str(item)
+               for item in _chain(exc))
+
+
+def is_nak(exc: BaseException) -> bool:
+    """True when an MDC display answered and refused the command (NAK)."""
+    return any(type(item).__name__ == "NAKError" for item in _chain(exc))
+
+
+def is_transient(exc: BaseException) -> bool:
+    """True when the failure looks like the network/device being unavailable, not a rejected command.
+
+    A Smart TV refusing the remote is not: retrying would only put up another
+    "Allow" prompt on the TV.
+    """
+    if is_unauthorized(exc):
+        return False
+    for item in _chain(exc):
+        if isinstance(item, CircuitOpenError):
+            return False
+        if isinstance(item, OSError) or type(item).__name__ in _TRANSIENT_NAMES:
+            return True
+    return False
+
+
+def is_offline(exc: BaseException) -> bool:
+    """True when the device could not be reached, including calls rejected by an open circuit breaker."""
+    return any(isinstance(item, CircuitOpenError) for item in _chain(exc)) or is_transient(exc)
+
+
+def nothing_sent(exc: BaseException) -> bool:
+    return any(isinstance(item, DeviceConnectError) for item in _chain(exc))
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how patiently to retry one call.
+
+    ``idempotent`` calls (reads, absolute SETs) are retried after any transient
+    failure. Other calls (REBOOT, key presses, arbitrary CLI SETs) are only
+    retried when the connection could not be opened, since the command may
+    already have reached the panel otherwise.
+    """
+
+    attempts: int = 3
+    idempotent: bool = True
+    base_delay: float = 0.25
+    max_delay: float = 4.0
+
+    def should_retry(self, exc: BaseException, attempt: int) -> bool:
+        if attempt + 1 >= self.attempts or not is_transient(exc):
+            return False
+        return self.idempotent or nothing_sent(exc)
+
+    def backoff(self, attempt: int) -> float:
+        """Exponential backoff with equal jitter: half fixed, half random."""
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return cap / 2 + random.uniform(0, cap / 2)
+
+
+READ_RETRY = RetryPolicy(attempts=3, idempotent=True)
+SET_RETRY = RetryPolicy(attempts=3, idempotent=True)
+UNSAFE_RETRY = RetryPolicy(attempts=2, idempotent=False)
+NO_RETRY = RetryPolicy(attempts=1)
+
+
+class CircuitBreaker:
+    """Closed -> open after ``threshold`` consecutive transient failures -> half-open after a cool-down.
+
+    While open every call is rejected immediately. Once the cool-down has
+    passed a single trial call is let through; success closes the breaker,
+    failure re-opens it with a doubled cool-down (capped at ``max_reset``).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold: int = 3, reset_timeout: float = 15.0, max_reset: float = 300.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset = max_reset
+        self.state = self.CLOSED
+        self.failures = 0
+        self._cooldown = reset_timeout
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    def retry_in(self) -> float:
+        return max(0.0, self._opened_at + self._cooldown - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and self.retry_in() <= 0:
+            self.state = self.HALF_OPEN
+            self._trial_running = False
+        if self.state == self.HALF_OPEN and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def release_trial(self) -> None:
+        """End a half-open trial that gave no verdict (deadline hit or cancelled), so the next call can try."""
+        self._trial_running = False
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self._cooldown = self.reset_timeout
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self._cooldown = min(self.max_reset, self._cooldown * 2)
+            self._open()
+        elif self.state == self.CLOSED and self.failures >= self.threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._trial_running = False
+
+
+class BreakerRegistry:
+    def __init__(self, threshold: int = 3, reset_timeout: float = 15.0, max_reset: float = 300.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset = max_reset
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, endpoint: str) -> CircuitBreaker:
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(self.threshold, self.reset_timeout, self.max_reset)
+        return breaker
+
+    def open_endpoints(self) -> list[str]:
+        return [endpoint for endpoint, breaker in self._breakers.items() if breaker.state != CircuitBreaker.CLOSED]
+
+
+async def call_with_retry(breaker: CircuitBreaker, endpoint: str, factory, policy: RetryPolicy = UNSAFE_RETRY,
+                          deadline: Deadline | None = None):
+    """Await ``factory()`` under ``breaker``, retrying transient failures per ``policy``.
+
+    With a ``deadline`` no attempt starts, and no backoff sleeps, past it.
+    """
+    attempt = 0
+    while True:
+        if deadline is not None and deadline.expired():
+            raise DeadlineExceeded(f"{endpoint}: batch deadline of {deadline.seconds:.0f}s exceeded.")
+        if not breaker.allow():
+            raise CircuitOpenError(
+                f"{endpoint} is marked offline after {breaker.failures} failed attempts; "
+                f"next check in {breaker.retry_in():.1f}s."
+            )
+        try:
+            result = await factory()
+        except DeadlineExceeded:
+            breaker.release_trial()
+            raise
+        except Exception as exc:
+            if is_transient(exc):
+                breaker.record_failure()
+            else:
+                # The device answered (NAK, bad value, unsupported command): it is alive.
+                breaker.record_success()
+            if not policy.should_retry(exc, attempt):
+                raise
+            delay = policy.backoff(attempt)
+            if deadline is not None and delay >= deadline.remaining():
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        except BaseException:
+            # Cancelled mid-call: says nothing about the device.
+            breaker.release_trial()
+            raise
+        breaker.record_success()
+        return result
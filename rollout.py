@@ -0,0 +1,259 @@
+import argparse
+import asyncio
+import math
+import time
+
+from command_queue import PRIORITY_BACKGROUND
+from devices import load_saved_devices
+from operations import REBOOT, SPECIAL_COMMANDS, STATUS, Operation, run_operation, to_jsonable
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_MAX_FAILURE_RATE = 0.1
+REBOOT_SETTLE_SECONDS = 30.0
+REBOOT_VERIFY_TIMEOUT = 300.0
+ONLINE_POLL_SECONDS = 5.0
+
+STAGE_APPLY = "apply"
+STAGE_VERIFY = "verify"
+
+
+def plan_waves(devices: list[dict], canary: int | list[str] = 1, wave_size: int | None = None,
+               wave_percent: float | None = None) -> list[list[dict]]:
+    """Split ``devices`` into a canary wave and then equal waves.
+
+    ``canary`` is a device count or a list of IPs. Later waves hold
+    ``wave_size`` devices, or ``wave_percent`` of the remaining devices
+    (default 25%), at least one each.
+    """
+    remaining = list(devices)
+    waves = []
+    if isinstance(canary, (list, tuple)):
+        wanted = set(canary)
+        first = [device for device in remaining if device["ip"] in wanted]
+        remaining = [device for device in remaining if device["ip"] not in wanted]
+    else:
+        first, remaining = remaining[:canary], remaining[canary:]
+    if first:
+        waves.append(first)
+
+    if wave_size is None:
+        wave_size = math.ceil(len(remaining) * (wave_percent or 25) / 100)
+    wave_size = max(1, wave_size)
+    waves.extend(remaining[idx:idx + wave_size] for idx in range(0, len(remaining), wave_size))
+    return waves
+
+
+def _normalized(values) -> list[str]:
+    return [str(value).strip().upper() for value in to_jsonable(list(values))]
+
+
+class Rollout:
+    """Applies one operation to many devices in waves, verifying each wave before the next.
+
+    Every device in a wave is applied and then verified as soon as its own
+    command finishes, with up to ``concurrency`` devices in flight. SETs are
+    verified by reading the same command back and comparing it with the
+    values sent. Commands without a read (remote keys) just need the panel to
+    answer ``status`` afterwards. Reboots wait ``settle_seconds`` and then
+    poll until the panel answers again.
+
+    The canary wave must succeed completely. A later wave that fails on more
+    than ``max_failure_rate`` of its devices aborts the rollout and later
+    waves are never touched. Within a wave, devices not yet started are
+    skipped as soon as the failure limit is exceeded; commands already sent
+    are allowed to finish, so no panel is left in an unknown state.
+    """
+
+    def __init__(self, runtime, devices: list[dict], operation: Operation, canary: int | list[str] = 1,
+                 wave_size: int | None = None, wave_percent: float | None = None,
+                 max_failure_rate: float = DEFAULT_MAX_FAILURE_RATE, concurrency: int = DEFAULT_CONCURRENCY,
+                 settle_seconds: float | None = None, verify_timeout: float | None = None,
+                 pause_seconds: float = 0.0, on_event=None):
+        self.runtime = runtime
+        self.operation = operation
+        self.waves = plan_waves(devices, canary, wave_size, wave_percent)
+        self.max_failure_rate = max_failure_rate
+        self.concurrency = max(1, concurrency)
+        is_reboot = operation.command == REBOOT or (operation.command == "power" and
+                                                    _normalized(operation.args) == ["REBOOT"])
+        self.settle_seconds = settle_seconds if settle_seconds is not None else (
+            REBOOT_SETTLE_SECONDS if is_reboot else 0.0)
+        self.verify_timeout = verify_timeout if verify_timeout is not None else (
+            REBOOT_VERIFY_TIMEOUT if is_reboot else 0.0)
+        self.read_back = None if is_reboot else self._read_back_operation(operation)
+        self.pause_seconds = pause_seconds
+        self.on_event = on_event
+        self.status = "pending"
+        self.reason = None
+        self.results: list[dict] = []
+        self._cancelled = False
+
+    @staticmethod
+    def _read_back_operation(operation: Operation) -> Operation | None:
+        if operation.is_read or operation.command in SPECIAL_COMMANDS:
+            return None
+        from samsung_mdc import MDC
+
+        command = MDC._commands.get(operation.command)
+        return Operation(operation.command) if command is not None and command.GET else None
+
+    def _emit(self, event_type: str, **fields) -> None:
+        if self.on_event is not None:
+            self.on_event(event_type, **fields)
+
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    def report(self) -> dict:
+        waves = []
+        for index, wave in enumerate(self.waves):
+            rows = [row for row in self.results if row["wave"] == index]
+            waves.append({
+                "wave": index,
+                "canary": index == 0,
+                "devices": len(wave),
+                "ok": sum(1 for row in rows if row["ok"]),
+                "skipped": len(wave) - len(rows),
+                "failed": [row for row in rows if not row["ok"]],
+            })
+        return {"status": self.status, "reason": self.reason, "operation": self.operation.to_dict(), "waves": waves}
+
+    async def run(self) -> dict:
+        self.status = "running"
+        total = sum(len(wave) for wave in self.waves)
+        self._emit("rollout_started", operation=self.operation.to_dict(), devices=total, waves=len(self.waves))
+        for index, wave in enumerate(self.waves):
+            if self._cancelled:
+                self.status, self.reason = "cancelled", "cancelled by operator"
+                break
+            allowed = 0 if index == 0 else math.floor(len(wave) * self.max_failure_rate)
+            failed = await self._run_wave(index, wave, allowed)
+            self._emit("rollout_wave", wave=index, devices=len(wave), failed=failed)
+            if failed > allowed:
+                self.status = "aborted"
+                self.reason = (f"{'canary' if index == 0 else f'wave {index}'} failed on {failed} of {len(wave)} "
+                               f"device(s); limit {allowed}")
+                break
+            if self.pause_seconds and index < len(self.waves) - 1:
+                await asyncio.sleep(self.pause_seconds)
+        else:
+            self.status = "completed"
+        self._emit("rollout_finished", status=self.status, reason=self.reason)
+        return self.report()
+
+    async def _run_wave(self, index: int, wave: list[dict], allowed: int) -> int:
+        # The semaphore only covers device commands, not settle/poll sleeps, so a
+        # wave of reboots keeps ``concurrency`` commands going while others come back up.
+        limit = asyncio.Semaphore(self.concurrency)
+        failed = 0
+
+        async def _one(device: dict):
+            nonlocal failed
+            row = await self._apply_and_verify(device, limit, lambda: failed > allowed or self._cancelled)
+            if row is None:
+                return
+            row["wave"] = index
+            self.results.append(row)
+            if not row["ok"]:
+                failed += 1
+
+        await asyncio.gather(*(_one(device) for device in wave))
+        return failed
+
+    async def _apply_and_verify(self, device: dict, limit: asyncio.Semaphore, skip) -> dict | None:
+        row = {"device": device["ip"], "ok": False, "stage": STAGE_APPLY, "error": None}
+        async with limit:
+            # Once the wave is lost, devices not yet started are left alone.
+            if skip():
+                return None
+            start = time.perf_counter()
+            try:
+                await run_operation(self.runtime, device, self.operation, PRIORITY_BACKGROUND)
+            except Exception as exc:
+                row["error"] = str(exc) or exc.__class__.__name__
+        if row["error"] is None:
+            row["stage"] = STAGE_VERIFY
+            try:
+                if self.settle_seconds:
+                    await asyncio.sleep(self.settle_seconds)
+                await self._verify(device, limit)
+                row["ok"] = True
+            except Exception as exc:
+                row["error"] = str(exc) or exc.__class__.__name__
+        row["elapsed_ms"] = int((time.perf_counter() - start) * 1000)
+        return row
+
+    async def _verify(self, device: dict, limit: asyncio.Semaphore) -> None:
+        if self.read_back is not None:
+            async with limit:
+                value = await run_operation(self.runtime, device, self.read_back, PRIORITY_BACKGROUND)
+            expected = _normalized(self.operation.args)
+            actual = _normalized(value)[:len(expected)]
+            if actual != expected:
+                raise RuntimeError(f"read back {actual}, expected {expected}")
+            return
+
+        check = Operation(STATUS)
+        deadline = time.monotonic() + self.verify_timeout
+        while True:
+            try:
+                async with limit:
+                    await run_operation(self.runtime, device, check, PRIORITY_BACKGROUND)
+                return
+            except Exception:
+                if time.monotonic() + ONLINE_POLL_SECONDS > deadline:
+                    raise
+            await asyncio.sleep(ONLINE_POLL_SECONDS)
+
+
+def main() -> None:
+    from fleet_runtime import FleetRuntime
+
+    parser = argparse.ArgumentParser(description="Apply one operation to saved devices in verified waves")
+    parser.add_argument("command", help="Operation command, e.g. power, brightness, reboot")
+    parser.add_argument("args", nargs="*", help="Operation arguments (numbers are sent as numbers)")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--site", action="append", help="Only devices of this site (repeatable)")
+    target.add_argument("--devices", nargs="+", metavar="IP", help="Only these saved devices")
+    parser.add_argument("--canary", default="1", help="Canary device count, or comma-separated IPs")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--wave-size", type=int, help="Devices per wave after the canary")
+    size.add_argument("--wave-percent", type=float, help="Percent of the remaining devices per wave (default 25)")
+    parser.add_argument("--max-failure-rate", type=float, default=DEFAULT_MAX_FAILURE_RATE,
+                        help="Abort when a wave fails on more than this fraction of its devices")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--pause", type=float, default=0.0, help="Seconds to wait between waves")
+    parser.add_argument("--settle", type=float, default=None, help="Seconds to wait before verifying")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the waves")
+    args = parser.parse_args()
+
+    devices = load_saved_devices()
+    if args.site:
+        devices = [device for device in devices if device["site"] in args.site]
+    elif args.devices:
+        devices = [device for device in devices if device["ip"] in args.devices]
+    canary = int(args.canary) if args.canary.isdigit() else [ip.strip() for ip in args.canary.split(",")]
+    operation = Operation.from_dict({
+        "command": args.command,
+        "args": [int(value) if value.lstrip("-").isdigit() else value for value in args.args],
+    })
+
+    waves = plan_waves(devices, canary, args.wave_size, args.wave_percent)
+    for index, wave in enumerate(waves):
+        print(f"{'canary' if index == 0 else f'wave {index}'}: {', '.join(device['ip'] for device in wave)}")
+    if args.dry_run or not waves:
+        return
+
+    runtime = FleetRuntime()
+    rollout = Rollout(runtime, devices, operation, canary, args.wave_size, args.wave_percent, args.max_failure_rate,
+                      args.concurrency, args.settle, pause_seconds=args.pause,
+                      on_event=lambda kind, **fields: print(kind, fields))
+    report = runtime.run(rollout.run()).result()
+    for wave in report["waves"]:
+        for row in wave["failed"]:
+            print(f"  wave {wave['wave']}: {row['device']} failed at {row['stage']}: {row['error']}")
+    print(f"Rollout {report['status']}" + (f": {report['reason']}" if report["reason"] else ""))
+
+
+if __name__ == "__main__":
+    main()
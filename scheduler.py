@@ -0,0 +1,476 @@
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from command_queue import PRIORITY_BACKGROUND
+from devices import find_device_by_ip, load_saved_devices, normalize_device
+from operations import Operation, OperationError, run_operation
+from screenshot_gallery import SCREENSHOT_DIR
+
+JOBS_FILE = Path("scheduled_jobs.json")
+SCHEDULE_DB_FILE = Path.home() / "Documents" / "SamsungMDC" / "schedule_history.db"
+DEFAULT_MAX_PARALLEL = 32
+DEFAULT_MAX_LATE_SECONDS = 3600
+MISSED_GRACE_SECONDS = 60
+MISSED_RUN_ONCE = "run_once"
+MISSED_SKIP = "skip"
+
+_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+_MONTH_NAMES = {name: idx for idx, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+_DAY_NAMES = {name: idx for idx, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+
+class CronError(ValueError):
+    pass
+
+
+def _parse_field(text: str, low: int, high: int, names: dict | None = None) -> set[int]:
+    values = set()
+    for part in text.lower().split(","):
+        expr, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if step < 1:
+            raise CronError(f"Bad step in {part!r}")
+        if expr == "*":
+            start, end = low, high
+        else:
+            first, _, last = expr.partition("-")
+            start = names[first] if names and first in names else int(first)
+            end = (names[last] if names and last in names else int(last)) if last else (high if step_text else start)
+        if start < low or end > high or start > end:
+            raise CronError(f"{part!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Standard five-field cron expression (minute hour day-of-month month day-of-week), local time.
+
+    Supports ``*``, lists, ranges, steps, month/day names and the ``@daily``
+    style macros. As in cron, when both day fields are restricted a day
+    matching either one qualifies. Day-of-week 7 is Sunday, like 0.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = _MACROS.get(self.expression.lower(), self.expression).split()
+        if len(fields) != 5:
+            raise CronError(f"Expected 5 fields in {expression!r}")
+        try:
+            self.minutes = _parse_field(fields[0], 0, 59)
+            self.hours = _parse_field(fields[1], 0, 23)
+            self.days = _parse_field(fields[2], 1, 31)
+            self.months = _parse_field(fields[3], 1, 12, _MONTH_NAMES)
+            self.weekdays = {day % 7 for day in _parse_field(fields[4], 0, 7, _DAY_NAMES)}
+        except (KeyError, ValueError) as exc:
+            raise CronError(f"Invalid cron expression {expression!r}: {exc}") from exc
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_month = moment.day in self.days
+        in_week = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after ``moment``."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                year, month = divmod(candidate.month, 12)
+                candidate = candidate.replace(year=candidate.year + year, month=month + 1, day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise CronError(f"{self.expression!r} never matches")
+
+
+class Job:
+    """One entry of ``scheduled_jobs.json``.
+
+    ``targets`` is ``{"site": ...}``, ``{"sites": [...]}``, ``{"devices": [ips]}``
+    or omitted for every saved device. Device starts are spread evenly over
+    ``spread_seconds`` plus up to ``jitter_seconds`` of random delay each, so a
+    large group is not hit in the same second.
+    """
+
+    def __init__(self, data: dict):
+        try:
+            self.name = str(data["name"]).strip()
+            self.schedule = CronSchedule(str(data["cron"]))
+            # Rejects valid-looking crons that never fire, such as "0 0 31 2 *".
+            self.schedule.next_after(datetime.now())
+            self.operation = Operation.from_dict(data["operation"])
+        except KeyError as exc:
+            raise ValueError(f"Scheduled job is missing {exc}") from exc
+        if not self.name:
+            raise ValueError("Scheduled job needs a name")
+        self.targets = data.get("targets") or {}
+        self.enabled = bool(data.get("enabled", True))
+        self.spread_seconds = float(data.get("spread_seconds", 0))
+        self.jitter_seconds = float(data.get("jitter_seconds", 0))
+        self.max_parallel = max(1, int(data.get("max_parallel", DEFAULT_MAX_PARALLEL)))
+        self.missed = data.get("missed", MISSED_RUN_ONCE)
+        if self.missed not in (MISSED_RUN_ONCE, MISSED_SKIP):
+            raise ValueError(f"{self.name}: missed must be {MISSED_RUN_ONCE!r} or {MISSED_SKIP!r}")
+        self.max_late_seconds = float(data.get("max_late_seconds", DEFAULT_MAX_LATE_SECONDS))
+
+    def devices(self, saved: list[dict]) -> list[dict]:
+        if self.targets.get("devices"):
+            return [
+                find_device_by_ip(saved, str(ip)) or normalize_device({"ip": ip})
+                for ip in self.targets["devices"]
+            ]
+        sites = self.targets.get("sites") or ([self.targets["site"]] if self.targets.get("site") else None)
+        if sites:
+            wanted = {str(site).strip() for site in sites}
+            return [device for device in saved if device["site"] in wanted]
+        return list(saved)
+
+
+def load_jobs(path: Path = JOBS_FILE) -> list[Job]:
+    """Parse the jobs file; raises ValueError naming the first bad job."""
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return []
+    if isinstance(payload, dict):
+        payload = payload.get("jobs", [])
+    jobs = []
+    for item in payload:
+        try:
+            jobs.append(Job(item))
+        except (CronError, OperationError) as exc:
+            raise ValueError(f"{item.get('name', '?')}: {exc}") from exc
+    names = [job.name for job in jobs]
+    if len(set(names)) != len(names):
+        raise ValueError("Scheduled job names must be unique")
+    return jobs
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    job TEXT NOT NULL,
+    scheduled_for REAL NOT NULL,
+    started REAL NOT NULL,
+    finished REAL,
+    status TEXT NOT NULL,
+    devices INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    note TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_job ON runs (job, scheduled_for);
+CREATE TABLE IF NOT EXISTS run_results (
+    run_id INTEGER NOT NULL,
+    device TEXT NOT NULL,
+    ts REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    elapsed_ms INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS run_results_device ON run_results (device, ts);
+CREATE INDEX IF NOT EXISTS run_results_run ON run_results (run_id);
+CREATE TABLE IF NOT EXISTS job_state (
+    job TEXT PRIMARY KEY,
+    last_scheduled REAL NOT NULL
+);
+"""
+
+
+class RunHistory:
+    """Scheduled runs and their per-device results in SQLite.
+
+    Writes are small (one row per run, one batch of device rows when it
+    ends), so callers on the event loop hand them to a worker thread.
+    """
+
+    def __init__(self, path: Path = SCHEDULE_DB_FILE):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _query(self, sql: str, params=()) -> list[dict]:
+        conn = self._connect()
+        try:
+            conn.row_factory = sqlite3.Row
+            return [dict(row) for row in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def start_run(self, job: str, scheduled_for: float, status: str = "running", note: str | None = None) -> int:
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO runs (job, scheduled_for, started, status, note) VALUES (?, ?, ?, ?, ?)",
+                    (job, scheduled_for, time.time(), status, note),
+                )
+                if note != "manual":
+                    conn.execute("INSERT OR REPLACE INTO job_state VALUES (?, ?)", (job, scheduled_for))
+            return cursor.lastrowid
+        finally:
+            conn.close()
+
+    def finish_run(self, run_id: int, results: list[tuple], status: str | None = None) -> None:
+        """``results`` rows are ``(device, ts, ok, elapsed_ms, error)``."""
+        failed = sum(1 for row in results if not row[2])
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("INSERT INTO run_results VALUES (?, ?, ?, ?, ?, ?)",
+                                 [(run_id, *row) for row in results])
+                conn.execute(
+                    "UPDATE runs SET finished = ?, status = ?, devices = ?, failed = ? WHERE id = ?",
+                    (time.time(), status or ("failed" if failed else "ok"), len(results), failed, run_id),
+                )
+        finally:
+            conn.close()
+
+    def last_scheduled(self) -> dict[str, float]:
+        return {row["job"]: row["last_scheduled"] for row in self._query("SELECT * FROM job_state")}
+
+    def runs(self, job: str | None = None, limit: int = 50) -> list[dict]:
+        if job:
+            return self._query("SELECT * FROM runs WHERE job = ? ORDER BY started DESC LIMIT ?", (job, limit))
+        return self._query("SELECT * FROM runs ORDER BY started DESC LIMIT ?", (limit,))
+
+    def results(self, run_id: int) -> list[dict]:
+        return self._query("SELECT * FROM run_results WHERE run_id = ? ORDER BY ok, device", (run_id,))
+
+    def failures(self, device: str | None = None, job: str | None = None, since: float = 0.0,
+                 limit: int = 200) -> list[dict]:
+        """Failed device results, newest first, with the job that ran them."""
+        sql = ("SELECT r.job, r.scheduled_for, d.device, d.ts, d.elapsed_ms, d.error FROM run_results d "
+               "JOIN runs r ON r.id = d.run_id WHERE d.ok = 0 AND d.ts >= ?")
+        params: list = [since]
+        if device:
+            sql += " AND d.device = ?"
+            params.append(device)
+        if job:
+            sql += " AND r.job = ?"
+            params.append(job)
+        return self._query(sql + " ORDER BY d.ts DESC LIMIT ?", (*params, limit))
+
+
+class Scheduler:
+    """Runs :class:`Job` s against a :class:`FleetRuntime` on its event loop.
+
+    Device commands go through the shared command queues at background
+    priority, so operators always go first. A run that is still going when
+    its next time comes is not started twice (the slot is recorded as
+    ``overlap``). Runs missed while the process was down or the machine was
+    asleep are detected from the last scheduled time stored in the history:
+    ``run_once`` jobs catch up once if the newest missed slot is at most
+    ``max_late_seconds`` old, ``skip`` jobs wait for the next slot.
+    """
+
+    def __init__(self, runtime, jobs: list[Job], history: RunHistory | None = None, on_event=None):
+        self.runtime = runtime
+        self.jobs = {job.name: job for job in jobs}
+        self.history = history or RunHistory()
+        self.on_event = on_event
+        self.next_run: dict[str, datetime] = {}
+        self._running: dict[str, asyncio.Task] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+        self._wake = asyncio.Event()
+
+    def start(self) -> None:
+        """Must be called on the runtime loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        for task in [*self._running.values(), *self._tasks]:
+            task.cancel()
+
+    def run_now(self, name: str) -> None:
+        self._launch(self.jobs[name], datetime.now(), "manual")
+
+    def _spawn(self, coro) -> asyncio.Task:
+        # The loop only keeps weak references to tasks; hold one until the task is done.
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _emit(self, event_type: str, **fields) -> None:
+        if self.on_event is not None:
+            self.on_event(event_type, **fields)
+
+    async def _loop(self) -> None:
+        last_scheduled = await asyncio.to_thread(self.history.last_scheduled)
+        while True:
+            now = datetime.now()
+            for job in self.jobs.values():
+                if job.enabled and job.name not in self.next_run:
+                    last = last_scheduled.get(job.name)
+                    try:
+                        self.next_run[job.name] = job.schedule.next_after(
+                            datetime.fromtimestamp(last) if last else now)
+                    except CronError as exc:
+                        self._disable(job, exc)
+
+            for name, due in list(self.next_run.items()):
+                job = self.jobs.get(name)
+                if job is None or not job.enabled:
+                    del self.next_run[name]
+                    continue
+                if due > now:
+                    continue
+                # Slots that passed while we were down or asleep collapse into the newest one.
+                try:
+                    following = job.schedule.next_after(due)
+                    while following <= now:
+                        due, following = following, job.schedule.next_after(following)
+                except CronError as exc:
+                    self._disable(job, exc)
+                    del self.next_run[name]
+                    continue
+                late = (now - due).total_seconds()
+                if late > MISSED_GRACE_SECONDS and (job.missed == MISSED_SKIP or late > job.max_late_seconds):
+                    self._emit("schedule_missed", job=name, scheduled_for=due.timestamp())
+                else:
+                    self._launch(job, due, "catch-up" if late > MISSED_GRACE_SECONDS else None)
+                self.next_run[name] = following
+
+            self._wake.clear()
+            wake_at = min(self.next_run.values(), default=now + timedelta(minutes=1))
+            # Sleep in short slices so a wall-clock change or resume from sleep is noticed promptly.
+            delay = min(60.0, max(0.0, (wake_at - datetime.now()).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _disable(self, job: Job, exc: CronError) -> None:
+        """Take a job whose cron stopped matching out of the schedule, without stopping the other jobs."""
+        job.enabled = False
+        self._emit("schedule_error", job=job.name, error=str(exc))
+
+    def _launch(self, job: Job, scheduled_for: datetime, note: str | None) -> None:
+        if job.name in self._running:
+            self._spawn(self._record_overlap(job, scheduled_for))
+            self._emit("schedule_overlap", job=job.name, scheduled_for=scheduled_for.timestamp())
+            return
+        task = asyncio.create_task(self._run(job, scheduled_for, note))
+        self._running[job.name] = task
+        task.add_done_callback(lambda _: self._running.pop(job.name, None))
+
+    async def _record_overlap(self, job: Job, scheduled_for: datetime) -> None:
+        try:
+            await asyncio.to_thread(self.history.start_run, job.name, scheduled_for.timestamp(), "overlap",
+                                    "previous run still going")
+        except Exception as exc:
+            self._emit("schedule_error", job=job.name, error=str(exc) or exc.__class__.__name__)
+
+    async def _run(self, job: Job, scheduled_for: datetime, note: str | None) -> None:
+        run_id = await asyncio.to_thread(self.history.start_run, job.name, scheduled_for.timestamp(), "running", note)
+        saved = await asyncio.to_thread(load_saved_devices)
+        devices = sorted(job.devices(saved), key=lambda device: device["ip"])
+        self._emit("schedule_started", job=job.name, run_id=run_id, devices=len(devices))
+        limit = asyncio.Semaphore(job.max_parallel)
+        results: list[tuple] = []
+
+        async def _one(index: int, device: dict):
+            delay = job.spread_seconds * index / max(1, len(devices)) + random.uniform(0, job.jitter_seconds)
+            await asyncio.sleep(delay)
+            async with limit:
+                start = time.perf_counter()
+                try:
+                    result = await run_operation(self.runtime, device, job.operation, PRIORITY_BACKGROUND)
+                    if isinstance(result, (bytes, bytearray)):
+                        await asyncio.to_thread(save_capture, device["ip"], bytes(result))
+                except Exception as exc:
+                    results.append((device["ip"], time.time(), 0, int((time.perf_counter() - start) * 1000),
+                                    str(exc) or exc.__class__.__name__))
+                else:
+                    results.append((device["ip"], time.time(), 1, int((time.perf_counter() - start) * 1000), None))
+
+        status = None
+        try:
+            await asyncio.gather(*(_one(index, device) for index, device in enumerate(devices)))
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            await asyncio.shield(asyncio.to_thread(self.history.finish_run, run_id, results, status))
+            failed = sum(1 for row in results if not row[2])
+            self._emit("schedule_finished", job=job.name, run_id=run_id, devices=len(devices), failed=failed)
+
+
+def save_capture(ip: str, image_bytes: bytes) -> Path:
+    """Store a scheduled snapshot where the dashboard gallery finds it."""
+    SCREENSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    path = SCREENSHOT_DIR / f"screenshot_{ip.replace('.', '_')}_{time.strftime('%Y%m%d_%H%M%S')}.jpg"
+    path.write_bytes(image_bytes)
+    return path
+
+
+def _format_ts(ts: float | None) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(ts)) if ts else "-"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect scheduled jobs and their run history")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("jobs", help="Validate scheduled_jobs.json and show the next run of each job")
+    runs = sub.add_parser("runs", help="Recent runs")
+    runs.add_argument("--job")
+    runs.add_argument("--limit", type=int, default=20)
+    failures = sub.add_parser("failures", help="Devices a job failed on")
+    failures.add_argument("--device")
+    failures.add_argument("--job")
+    failures.add_argument("--days", type=float, default=7)
+    args = parser.parse_args()
+
+    if args.command == "jobs":
+        now = datetime.now()
+        for job in load_jobs():
+            state = job.schedule.next_after(now).strftime("%Y-%m-%d %H:%M") if job.enabled else "disabled"
+            print(f"{job.name:<24} {job.schedule.expression:<18} next {state:<17} {job.operation}")
+        return
+
+    history = RunHistory()
+    if args.command == "runs":
+        for run in history.runs(args.job, args.limit):
+            print(f"#{run['id']:<5} {run['job']:<24} {_format_ts(run['scheduled_for'])}  {run['status']:<9} "
+                  f"{run['devices'] - run['failed']}/{run['devices']} ok  {run['note'] or ''}")
+    else:
+        for row in history.failures(args.device, args.job, time.time() - args.days * 86400):
+            print(f"{_format_ts(row['ts'])}  {row['device']:<16} {row['job']:<24} {row['error']}")
+
+
+if __name__ == "__main__":
+    main()
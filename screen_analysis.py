@@ -0,0 +1,144 @@
+import asyncio
+import functools
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+THUMB_SIZE = (64, 36)
+
+# Luminance thresholds (0-255) on the downsampled frame.
+BLACK_MAX_MEAN = 18
+BLACK_MAX_P99 = 40
+NO_SIGNAL_MAX_STD = 8
+NO_SIGNAL_MAX_OUTLIERS = 0.03   # share of pixels away from the median (e.g. a small "No Signal" box)
+NO_SIGNAL_OUTLIER_DELTA = 24
+FROZEN_MAX_MAD = 1.5            # mean absolute luminance difference between successive captures
+FROZEN_MAX_HASH_DISTANCE = 2    # differing bits of the 64-bit difference hash
+
+STATE_OK = "ok"
+STATE_BLACK = "black"
+STATE_NO_SIGNAL = "no_signal"
+STATE_FROZEN = "frozen"
+
+
+@functools.cache
+def _numpy():
+    """numpy, imported on the first analysis rather than at dashboard startup; None when not installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def analyze_capture(image_bytes: bytes) -> dict:
+    """Luminance features of one captured JPEG. Runs in a worker process."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        # Let the JPEG decoder scale down while decoding instead of decoding full size.
+        img.draft("L", (THUMB_SIZE[0] * 4, THUMB_SIZE[1] * 4))
+        gray = img.convert("L")
+    thumb = gray.resize(THUMB_SIZE, Image.BOX).tobytes()
+    hash_pixels = gray.resize((9, 8), Image.BOX).tobytes()
+    return {"thumb": thumb, "dhash": _dhash(hash_pixels), **_luma_stats(thumb)}
+
+
+def _luma_stats(luma: bytes) -> dict:
+    np = _numpy()
+    if np is not None:
+        values = np.frombuffer(luma, dtype=np.uint8).astype(np.float32)
+        median = float(np.median(values))
+        return {
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "p99": float(np.percentile(values, 99)),
+            "outliers": float(np.mean(np.abs(values - median) > NO_SIGNAL_OUTLIER_DELTA)),
+        }
+
+    values = sorted(luma)
+    count = len(values)
+    mean = sum(values) / count
+    median = values[count // 2]
+    return {
+        "mean": mean,
+        "std": (sum((v - mean) ** 2 for v in values) / count) ** 0.5,
+        "p99": float(values[min(count - 1, int(count * 0.99))]),
+        "outliers": sum(1 for v in values if abs(v - median) > NO_SIGNAL_OUTLIER_DELTA) / count,
+    }
+
+
+def _dhash(pixels: bytes) -> int:
+    """64-bit difference hash of a 9x8 grayscale image: one bit per left/right neighbour comparison."""
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] < pixels[row * 9 + col + 1])
+    return bits
+
+
+def mean_abs_diff(a: bytes, b: bytes) -> float:
+    np = _numpy()
+    if np is not None:
+        return float(np.abs(np.frombuffer(a, np.uint8).astype(np.int16) - np.frombuffer(b, np.uint8)).mean())
+    return sum(abs(x - y) for x, y in zip(a, b)) / len(a)
+
+
+def classify(features: dict) -> str:
+    """Single-frame verdict: black, no-signal (uniform, or dark with a small overlay box) or ok."""
+    if features["mean"] <= BLACK_MAX_MEAN and features["p99"] <= BLACK_MAX_P99:
+        return STATE_BLACK
+    if features["std"] <= NO_SIGNAL_MAX_STD or (features["mean"] < 40 and features["outliers"] <= NO_SIGNAL_MAX_OUTLIERS):
+        return STATE_NO_SIGNAL
+    return STATE_OK
+
+
+class ScreenMonitor:
+    """Analyses periodic captures per device in a process pool and tracks frozen content.
+
+    A device is reported frozen once ``frozen_after`` successive captures are
+    near-identical (small mean absolute difference and difference-hash
+    distance). Black and no-signal screens are judged from the frame alone
+    and take precedence. Must be used from one event loop.
+    """
+
+    def __init__(self, frozen_after: int = 3, max_workers: int | None = None):
+        self.frozen_after = frozen_after
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self._executor: ProcessPoolExecutor | None = None
+        self._previous: dict[str, tuple[bytes, int, int]] = {}  # device -> (thumb, dhash, identical streak)
+
+    async def analyze(self, device: str, image_bytes: bytes) -> dict:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        features = await asyncio.get_running_loop().run_in_executor(self._executor, analyze_capture, image_bytes)
+
+        state = classify(features)
+        mad = hash_distance = None
+        streak = 1
+        previous = self._previous.get(device)
+        if previous is not None:
+            mad = mean_abs_diff(features["thumb"], previous[0])
+            hash_distance = bin(features["dhash"] ^ previous[1]).count("1")
+            if mad <= FROZEN_MAX_MAD and hash_distance <= FROZEN_MAX_HASH_DISTANCE:
+                streak = previous[2] + 1
+        self._previous[device] = (features["thumb"], features["dhash"], streak)
+
+        if state == STATE_OK and streak >= self.frozen_after:
+            state = STATE_FROZEN
+        return {
+            "state": state,
+            "mean": features["mean"],
+            "std": features["std"],
+            "mad": mad,
+            "hash_distance": hash_distance,
+            "identical_captures": streak,
+        }
+
+    def forget(self, device: str) -> None:
+        self._previous.pop(device, None)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
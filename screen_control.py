@@ -4,6 +4,9 @@ from pathlib import Path
 
 from samsung_mdc import MDC
 
+from daemon_client import DEFAULT_URL, DaemonClient, DaemonError, decode_bytes
+from profiling import SessionProfiler
+
 # --- CONFIGURATION ---
 IP_ADDRESS = "192.168.1.50"  # <--- PUT YOUR SCREEN IP HERE
 DISPLAY_ID = 0  # Default is 0 for most QMRE screens
@@ -93,6 +96,41 @@ async def run_commands(
             print("Reboot command sent.")
 
 
+def run_commands_via_daemon(
+    client: DaemonClient,
+    ip_address: str,
+    port: int,
+    display_id: int,
+    do_screenshot: bool = True,
+    do_reboot: bool = False,
+    brightness: int | None = None,
+) -> None:
+    """Same flow as :func:`run_commands`, sent through a running control daemon."""
+    def run(command: str, *args):
+        return client.run(ip_address, command, args, port=port, display_id=display_id, protocol="SIGNAGE_MDC")
+
+    print(f"--- {ip_address} via control daemon {client.url} ---")
+    status = run("status")
+    print(f"Current Power: {status[0] if len(status) > 0 else 'UNKNOWN'}")
+    print(f"Current Volume: {status[1] if len(status) > 1 else 'UNKNOWN'}")
+
+    if do_screenshot:
+        print("Capturing screen...")
+        try:
+            OUTPUT_IMAGE.write_bytes(decode_bytes(run("screen_capture")))
+            print(f"Screenshot saved as '{OUTPUT_IMAGE.name}'")
+        except DaemonError as exc:
+            print(exc)
+
+    if brightness is not None:
+        run("brightness", brightness)
+        print(f"Brightness set to {brightness}.")
+
+    if do_reboot:
+        run("reboot")
+        print("Reboot command sent.")
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Samsung MDC async controller")
     parser.add_argument("--ip", default=IP_ADDRESS, help="Screen IP address")
@@ -114,21 +152,49 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Brightness value (0-100)",
     )
+    parser.add_argument(
+        "--daemon",
+        metavar="URL",
+        default=None,
+        help=f"Send the commands through a running control daemon (e.g. {DEFAULT_URL}) instead of connecting directly",
+    )
+    parser.add_argument("--token", default=None, help="Bearer token of the control daemon")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the run (cProfile + asyncio task timing) and write a report to Documents/SamsungMDC/profiles",
+    )
     return parser.parse_args()
 
 
+async def _profiled(profiler: SessionProfiler, coro):
+    profiler.attach_loop(asyncio.get_running_loop())
+    return await coro
+
+
 if __name__ == "__main__":
     args = parse_args()
+    profiler = SessionProfiler("screen_control") if args.profile else None
+    options = dict(
+        ip_address=args.ip,
+        port=args.port,
+        display_id=args.id,
+        do_screenshot=not args.no_screenshot,
+        do_reboot=args.reboot,
+        brightness=args.brightness,
+    )
     try:
-        asyncio.run(
-            run_commands(
-                ip_address=args.ip,
-                port=args.port,
-                display_id=args.id,
-                do_screenshot=not args.no_screenshot,
-                do_reboot=args.reboot,
-                brightness=args.brightness,
-            )
-        )
+        if profiler:
+            profiler.start()
+        if args.daemon:
+            run_commands_via_daemon(DaemonClient(args.daemon, args.token), **options)
+        else:
+            job = run_commands(**options)
+            if profiler:
+                job = _profiled(profiler, job)
+            asyncio.run(job)
     except Exception as exc:
         print(f"Error: {exc}")
+    finally:
+        if profiler:
+            print(f"Profile report: {profiler.stop()}")
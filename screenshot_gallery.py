@@ -0,0 +1,179 @@
+import hashlib
+import io
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+SCREENSHOT_DIR = Path.home() / "Documents" / "SamsungMDC"
+THUMBNAIL_DIR = SCREENSHOT_DIR / "thumbnails"
+THUMBNAIL_SIZE = (160, 90)
+
+# screenshot_<ip with underscores>_<YYYYmmdd>_<HHMMSS>.jpg, as written by the dashboard.
+_CAPTURE_NAME = re.compile(r"^screenshot_(?P<device>.+)_(?P<stamp>\d{8}_\d{6})\.(?:jpe?g|png)$", re.IGNORECASE)
+
+
+class Capture:
+    __slots__ = ("path", "device", "taken_at", "size", "mtime_ns")
+
+    def __init__(self, path: Path, device: str, taken_at: float, size: int, mtime_ns: int):
+        self.path = path
+        self.device = device
+        self.taken_at = taken_at
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+
+def list_captures(directory: Path = SCREENSHOT_DIR) -> list[Capture]:
+    """Screenshots in ``directory``, newest first. Only stats files; nothing is decoded."""
+    captures = []
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return []
+    for entry in entries:
+        match = _CAPTURE_NAME.match(entry.name)
+        if not match or not entry.is_file():
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue  # deleted since the scan, e.g. by retention in another process
+        try:
+            taken_at = time.mktime(time.strptime(match["stamp"], "%Y%m%d_%H%M%S"))
+        except ValueError:
+            taken_at = stat.st_mtime
+        captures.append(Capture(Path(entry.path), match["device"].replace("_", "."), taken_at,
+                                stat.st_size, stat.st_mtime_ns))
+    captures.sort(key=lambda capture: capture.taken_at, reverse=True)
+    return captures
+
+
+def apply_retention(captures: list[Capture], max_age_days: float | None = None,
+                    max_bytes_per_device: int | None = None) -> list[Capture]:
+    """Delete captures older than ``max_age_days``, then the oldest of each device above ``max_bytes_per_device``.
+
+    Returns the captures that were removed.
+    """
+    removed = []
+    cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+    by_device: dict[str, list[Capture]] = {}
+    for capture in captures:
+        by_device.setdefault(capture.device, []).append(capture)
+
+    for device_captures in by_device.values():
+        device_captures.sort(key=lambda capture: capture.taken_at, reverse=True)
+        kept_bytes = 0
+        for capture in device_captures:
+            expired = cutoff is not None and capture.taken_at < cutoff
+            over_budget = max_bytes_per_device is not None and kept_bytes + capture.size > max_bytes_per_device
+            if expired or over_budget:
+                try:
+                    capture.path.unlink()
+                except OSError:
+                    continue
+                removed.append(capture)
+            else:
+                kept_bytes += capture.size
+    return removed
+
+
+class ThumbnailCache:
+    """Size-bounded LRU of JPEG thumbnails, in memory and on disk.
+
+    Entries are keyed by path, mtime and size, so a replaced file never shows
+    a stale thumbnail. Memory holds up to ``memory_items`` encoded thumbnails
+    (a few KB each); the disk cache is trimmed, least recently used first,
+    to ``disk_bytes``. :meth:`load` may be called from worker threads.
+    """
+
+    def __init__(self, cache_dir: Path = THUMBNAIL_DIR, memory_items: int = 300,
+                 disk_bytes: int = 64 * 1024 * 1024, size: tuple[int, int] = THUMBNAIL_SIZE):
+        self.cache_dir = cache_dir
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self.size = size
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_usage: int | None = None
+
+    def _key(self, capture: Capture) -> str:
+        raw = f"{capture.path}|{capture.mtime_ns}|{capture.size}|{self.size}".encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()
+
+    def get(self, capture: Capture) -> bytes | None:
+        """Memory-only lookup, cheap enough for the UI thread."""
+        key = self._key(capture)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            return data
+
+    def load(self, capture: Capture) -> bytes:
+        """Thumbnail from memory, then disk, else decoded from the capture and stored in both."""
+        key = self._key(capture)
+        data = self.get(capture)
+        if data is not None:
+            return data
+
+        disk_path = self.cache_dir / f"{key}.jpg"
+        try:
+            data = disk_path.read_bytes()
+            os.utime(disk_path)
+        except OSError:
+            data = self._render(capture.path)
+            self._store_on_disk(disk_path, data)
+
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+        return data
+
+    def _render(self, path: Path) -> bytes:
+        from PIL import Image
+
+        with Image.open(path) as img:
+            img.draft("RGB", (self.size[0] * 2, self.size[1] * 2))
+            thumb = img.convert("RGB")
+        thumb.thumbnail(self.size)
+        out = io.BytesIO()
+        thumb.save(out, "JPEG", quality=80)
+        return out.getvalue()
+
+    def _store_on_disk(self, disk_path: Path, data: bytes) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            disk_path.write_bytes(data)
+        except OSError:
+            return
+        with self._lock:
+            if self._disk_usage is None:
+                self._disk_usage = sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if entry.is_file())
+            else:
+                self._disk_usage += len(data)
+            if self._disk_usage <= self.disk_bytes:
+                return
+            self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        # Trim to 90% so every new thumbnail does not trigger another directory scan.
+        entries = sorted(
+            (entry for entry in os.scandir(self.cache_dir) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        usage = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if usage <= self.disk_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.unlink(entry.path)
+                usage -= size
+            except OSError:
+                pass
+        self._disk_usage = usage
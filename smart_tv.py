@@ -0,0 +1,262 @@
+import asyncio
+import functools
+import time
+
+from audit_log import AUDIT
+from resilience import DeviceConnectError, is_unauthorized
+from token_store import TOKENS
+
+CLIENT_NAME = "SamsungPy Hybrid"
+
+SMART_TV_KEYS = [
+    "KEY_HOME",
+    "KEY_POWER",
+    "KEY_MUTE",
+    "KEY_VOLUP",
+    "KEY_VOLDOWN",
+    "KEY_SOURCE",
+    "KEY_MENU",
+    "KEY_RETURN",
+    "KEY_UP",
+    "KEY_DOWN",
+    "KEY_LEFT",
+    "KEY_RIGHT",
+    "KEY_ENTER",
+]
+
+SMART_TV_HDMI_MACROS = {
+    "HDMI1": ["KEY_SOURCE", "KEY_ENTER"],
+    "HDMI2": ["KEY_SOURCE", "KEY_RIGHT", "KEY_ENTER"],
+    "HDMI3": ["KEY_SOURCE", "KEY_RIGHT", "KEY_RIGHT", "KEY_ENTER"],
+    "HDMI4": ["KEY_SOURCE", "KEY_RIGHT", "KEY_RIGHT", "KEY_RIGHT", "KEY_ENTER"],
+}
+
+
+def load_samsungtvws():
+    try:
+        from samsungtvws import SamsungTVWS
+    except ImportError as exc:
+        raise RuntimeError("samsungtvws is not installed. Run: pip install samsungtvws") from exc
+    return SamsungTVWS
+
+
+@functools.cache
+def load_samsungtvws_async():
+    """samsungtvws' asyncio clients, or None when ``websockets`` / ``aiohttp`` are not installed."""
+    try:
+        import aiohttp
+        from samsungtvws.async_remote import SamsungTVWSAsyncRemote
+        from samsungtvws.async_rest import SamsungTVAsyncRest
+        from samsungtvws.remote import SendRemoteKey
+    except ImportError:
+        return None
+    return SamsungTVWSAsyncRemote, SamsungTVAsyncRest, SendRemoteKey, aiohttp
+
+
+class AsyncSmartTV:
+    """A Smart TV as seen by a worker on the runtime loop: remote keys plus the REST device info.
+
+    With ``websockets`` and ``aiohttp`` installed (``pip install samsungtvws[async]``)
+    this uses samsungtvws' asyncio clients, so a sweep over many TVs needs no
+    thread per TV. Without them every call runs the blocking client on a
+    worker thread instead. The remote connection is opened on the first key
+    and reused until :meth:`close`.
+
+    The pairing token comes from :data:`token_store.TOKENS` and a token the
+    TV hands out is stored back there on :meth:`close`, so the library never
+    touches token files. Every key and REST call goes to :data:`audit_log.AUDIT`.
+    """
+
+    def __init__(self, ip: str, port: int, timeout: float | None = None):
+        self.ip = ip
+        self.port = port
+        self.timeout = timeout
+        self.native = load_samsungtvws_async() is not None
+        self._remote = None
+        self._blocking = None
+
+    def _blocking_tv(self):
+        if self._blocking is None:
+            SamsungTVWS = load_samsungtvws()
+            self._blocking = SamsungTVWS(self.ip, port=self.port, token=TOKENS.get(self.ip), name=CLIENT_NAME,
+                                         timeout=self.timeout)
+        return self._blocking
+
+    async def _open_remote(self):
+        if self._remote is None:
+            SamsungTVWSAsyncRemote = load_samsungtvws_async()[0]
+            remote = SamsungTVWSAsyncRemote(self.ip, port=self.port, token=TOKENS.get(self.ip), name=CLIENT_NAME,
+                                            timeout=self.timeout)
+            try:
+                await remote.open()
+            except Exception as exc:
+                if is_unauthorized(exc):
+                    raise  # the TV answered and refused: not a connection failure, never retried
+                raise DeviceConnectError(str(exc) or exc.__class__.__name__) from exc
+            self._remote = remote
+        return self._remote
+
+    async def _audited(self, command: str, args, call, summary=None):
+        """Await ``call`` and journal it; ``summary(result)`` picks what of the result to keep."""
+        start = time.perf_counter()
+        try:
+            result = await call
+        except Exception as exc:
+            AUDIT.record(self.ip, command, args, ok=False, latency_ms=(time.perf_counter() - start) * 1000,
+                         error=str(exc) or exc.__class__.__name__, port=self.port)
+            raise
+        AUDIT.record(self.ip, command, args, result=summary(result) if summary else None,
+                     latency_ms=(time.perf_counter() - start) * 1000, port=self.port)
+        return result
+
+    async def send_keys(self, key: str, times: int = 1) -> None:
+        await self._audited("key", (key, max(1, int(times))), self._send_keys(key, times))
+
+    async def _send_keys(self, key: str, times: int) -> None:
+        if not self.native:
+            return await asyncio.to_thread(send_keys, self._blocking_tv(), key, times)
+        SendRemoteKey = load_samsungtvws_async()[2]
+        remote = await self._open_remote()
+        await remote.send_commands([SendRemoteKey.click(key)] * max(1, int(times)))
+
+    async def send_key(self, key: str) -> None:
+        await self.send_keys(key, times=1)
+
+    async def send_sequence(self, keys: list[str], key_press_delay: float = 0.6) -> None:
+        await self._audited("keys", list(keys), self._send_sequence(keys, key_press_delay))
+
+    async def _send_sequence(self, keys: list[str], key_press_delay: float) -> None:
+        if not self.native:
+            return await asyncio.to_thread(send_sequence, self._blocking_tv(), keys, key_press_delay)
+        SendRemoteKey = load_samsungtvws_async()[2]
+        remote = await self._open_remote()
+        await remote.send_commands([SendRemoteKey.click(key) for key in keys], key_press_delay=key_press_delay)
+
+    async def press(self, key: str) -> float | None:
+        """Send one key and wait until the TV has taken it off the WebSocket.
+
+        The acknowledgement is a ping sent right after the key: the TV answers
+        it only after reading the key frame. Returns that round trip in
+        seconds, or None on the blocking fallback, which cannot measure it.
+        """
+        return await self._audited("key", (key,), self._press(key))
+
+    async def _press(self, key: str) -> float | None:
+        if not self.native:
+            await asyncio.to_thread(send_sequence, self._blocking_tv(), [key], 0)
+            return None
+        SendRemoteKey = load_samsungtvws_async()[2]
+        remote = await self._open_remote()
+        start = time.perf_counter()
+        await remote.send_commands([SendRemoteKey.click(key)], key_press_delay=0)
+        pong = await remote.connection.ping()
+        await asyncio.wait_for(pong, self.timeout or 5.0)
+        return time.perf_counter() - start
+
+    async def rest_device_info(self) -> dict:
+        return await self._audited("device_info", (), self._rest_device_info(), _info_summary)
+
+    async def _rest_device_info(self) -> dict:
+        if not self.native:
+            return await asyncio.to_thread(self._blocking_tv().rest_device_info)
+        _, SamsungTVAsyncRest, _, aiohttp = load_samsungtvws_async()
+        async with aiohttp.ClientSession() as session:
+            rest = SamsungTVAsyncRest(self.ip, session=session, port=self.port, timeout=self.timeout)
+            return await rest.rest_device_info()
+
+    async def device_info(self) -> dict:
+        """``rest_device_info()``, or an empty dict when the TV does not answer it."""
+        try:
+            return await self.rest_device_info()
+        except Exception:
+            return {}
+
+    async def close(self) -> None:
+        for client in (self._remote, self._blocking):
+            if client is not None and client.token:
+                TOKENS.set(self.ip, client.token)
+        if self._remote is not None:
+            remote, self._remote = self._remote, None
+            try:
+                await remote.close()
+            except Exception:
+                pass
+
+
+def _info_summary(info) -> dict:
+    details = info.get("device", {}) if isinstance(info, dict) else {}
+    return {key: details.get(key) for key in ("PowerState", "modelName")}
+
+
+async def execute_smart_tv(worker, ip: str, port: int, timeout: float | None = None):
+    """Await ``worker(tv)`` with an :class:`AsyncSmartTV`. Call on the runtime loop."""
+    tv = AsyncSmartTV(ip, port, timeout)
+    try:
+        return await worker(tv)
+    except Exception as exc:
+        raise RuntimeError(format_smart_tv_error(exc, ip, port)) from exc
+    finally:
+        await tv.close()
+
+
+def format_smart_tv_error(exc: Exception, ip: str, port: int) -> str:
+    if isinstance(exc, DeviceConnectError) and exc.__cause__ is not None:
+        exc = exc.__cause__
+    text = str(exc)
+    kind = exc.__class__.__name__
+
+    if is_unauthorized(exc):
+        return (
+            f"Smart TV authorization required on {ip}:{port}. "
+            f"Look at the TV and allow the remote request for {CLIENT_NAME}, then retry."
+        )
+
+    if kind in ("ConnectionFailure", "TimeoutError") or isinstance(exc, OSError):
+        return (
+            f"Smart TV connection failed on {ip}:{port}. "
+            "Ensure TV is ON, same network, and use Auto Probe (ports 8002/8001)."
+        )
+
+    return f"Smart TV command failed on {ip}:{port}: {text or kind}"
+
+
+def open_tv(tv) -> None:
+    try:
+        tv.open()
+    except Exception as exc:
+        if is_unauthorized(exc):
+            raise
+        raise DeviceConnectError(str(exc) or exc.__class__.__name__) from exc
+
+
+def send_keys(tv, key: str, times: int = 1) -> None:
+    if not hasattr(tv, "send_key"):
+        raise RuntimeError("Connected Smart TV client does not expose send_key().")
+
+    try:
+        open_tv(tv)
+        for _ in range(max(1, int(times))):
+            tv.send_key(key)
+    finally:
+        try:
+            tv.close()
+        except Exception:
+            pass
+
+
+def send_sequence(tv, keys: list[str], key_press_delay: float = 0.6) -> None:
+    if not hasattr(tv, "send_key"):
+        raise RuntimeError("Connected Smart TV client does not expose send_key().")
+
+    try:
+        open_tv(tv)
+        for key in keys:
+            try:
+                tv.send_key(key, key_press_delay=key_press_delay)
+            except TypeError:
+                tv.send_key(key)
+    finally:
+        try:
+            tv.close()
+        except Exception:
+            pass
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+import token_store
+from audit_log import AUDIT
+from fault_proxy import PROFILES, ProxyGroup
+from fleet_runtime import FleetRuntime
+from smart_tv import AsyncSmartTV, execute_smart_tv, load_samsungtvws_async
+from smart_tv_macros import MacroEngine, PacingProfiles, load_macros
+from smart_tv_simulator import Simulator, TVProfile
+
+
+def _source_of(macro: str) -> str | None:
+    return macro if macro.startswith("HDMI") else None
+
+
+async def bench_sessions(ip: str, port: int, keys: int, timeout: float) -> dict:
+    """``keys`` acknowledged key presses over one connection, then one connection per key.
+
+    A failed key is counted (``reused_failed`` / ``separate_failed``); after
+    one, the shared connection is reopened for the next key.
+    """
+    start = time.perf_counter()
+    reused_failed = 0
+    tv = AsyncSmartTV(ip, port, timeout)
+    try:
+        for _ in range(keys):
+            try:
+                await tv.press("KEY_VOLUP")
+            except Exception:
+                reused_failed += 1
+                await tv.close()
+                tv = AsyncSmartTV(ip, port, timeout)
+    finally:
+        await tv.close()
+    reused = time.perf_counter() - start
+
+    start = time.perf_counter()
+    separate_failed = 0
+    for _ in range(keys):
+        try:
+            await execute_smart_tv(lambda tv: tv.press("KEY_VOLDOWN"), ip, port, timeout)
+        except Exception:
+            separate_failed += 1
+    separate = time.perf_counter() - start
+    return {"keys": keys, "reused_s": reused, "separate_s": separate, "reused_failed": reused_failed,
+            "separate_failed": separate_failed}
+
+
+def bench_macros(simulator: Simulator, devices: list[dict], macro: str, sweeps: int, concurrency: int,
+                 pacing_file: Path) -> list[dict]:
+    """The macro on every virtual TV, one TV at a time and then ``sweeps`` concurrent sweeps.
+
+    Each sweep reports its wall time, the delay the engine used and how many
+    TVs ended on the wrong source, which is how a too-short delay shows.
+    ``devices`` are the simulator's TVs, or the proxies in front of them.
+    """
+    steps = load_macros()[macro]
+    expected = _source_of(macro)
+    runtime = FleetRuntime()
+    results = []
+    tv_at = {(device["ip"], device["port"]): tv for device, tv in zip(devices, simulator.tvs)}
+
+    async def _verify(device: dict, name: str) -> bool:
+        # The simulator's own input state stands in for reading the TV back.
+        return tv_at[(device["ip"], device["port"])].state.source == expected
+
+    verify = _verify if expected else None
+
+    def _sweep(label: str, engine: MacroEngine) -> None:
+        for tv in simulator.tvs:
+            tv.reset()
+            tv.state.source = "TV"
+        dropped_before = simulator.totals()["dropped_keys"]
+        start = time.perf_counter()
+        rows = runtime.run(engine.run_many(devices, macro, steps)).result()
+        wall = time.perf_counter() - start
+        wrong = sum(1 for tv in simulator.tvs if expected and tv.state.source != expected)
+        results.append({
+            "run": label,
+            "wall_s": wall,
+            "ok": sum(row["ok"] for row in rows),
+            "delay": max((row.get("delay", 0) for row in rows), default=0),
+            "wrong_source": wrong,
+            "dropped_keys": simulator.totals()["dropped_keys"] - dropped_before,
+            "errors": sorted({row["error"] for row in rows if row["error"]}),
+        })
+
+    try:
+        _sweep("sequential", MacroEngine(runtime, PacingProfiles(pacing_file), concurrency=1, verify=verify))
+        pacing_file.unlink(missing_ok=True)
+        engine = MacroEngine(runtime, PacingProfiles(pacing_file), concurrency=concurrency, verify=verify)
+        for index in range(sweeps):
+            _sweep(f"sweep {index + 1}", engine)
+    finally:
+        runtime.loop.call_soon_threadsafe(runtime.loop.stop)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark Smart TV macros and sessions against simulated TVs")
+    parser.add_argument("--tvs", type=int, default=30, help="Number of virtual TVs")
+    parser.add_argument("--macro", default="HDMI4")
+    parser.add_argument("--sweeps", type=int, default=5, help="Concurrent sweeps after the sequential run")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--keys", type=int, default=20, help="Keys for the session reuse comparison")
+    parser.add_argument("--latency", type=float, default=0.01, help="Simulated TV reply latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of connections reset on accept")
+    parser.add_argument("--key-gap", type=float, default=0.3, help="Keys closer together than this are dropped")
+    parser.add_argument("--auth", choices=["approve", "deny", "token"], default="approve")
+    parser.add_argument("--first-ip", default="127.0.1.1")
+    parser.add_argument("--same-ip", action="store_true", help="All TVs on --first-ip, on consecutive ports")
+    parser.add_argument("--network", choices=list(PROFILES), help="Reach the TVs through a fault proxy with this profile")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        # Tokens the simulated TVs hand out must not end up next to the real ones,
+        # nor their key presses in the audit log.
+        token_store.TOKENS.path = Path(work) / "tokens.json"
+        AUDIT.enabled = False
+        profile = TVProfile(latency=args.latency, jitter=args.jitter, fail_rate=args.fail_rate,
+                            key_gap=args.key_gap, auth=args.auth)
+        simulator = Simulator(args.tvs, args.first_ip, 8001 if not args.same_ip else 18001, profile,
+                              args.same_ip).start()
+        devices, proxies = simulator.devices(), None
+        if args.network:
+            proxies = ProxyGroup.in_front_of([(tv.ip, tv.port) for tv in simulator.tvs], args.network).start()
+            mapping = proxies.mapping()
+            for device in devices:
+                device["ip"], device["port"] = mapping[(device["ip"], device["port"])]
+        client = "asyncio (samsungtvws[async])" if load_samsungtvws_async() else "blocking fallback"
+        print(f"{args.tvs} simulated TVs, {client} client, latency {args.latency}s, key gap {args.key_gap}s, "
+              f"network {args.network or 'direct'}")
+        try:
+            first = devices[0]
+            sessions = asyncio.run(bench_sessions(first["ip"], first["port"], args.keys, 5.0))
+            print(f"{sessions['keys']} keys: one connection {sessions['reused_s']:.2f}s "
+                  f"({sessions['reused_failed']} failed), a connection per key {sessions['separate_s']:.2f}s "
+                  f"({sessions['separate_failed']} failed)")
+
+            print(f"{'run':<12} {'wall s':>7} {'ok':>5} {'delay':>6} {'wrong':>6} {'dropped':>8}  errors")
+            for row in bench_macros(simulator, devices, args.macro, args.sweeps, args.concurrency,
+                                    Path(work) / "pacing.json"):
+                print(f"{row['run']:<12} {row['wall_s']:>7.2f} {row['ok']:>5} {row['delay']:>6.2f} "
+                      f"{row['wrong_source']:>6} {row['dropped_keys']:>8}  {'; '.join(row['errors'])[:80]}")
+        finally:
+            if proxies is not None:
+                proxies.stop()
+                print(proxies.totals())
+            simulator.stop()
+            print(simulator.totals())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from command_queue import PRIORITY_INTERACTIVE, device_key
+from devices import load_saved_devices, resolve_protocol
+from resilience import UNSAFE_RETRY
+from smart_tv import SMART_TV_HDMI_MACROS
+
+MACROS_FILE = Path.home() / "Documents" / "SamsungMDC" / "smart_tv_macros.json"
+PACING_FILE = Path.home() / "Documents" / "SamsungMDC" / "smart_tv_pacing.json"
+
+DEFAULT_DELAY = 0.6
+MIN_DELAY = 0.25
+MAX_DELAY = 3.0
+DELAY_DECREASE = 0.05
+ACK_FACTOR = 3.0
+# Keys that open an overlay (source list, home bar, menu) get twice the delay before the next key.
+OPENING_KEYS = {"KEY_SOURCE", "KEY_HOME", "KEY_MENU"}
+OPENING_FACTOR = 2.0
+DEFAULT_CONCURRENCY = 32
+UNKNOWN_MODEL = "unknown"
+
+STEP_KEY = "key"
+STEP_WAIT = "wait"
+
+
+class MacroError(ValueError):
+    """A macro definition that cannot be run."""
+
+
+def parse_steps(definition) -> list[tuple[str, object]]:
+    """Steps from a macro definition: key names, ``{"key": ..., "repeat": n}`` and ``{"wait": seconds}``."""
+    if not isinstance(definition, list) or not definition:
+        raise MacroError("A macro is a non-empty list of keys")
+    steps = []
+    for item in definition:
+        if isinstance(item, dict) and "wait" in item:
+            steps.append((STEP_WAIT, float(item["wait"])))
+            continue
+        key, repeat = (item.get("key"), int(item.get("repeat", 1))) if isinstance(item, dict) else (item, 1)
+        if not isinstance(key, str) or not key.startswith("KEY_"):
+            raise MacroError(f"Not a remote key: {key!r} (keys look like KEY_HOME)")
+        steps.extend([(STEP_KEY, key)] * max(1, repeat))
+    return steps
+
+
+def load_macros(path: Path = MACROS_FILE) -> dict[str, list[tuple[str, object]]]:
+    """Built-in HDMI macros plus the user's macros file (a JSON object of name -> steps), which wins on name clashes."""
+    definitions = dict(SMART_TV_HDMI_MACROS)
+    if path.exists():
+        try:
+            user = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError as exc:
+            raise MacroError(f"{path} is not valid JSON: {exc}") from exc
+        if not isinstance(user, dict):
+            raise MacroError(f"{path} must hold a JSON object of macro name -> list of keys")
+        definitions.update(user)
+
+    macros = {}
+    for name, definition in definitions.items():
+        try:
+            macros[str(name)] = parse_steps(definition)
+        except (MacroError, TypeError, ValueError) as exc:
+            raise MacroError(f"Macro {name!r}: {exc}") from exc
+    return macros
+
+
+def describe(steps: list[tuple[str, object]]) -> str:
+    return " -> ".join(str(value) if kind == STEP_KEY else f"wait {value}s" for kind, value in steps)
+
+
+class PacingProfiles:
+    """Delay between macro keys per TV model, learned from runs and kept in a JSON file.
+
+    Additive decrease, multiplicative increase: a run whose outcome was
+    checked and correct lowers the model's delay by ``DELAY_DECREASE``, down
+    to its floor, and a run where the TV dropped or stalled the connection,
+    or ended in the wrong state, doubles it. The floor is ``MIN_DELAY`` or
+    ``ACK_FACTOR`` × the slowest key acknowledgement seen in the run,
+    whichever is larger, so a slow TV is never rushed.
+
+    A TV cannot report which menu item is highlighted and silently drops
+    keys sent too fast, so a run without a check proves nothing about the
+    delay: it only lowers the delay down to a ``"floor"`` someone set for
+    the model in the file, and otherwise leaves it alone.
+    """
+
+    def __init__(self, path: Path = PACING_FILE):
+        self.path = path
+        self.profiles: dict[str, dict] = {}
+        self._dirty = False
+        self._write_lock = threading.Lock()
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+            if isinstance(payload, dict):
+                self.profiles = {str(model): dict(profile) for model, profile in payload.items()
+                                 if isinstance(profile, dict)}
+        except (OSError, ValueError):
+            pass
+
+    def delay(self, model: str) -> float:
+        return float(self.profiles.get(model, {}).get("delay", DEFAULT_DELAY))
+
+    def record(self, model: str, ok: bool, ack: float | None = None, verified: bool = False) -> None:
+        """One run of ``model``: ``ok`` when no TV failed, ``verified`` when every TV was checked to be right."""
+        profile = self.profiles.setdefault(model, {"delay": DEFAULT_DELAY})
+        delay = float(profile.get("delay", DEFAULT_DELAY))
+        if ok:
+            if verified or "floor" in profile:
+                floor = max(float(profile.get("floor", MIN_DELAY)), ACK_FACTOR * (ack or 0.0))
+                profile["delay"] = round(max(floor, min(delay, delay - DELAY_DECREASE)), 3)
+            profile["runs"] = profile.get("runs", 0) + 1
+            if ack is not None:
+                profile["ack_ms"] = round(ack * 1000, 1)
+        else:
+            profile["delay"] = round(min(MAX_DELAY, delay * 2), 3)
+            profile["failures"] = profile.get("failures", 0) + 1
+        self._dirty = True
+
+    def snapshot(self) -> str | None:
+        """The profiles as JSON if they changed since the last snapshot; call where ``record`` runs."""
+        if not self._dirty:
+            return None
+        self._dirty = False
+        return json.dumps(self.profiles, indent=2, sort_keys=True)
+
+    def write(self, payload: str) -> None:
+        """Write a :meth:`snapshot`; safe on a worker thread."""
+        with self._write_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.path.with_name(self.path.name + ".tmp")
+            temp_file.write_text(payload, encoding="utf-8")
+            os.replace(temp_file, self.path)
+
+
+class MacroEngine:
+    """Runs key macros on Smart TVs, paced per model and many TVs at a time.
+
+    Each key waits for the TV's acknowledgement (see
+    :meth:`smart_tv.AsyncSmartTV.press`) and then the model's learned delay
+    before the next key; no delay follows the last key. Without the asyncio
+    client there is no acknowledgement and each key opens its own
+    connection, so only the delay paces the macro.
+
+    :meth:`run_many` sends one macro to up to ``concurrency`` TVs at once,
+    each through its device queue, so 30 TVs take about as long as one.
+    ``verify``, an async ``verify(device, macro_name) -> bool``, checks a
+    TV's state after a macro; a TV in the wrong state fails the run, and
+    only checked runs let the learned delay go down (see
+    :class:`PacingProfiles`). Must be used on the runtime loop.
+    """
+
+    def __init__(self, runtime, pacing: PacingProfiles | None = None, concurrency: int = DEFAULT_CONCURRENCY,
+                 verify=None):
+        self.runtime = runtime
+        self.pacing = pacing if pacing is not None else PacingProfiles()
+        self.concurrency = max(1, concurrency)
+        self.verify = verify
+        self.models: dict[str, str] = {}
+
+    async def _model(self, tv) -> str:
+        if tv.ip not in self.models:
+            info = await tv.device_info()
+            details = info.get("device", {}) if isinstance(info, dict) else {}
+            self.models[tv.ip] = details.get("modelName") or UNKNOWN_MODEL
+        return self.models[tv.ip]
+
+    async def run(self, device: dict, name: str, steps: list[tuple[str, object]]) -> dict:
+        """Run one macro on one TV; returns a result row and never raises for device errors.
+
+        Pacing is only learned through :meth:`run_many`.
+        """
+        ip, port = device["ip"], int(device["port"])
+        row = {"device": ip, "macro": name, "ok": False, "error": None, "model": self.models.get(ip, UNKNOWN_MODEL),
+               "keys_sent": 0, "verified": False}
+        acks: list[float] = []
+
+        async def _worker(tv):
+            model = await self._model(tv)
+            row["model"] = model
+            delay = self.pacing.delay(model)
+            row["delay"] = delay
+            for index, (kind, value) in enumerate(steps):
+                if kind == STEP_WAIT:
+                    await asyncio.sleep(value)
+                    continue
+                ack = await tv.press(value)
+                row["keys_sent"] += 1
+                if ack is not None:
+                    acks.append(ack)
+                if index < len(steps) - 1 and steps[index + 1][0] == STEP_KEY:
+                    await asyncio.sleep(delay * (OPENING_FACTOR if value in OPENING_KEYS else 1))
+
+        start = time.perf_counter()
+        try:
+            await self.runtime.queue.submit(
+                device_key(ip, port, int(device.get("id", 0))),
+                lambda: self.runtime.call_smart_tv(ip, port, _worker, UNSAFE_RETRY),
+                PRIORITY_INTERACTIVE,
+            )
+            row["ok"] = True
+            if self.verify is not None:
+                row["verified"] = row["ok"] = bool(await self.verify(device, name))
+                if not row["ok"]:
+                    row["error"] = "The TV is not in the state the macro should leave it in (keys dropped?)"
+        except Exception as exc:
+            row["error"] = str(exc) or exc.__class__.__name__
+        row["elapsed_ms"] = int((time.perf_counter() - start) * 1000)
+        row["ack"] = max(acks, default=None)
+        return row
+
+    def _learn(self, rows: list[dict]) -> None:
+        """One pacing update per model per batch, so a sweep over 30 TVs of a model counts as one run."""
+        by_model: dict[str, list[dict]] = {}
+        for row in rows:
+            # A TV that refused the connection (powered off, not authorized) says nothing about pacing.
+            if row["keys_sent"]:
+                by_model.setdefault(row["model"], []).append(row)
+        for model, model_rows in by_model.items():
+            acks = [row["ack"] for row in model_rows if row["ack"] is not None]
+            self.pacing.record(model, all(row["ok"] for row in model_rows), max(acks, default=None),
+                               verified=all(row["verified"] for row in model_rows))
+
+    async def run_many(self, devices: list[dict], name: str, steps: list[tuple[str, object]]) -> list[dict]:
+        """Run one macro on every device concurrently; one result row per device, in input order."""
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def _one(device: dict) -> dict:
+            async with limit:
+                return await self.run(device, name, steps)
+
+        rows = await asyncio.gather(*(_one(device) for device in devices))
+        self._learn(rows)
+        # Serialized here: another run_many may add a model to the profiles while the file is written.
+        payload = self.pacing.snapshot()
+        if payload is not None:
+            await asyncio.to_thread(self.pacing.write, payload)
+        return list(rows)
+
+
+def main() -> None:
+    from fleet_runtime import FleetRuntime
+
+    parser = argparse.ArgumentParser(description="Run a Smart TV key macro on saved Smart TVs")
+    parser.add_argument("macro", nargs="?", help="Macro name (built-in HDMI1..HDMI4 or from smart_tv_macros.json)")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--site", action="append", help="Only TVs of this site (repeatable)")
+    target.add_argument("--devices", nargs="+", metavar="IP", help="Only these saved TVs")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--list", action="store_true", help="List macros and learned per-model delays")
+    args = parser.parse_args()
+
+    macros = load_macros()
+    if args.list or not args.macro:
+        for name, steps in macros.items():
+            print(f"{name}: {describe(steps)}")
+        for model, profile in sorted(PacingProfiles().profiles.items()):
+            print(f"  {model}: {profile.get('delay', DEFAULT_DELAY)} s between keys")
+        return
+    if args.macro not in macros:
+        parser.error(f"Unknown macro {args.macro!r}; use --list")
+
+    devices = [device for device in load_saved_devices()
+               if resolve_protocol(device["protocol"], device["port"]) == "SMART_TV_WS"]
+    if args.site:
+        devices = [device for device in devices if device["site"] in args.site]
+    elif args.devices:
+        devices = [device for device in devices if device["ip"] in args.devices]
+    if not devices:
+        parser.error("No saved Smart TVs match")
+
+    runtime = FleetRuntime()
+    engine = MacroEngine(runtime, concurrency=args.concurrency)
+    rows = runtime.run(engine.run_many(devices, args.macro, macros[args.macro])).result()
+    for row in rows:
+        status = "OK" if row["ok"] else f"failed: {row['error']}"
+        print(f"{row['device']:<15}  {row['model']:<16}  {row['elapsed_ms']:>6} ms  {status}")
+    print(f"{sum(row['ok'] for row in rows)}/{len(rows)} TVs ran {args.macro}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import ipaddress
+import json
+import random
+import secrets
+import ssl
+import struct
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+REMOTE_PATH = "/api/v2/channels/samsung.remote.control"
+REST_PATH = "/api/v2/"
+SOURCES = ["HDMI1", "HDMI2", "HDMI3", "HDMI4"]
+OVERLAY_KEYS = {"KEY_SOURCE", "KEY_HOME", "KEY_MENU"}
+
+AUTH_APPROVE = "approve"
+AUTH_DENY = "deny"
+AUTH_TOKEN = "token"
+
+OP_TEXT = 0x1
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+
+@dataclass
+class TVProfile:
+    """How a virtual TV behaves.
+
+    ``auth``: ``approve`` hands a new token to every client (the viewer
+    always presses Allow), ``deny`` rejects with ``ms.channel.unauthorized``,
+    and ``token`` accepts only clients presenting a token it issued earlier
+    (a TV whose pairing was revoked rejects everyone else).
+
+    ``latency`` (+ up to ``jitter``) delays the handshake, each REST reply
+    and the handling of each WebSocket message. ``fail_rate`` is the chance
+    that a connection is reset as soon as it is accepted. A key arriving
+    less than ``key_gap`` seconds after the previous key (twice that after a
+    key that opens an overlay) is dropped, like a busy TV UI.
+    """
+
+    model: str = "QE55Q80BATXXU"
+    name: str = "[TV] Simulated"
+    auth: str = AUTH_APPROVE
+    latency: float = 0.0
+    jitter: float = 0.0
+    fail_rate: float = 0.0
+    key_gap: float = 0.0
+
+
+@dataclass
+class TVState:
+    power: str = "on"
+    volume: int = 15
+    mute: bool = False
+    source: str = "HDMI1"
+    menu: int | None = None
+    keys: list[str] = field(default_factory=list)
+
+
+class VirtualTV:
+    """One simulated Samsung Smart TV: the remote-control WebSocket and ``rest_device_info`` on one address."""
+
+    def __init__(self, ip: str, port: int, profile: TVProfile | None = None, ssl_context: ssl.SSLContext | None = None):
+        self.ip = ip
+        self.port = port
+        self.profile = profile or TVProfile()
+        self.ssl_context = ssl_context
+        self.state = TVState()
+        self.tokens: set[str] = set()
+        self.stats = {"connections": 0, "resets": 0, "unauthorized": 0, "keys": 0, "dropped_keys": 0, "rest": 0}
+        self._server: asyncio.AbstractServer | None = None
+        self._last_key = 0.0
+        self._last_gap = 0.0
+
+    def reset(self) -> None:
+        """Back to the power-on state, forgetting the last key (tokens and counters are kept)."""
+        self.state = TVState()
+        self._last_key = self._last_gap = 0.0
+
+    @property
+    def online(self) -> bool:
+        return self._server is not None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.ip, self.port, ssl=self.ssl_context)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Go offline: new connections are refused, as with a TV that was switched off at the wall."""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    async def _delay(self) -> None:
+        wait = self.profile.latency + random.uniform(0, self.profile.jitter)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    # ── HTTP ─────────────────────────────────────────────────────────────────
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats["connections"] += 1
+        try:
+            if random.random() < self.profile.fail_rate:
+                self.stats["resets"] += 1
+                writer.transport.abort()
+                return
+            head = await reader.readuntil(b"\r\n\r\n")
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = request_line.split(" ", 2)
+            headers = {}
+            for line in header_lines:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            url = urlsplit(target)
+            await self._delay()
+            if headers.get("upgrade", "").lower() == "websocket" and url.path == REMOTE_PATH:
+                await self._remote(reader, writer, headers, parse_qs(url.query))
+            elif method == "GET" and url.path in (REST_PATH, REST_PATH.rstrip("/")):
+                self.stats["rest"] += 1
+                await self._reply(writer, 200, self.device_info())
+            else:
+                await self._reply(writer, 404, {"error": f"no route for {url.path}"})
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _reply(writer: asyncio.StreamWriter, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Not Found'}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    def device_info(self) -> dict:
+        return {
+            "id": f"uuid:{hashlib.md5(f'{self.ip}:{self.port}'.encode()).hexdigest()}",
+            "name": self.profile.name,
+            "type": "Samsung SmartTV",
+            "uri": f"http://{self.ip}:{self.port}/api/v2/",
+            "device": {
+                "name": self.profile.name,
+                "modelName": self.profile.model,
+                "PowerState": self.state.power,
+                "TokenAuthSupport": "true",
+                "ip": self.ip,
+            },
+        }
+
+    # ── WebSocket remote ─────────────────────────────────────────────────────
+    async def _remote(self, reader, writer, headers: dict, query: dict) -> None:
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode("latin-1")
+        )
+
+        token = (query.get("token") or [None])[0]
+        if self.profile.auth == AUTH_DENY or (self.profile.auth == AUTH_TOKEN and token not in self.tokens):
+            self.stats["unauthorized"] += 1
+            await _send_frame(writer, OP_TEXT, json.dumps({"event": "ms.channel.unauthorized"}).encode())
+            await _send_frame(writer, OP_CLOSE, struct.pack("!H", 1000))
+            return
+        data = {"clients": [], "id": secrets.token_hex(8)}
+        if token not in self.tokens:
+            token = str(random.randint(10_000_000, 99_999_999))
+            self.tokens.add(token)
+            data["token"] = token
+        await _send_frame(writer, OP_TEXT, json.dumps({"data": data, "event": "ms.channel.connect"}).encode())
+
+        while True:
+            opcode, payload = await _read_frame(reader)
+            if opcode == OP_CLOSE:
+                await _send_frame(writer, OP_CLOSE, payload[:2])
+                return
+            await self._delay()
+            if opcode == OP_PING:
+                await _send_frame(writer, OP_PONG, payload)
+            elif opcode == OP_TEXT:
+                self._command(json.loads(payload))
+
+    def _command(self, message: dict) -> None:
+        params = message.get("params", {})
+        if message.get("method") != "ms.remote.control" or params.get("TypeOfRemote") != "SendRemoteKey":
+            return
+        if params.get("Cmd") not in ("Click", "Press"):
+            return
+        key = params.get("DataOfCmd", "")
+        now = time.monotonic()
+        if self._last_key and now - self._last_key < self._last_gap:
+            self.stats["dropped_keys"] += 1
+            return
+        self._last_key = now
+        self._last_gap = self.profile.key_gap * (2 if key in OVERLAY_KEYS else 1)
+        self.stats["keys"] += 1
+        self.state.keys.append(key)
+        self._apply_key(key)
+
+    def _apply_key(self, key: str) -> None:
+        state = self.state
+        if state.menu is not None:
+            if key == "KEY_RIGHT":
+                state.menu = min(len(SOURCES) - 1, state.menu + 1)
+            elif key == "KEY_LEFT":
+                state.menu = max(0, state.menu - 1)
+            elif key == "KEY_ENTER":
+                state.source, state.menu = SOURCES[state.menu], None
+            elif key in ("KEY_RETURN", "KEY_HOME"):
+                state.menu = None
+            return
+        if key == "KEY_SOURCE":
+            state.menu = 0
+        elif key == "KEY_POWER":
+            state.power = "standby" if state.power == "on" else "on"
+        elif key == "KEY_MUTE":
+            state.mute = not state.mute
+        elif key == "KEY_VOLUP":
+            state.volume = min(100, state.volume + 1)
+        elif key == "KEY_VOLDOWN":
+            state.volume = max(0, state.volume - 1)
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    """One client frame (always masked); continuation frames are not used by the remote API."""
+    first, second = await reader.readexactly(2)
+    opcode, length = first & 0x0F, second & 0x7F
+    if length == 126:
+        (length,) = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        (length,) = struct.unpack("!Q", await reader.readexactly(8))
+    mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+    payload = await reader.readexactly(length)
+    return opcode, bytes(byte ^ mask[index % 4] for index, byte in enumerate(payload))
+
+
+async def _send_frame(writer: asyncio.StreamWriter, opcode: int, payload: bytes) -> None:
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    writer.write(header + payload)
+    await writer.drain()
+
+
+class Simulator:
+    """Many virtual TVs served from one event loop on a background thread.
+
+    Each TV gets its own loopback address (127.0.1.1, 127.0.1.2, ...) on the
+    real Smart TV port, so clients treat them exactly like TVs; with
+    ``same_ip`` they share ``first_ip`` on consecutive ports instead, for
+    systems where only 127.0.0.1 is routable.
+    """
+
+    def __init__(self, count: int = 1, first_ip: str = "127.0.1.1", port: int = 8001,
+                 profile: TVProfile | None = None, same_ip: bool = False, ssl_context: ssl.SSLContext | None = None):
+        base = ipaddress.ip_address(first_ip)
+        self.tvs = [
+            VirtualTV(str(base) if same_ip else str(base + index), port + index if same_ip and port else port,
+                      profile or TVProfile(), ssl_context)
+            for index in range(count)
+        ]
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="smart-tv-simulator", daemon=True)
+
+    def start(self) -> "Simulator":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start_all(), self.loop).result()
+        return self
+
+    async def _start_all(self) -> None:
+        await asyncio.gather(*(tv.start() for tv in self.tvs))
+
+    def stop(self) -> None:
+        async def _stop_all():
+            await asyncio.gather(*(tv.stop() for tv in self.tvs))
+
+        asyncio.run_coroutine_threadsafe(_stop_all(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def set_online(self, tv: VirtualTV, online: bool) -> None:
+        coro = tv.start() if online and not tv.online else tv.stop()
+        asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def devices(self) -> list[dict]:
+        """The TVs in the saved-devices shape, ready for the dashboard's Import or the CLI tools."""
+        return [{"ip": tv.ip, "port": tv.port, "id": 0, "protocol": "SMART_TV_WS", "site": "Simulator",
+                 "description": tv.profile.model} for tv in self.tvs]
+
+    def totals(self) -> dict:
+        totals = {}
+        for tv in self.tvs:
+            for name, value in tv.stats.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate Samsung Smart TVs (remote WebSocket + REST device info)")
+    parser.add_argument("--count", type=int, default=1, help="Number of virtual TVs")
+    parser.add_argument("--first-ip", default="127.0.1.1", help="Address of the first TV; the next ones count up")
+    parser.add_argument("--port", type=int, default=8001, help="Port for every TV (8002 needs --certfile/--keyfile)")
+    parser.add_argument("--same-ip", action="store_true", help="All TVs on --first-ip, on consecutive ports")
+    parser.add_argument("--model", default=TVProfile.model)
+    parser.add_argument("--auth", choices=[AUTH_APPROVE, AUTH_DENY, AUTH_TOKEN], default=AUTH_APPROVE)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Up to this many extra seconds, at random")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of connections reset on accept")
+    parser.add_argument("--key-gap", type=float, default=0.0, help="Keys closer together than this are dropped")
+    parser.add_argument("--certfile", help="TLS certificate, to serve wss/https like port 8002")
+    parser.add_argument("--keyfile", help="TLS private key for --certfile")
+    parser.add_argument("--devices-file", type=Path, help="Write the TVs as an importable saved-devices file")
+    args = parser.parse_args()
+
+    ssl_context = None
+    if args.certfile:
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(args.certfile, args.keyfile)
+    profile = TVProfile(model=args.model, auth=args.auth, latency=args.latency, jitter=args.jitter,
+                        fail_rate=args.fail_rate, key_gap=args.key_gap)
+    simulator = Simulator(args.count, args.first_ip, args.port, profile, args.same_ip, ssl_context).start()
+    if args.devices_file:
+        args.devices_file.write_text(json.dumps(simulator.devices(), indent=2), encoding="utf-8")
+    first, last = simulator.tvs[0], simulator.tvs[-1]
+    print(f"{len(simulator.tvs)} virtual TV(s) from {first.ip}:{first.port} to {last.ip}:{last.port} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+        print(simulator.totals())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from pathlib import Path
+
+STALL_LOG_FILE = Path.home() / "Documents" / "SamsungMDC" / "ui_stalls.log"
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _frame_text(frame: tuple) -> str:
+    filename, lineno, name = frame
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+class StallReport:
+    """One main-loop stall: how long the Tk thread was blocked and where it was."""
+
+    def __init__(self, started_at: float, duration: float, samples: Counter):
+        self.started_at = started_at
+        self.duration = duration
+        self.samples = samples
+
+    def hottest_stack(self) -> tuple:
+        return self.samples.most_common(1)[0][0] if self.samples else ()
+
+    def culprit(self) -> str:
+        """Innermost app frame of the most sampled stack (plus the innermost frame if that is library code)."""
+        stack = self.hottest_stack()
+        if not stack:
+            return "unknown (no samples)"
+        app_frames = [f for f in stack if f[0].startswith(_APP_DIR) and not f[0].endswith("stall_watchdog.py")]
+        innermost = _frame_text(stack[-1])
+        if not app_frames or app_frames[-1] == stack[-1]:
+            return innermost
+        return f"{_frame_text(app_frames[-1])} -> {innermost}"
+
+    def summary(self) -> str:
+        return f"UI stalled {self.duration:.2f}s in {self.culprit()}"
+
+    def write(self, path: Path = STALL_LOG_FILE) -> None:
+        lines = [f"=== {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started_at))}  {self.summary()}"]
+        total = sum(self.samples.values())
+        for stack, count in self.samples.most_common(3):
+            lines.append(f"--- {count}/{total} samples")
+            lines.extend(f"    {_frame_text(frame)}" for frame in stack)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as fh:
+                fh.write("\n".join(lines) + "\n")
+        except OSError:
+            pass
+
+
+class StallWatchdog:
+    """Measures Tk event-loop latency and samples the Tk thread's stack while it is stalled.
+
+    A tick is scheduled every ``interval_ms`` with ``after``; how late it runs
+    is the loop latency. A sampler thread watches the tick's heartbeat: once it
+    is more than ``threshold`` seconds overdue, the Tk thread's stack is
+    captured every ``sample_interval`` until the loop recovers, and the stall is
+    reported to ``on_stall`` (called from the sampler thread).
+    """
+
+    def __init__(self, widget, on_stall=None, interval_ms: int = 100, threshold: float = 0.25,
+                 sample_interval: float = 0.05, history: int = 300):
+        self.widget = widget
+        self.on_stall = on_stall
+        self.interval = interval_ms / 1000
+        self.threshold = threshold
+        self.sample_interval = sample_interval
+        self.latencies: deque[float] = deque(maxlen=history)
+        self.stalls: deque[StallReport] = deque(maxlen=50)
+        self._tk_thread_id = None
+        self._heartbeat = 0.0
+        self._expected = 0.0
+        self._stop = threading.Event()
+        self._sampler = None
+
+    @property
+    def running(self) -> bool:
+        return self._sampler is not None
+
+    def start(self) -> None:
+        """Must be called on the Tk thread."""
+        if self.running:
+            return
+        self._tk_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._expected = self._heartbeat + self.interval
+        # A fresh event per start, so a tick or sampler left over from a previous run stays stopped.
+        self._stop = stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, args=(stop,), name="ui-stall-sampler", daemon=True)
+        self._sampler.start()
+        self.widget.after(int(self.interval * 1000), self._tick, stop)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._sampler = None
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        if not latencies:
+            return {"last_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0, "stalls": len(self.stalls)}
+        return {
+            "last_ms": self.latencies[-1] * 1000,
+            "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+            "max_ms": latencies[-1] * 1000,
+            "stalls": len(self.stalls),
+        }
+
+    def _tick(self, stop: threading.Event) -> None:
+        if stop.is_set():
+            return
+        now = time.monotonic()
+        self.latencies.append(max(0.0, now - self._expected))
+        self._heartbeat = now
+        self._expected = now + self.interval
+        self.widget.after(int(self.interval * 1000), self._tick, stop)
+
+    def _sample_loop(self, stop: threading.Event) -> None:
+        samples = None
+        stall_started = 0.0
+        while not stop.wait(self.sample_interval):
+            heartbeat = self._heartbeat
+            overdue = time.monotonic() - heartbeat - self.interval
+            if overdue > self.threshold:
+                if samples is None:
+                    samples = Counter()
+                    stall_started = heartbeat + self.interval
+                frame = sys._current_frames().get(self._tk_thread_id)
+                if frame is not None:
+                    samples[self._stack_key(frame)] += 1
+            elif samples is not None:
+                report = StallReport(
+                    time.time() - (time.monotonic() - stall_started),
+                    max(0.0, heartbeat - stall_started),
+                    samples,
+                )
+                samples = None
+                self.stalls.append(report)
+                if self.on_stall:
+                    self.on_stall(report)
+
+    @staticmethod
+    def _stack_key(frame) -> tuple:
+        stack = []
+        while frame is not None and len(stack) < 40:
+            stack.append((frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+            frame = frame.f_back
+        return tuple(reversed(stack))
@@ -0,0 +1,55 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+# Taken when this module is first imported; the launcher imports it before anything else.
+_PROCESS_ORIGIN = time.perf_counter()
+
+STARTUP_LOG_FILE = Path.home() / "Documents" / "SamsungMDC" / "startup_times.jsonl"
+
+
+class StartupTimer:
+    """Named checkpoints since launch, reported once the first frame is on screen."""
+
+    def __init__(self, origin: float = _PROCESS_ORIGIN):
+        self.origin = origin
+        self.marks: list[tuple[str, float]] = []
+
+    def mark(self, name: str) -> None:
+        self.marks.append((name, time.perf_counter() - self.origin))
+
+    def total(self) -> float:
+        return self.marks[-1][1] if self.marks else 0.0
+
+    def phases(self) -> dict[str, float]:
+        """Seconds spent between consecutive marks, keyed by the mark that ends each phase."""
+        phases = {}
+        previous = 0.0
+        for name, at in self.marks:
+            phases[name] = phases.get(name, 0.0) + at - previous
+            previous = at
+        return phases
+
+    def summary(self) -> str:
+        parts = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases().items())
+        return f"{self.total():.2f}s ({parts})"
+
+    def write(self, path: Path = STARTUP_LOG_FILE, **extra) -> None:
+        """Append one JSON line per launch so cold-start time can be tracked across releases."""
+        record = {
+            "at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "frozen": bool(getattr(sys, "frozen", False) or "__compiled__" in globals()),
+            "total": round(self.total(), 3),
+            "phases": {name: round(seconds, 3) for name, seconds in self.phases().items()},
+            **extra,
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as fh:
+                fh.write(json.dumps(record) + "\n")
+        except OSError:
+            pass
+
+
+STARTUP = StartupTimer()
@@ -0,0 +1,273 @@
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+HISTORY_DB_FILE = Path.home() / "Documents" / "SamsungMDC" / "status_history.db"
+RAW_RETENTION_SECONDS = 7 * 86400
+ROLLUP_BUCKET_SECONDS = 3600
+ROLLUP_RETENTION_SECONDS = 365 * 86400
+COMPACT_INTERVAL_SECONDS = 3600
+SPARKLINE_POINTS = 48
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    device TEXT NOT NULL,
+    ts REAL NOT NULL,
+    reachable INTEGER NOT NULL,
+    latency_ms REAL,
+    power TEXT,
+    volume INTEGER,
+    input_source TEXT,
+    mute TEXT
+);
+CREATE INDEX IF NOT EXISTS samples_device_ts ON samples (device, ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    device TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    reachable INTEGER NOT NULL,
+    latency_avg REAL,
+    latency_max REAL,
+    power TEXT,
+    PRIMARY KEY (device, bucket)
+);
+"""
+
+# Raw samples older than the cut-off are folded into hourly rollups, keeping the
+# last known power state of each hour, and then deleted.
+_COMPACT_SQL = """
+INSERT OR REPLACE INTO rollups (device, bucket, samples, reachable, latency_avg, latency_max, power)
+SELECT g.device, g.bucket, COUNT(*), SUM(g.reachable), AVG(g.latency_ms), MAX(g.latency_ms),
+       (SELECT p.power FROM samples p
+        WHERE p.device = g.device AND p.ts >= g.bucket AND p.ts < g.bucket + :size AND p.power IS NOT NULL
+        ORDER BY p.ts DESC LIMIT 1)
+FROM (SELECT device, CAST(ts / :size AS INTEGER) * :size AS bucket, reachable, latency_ms
+      FROM samples WHERE ts < :cutoff) g
+GROUP BY g.device, g.bucket
+"""
+
+
+class StatusHistory:
+    """Per-device status / reachability / latency samples in SQLite, with in-memory sparkline buffers.
+
+    :meth:`record` never touches the database on the caller's thread: rows go
+    to a writer thread that inserts them in batches and, once an hour,
+    downsamples raw samples older than a week into hourly rollups (kept for a
+    year). Reads use a separate connection (WAL mode), so history queries from
+    the UI do not wait on writes.
+    """
+
+    def __init__(self, path: Path = HISTORY_DB_FILE):
+        self.path = path
+        self._rows: queue.Queue = queue.Queue()
+        self._recent: dict[str, deque] = {}
+        self._seeded: set[str] = set()
+        self._ready = threading.Event()
+        self._reader: sqlite3.Connection | None = None
+        self._writer = threading.Thread(target=self._write_loop, name="status-history", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # ── Writing ──────────────────────────────────────────────────────────────
+    def record(self, device: str, reachable: bool, latency_ms: float | None = None, power: str | None = None,
+               volume: int | None = None, input_source: str | None = None, mute: str | None = None) -> None:
+        ts = time.time()
+        recent = self._recent.get(device)
+        if recent is None:
+            # Older samples are merged in by recent() when the UI first asks for them.
+            recent = self._recent[device] = deque(maxlen=SPARKLINE_POINTS)
+        recent.append((ts, bool(reachable), latency_ms))
+        self._rows.put((device, ts, int(bool(reachable)), latency_ms, power, volume, input_source, mute))
+
+    def close(self) -> None:
+        self._rows.put(None)
+        self._writer.join(timeout=5)
+
+    def _write_loop(self) -> None:
+        try:
+            conn = self._connect()
+            conn.executescript(_SCHEMA)
+        except sqlite3.Error:
+            self._ready.set()
+            return
+        self._ready.set()
+        last_compact = 0.0
+
+        while True:
+            try:
+                rows = [self._rows.get(timeout=COMPACT_INTERVAL_SECONDS)]
+            except queue.Empty:
+                rows = []
+            while True:
+                try:
+                    rows.append(self._rows.get_nowait())
+                except queue.Empty:
+                    break
+
+            closing = None in rows
+            rows = [row for row in rows if row is not None]
+            try:
+                if rows:
+                    with conn:
+                        conn.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                if time.monotonic() - last_compact >= COMPACT_INTERVAL_SECONDS:
+                    self._compact(conn)
+                    last_compact = time.monotonic()
+            except sqlite3.Error:
+                pass
+            if closing:
+                conn.close()
+                return
+
+    @staticmethod
+    def _compact(conn: sqlite3.Connection) -> None:
+        now = time.time()
+        cutoff = int((now - RAW_RETENTION_SECONDS) // ROLLUP_BUCKET_SECONDS) * ROLLUP_BUCKET_SECONDS
+        with conn:
+            conn.execute(_COMPACT_SQL, {"size": ROLLUP_BUCKET_SECONDS, "cutoff": cutoff})
+            conn.execute("DELETE FROM samples WHERE ts < ?", (cutoff,))
+            conn.execute("DELETE FROM rollups WHERE bucket < ?", (now - ROLLUP_RETENTION_SECONDS,))
+
+    # ── Reading (UI thread) ──────────────────────────────────────────────────
+    def _read(self, sql: str, params=()) -> list[tuple]:
+        if self._reader is None:
+            self._ready.wait(5)
+            try:
+                self._reader = self._connect()
+            except sqlite3.Error:
+                return []
+        try:
+            return self._reader.execute(sql, params).fetchall()
+        except sqlite3.Error:
+            return []
+
+    def recent(self, device: str) -> deque:
+        """Last ``SPARKLINE_POINTS`` samples as ``(ts, reachable, latency_ms)``, loaded from disk on first use."""
+        recent = self._recent.get(device)
+        if device not in self._seeded:
+            self._seeded.add(device)
+            live = list(recent or ())
+            # Samples recorded since startup may still be waiting for the writer thread.
+            before = live[0][0] if live else float("inf")
+            rows = self._read(
+                "SELECT ts, reachable, latency_ms FROM samples WHERE device = ? AND ts < ? ORDER BY ts DESC LIMIT ?",
+                (device, before, SPARKLINE_POINTS),
+            )
+            stored = [(ts, bool(reachable), latency) for ts, reachable, latency in reversed(rows)]
+            recent = self._recent[device] = deque(stored + live, maxlen=SPARKLINE_POINTS)
+        return recent
+
+    def series(self, device: str, since: float, points: int = 120) -> list[tuple[float, float, float | None]]:
+        """``(bucket_ts, reachable_fraction, avg_latency_ms)`` since ``since``, at most about ``points`` buckets."""
+        size = max(60, int((time.time() - since) / points))
+        raw = self._read(
+            "SELECT CAST(ts / :size AS INTEGER) * :size, AVG(reachable), AVG(latency_ms) FROM samples "
+            "WHERE device = :device AND ts >= :since GROUP BY 1",
+            {"size": size, "device": device, "since": since},
+        )
+        rolled = self._read(
+            "SELECT CAST(bucket / :size AS INTEGER) * :size, CAST(SUM(reachable) AS REAL) / SUM(samples), "
+            "AVG(latency_avg) FROM rollups WHERE device = :device AND bucket >= :since GROUP BY 1",
+            {"size": size, "device": device, "since": since},
+        )
+        merged = {bucket: (bucket, reachable, latency) for bucket, reachable, latency in rolled}
+        merged.update((bucket, (bucket, reachable, latency)) for bucket, reachable, latency in raw)
+        return [merged[bucket] for bucket in sorted(merged)]
+
+    def changes(self, device: str, since: float, limit: int = 200) -> list[tuple[float, str, object, object]]:
+        """Power and reachability transitions, newest first, as ``(ts, field, before, after)``."""
+        reachability = self._read(
+            "SELECT ts, prev, reachable FROM (SELECT ts, reachable, LAG(reachable) OVER (ORDER BY ts) AS prev "
+            "FROM samples WHERE device = ? AND ts >= ?) WHERE prev IS NOT NULL AND prev != reachable",
+            (device, since),
+        )
+        power = self._read(
+            "SELECT ts, prev, power FROM (SELECT ts, power, LAG(power) OVER (ORDER BY ts) AS prev FROM ("
+            "  SELECT bucket AS ts, power FROM rollups WHERE device = :device AND bucket >= :since AND power IS NOT NULL"
+            "  UNION ALL"
+            "  SELECT ts, power FROM samples WHERE device = :device AND ts >= :since AND power IS NOT NULL"
+            ")) WHERE prev IS NOT NULL AND prev != power",
+            {"device": device, "since": since},
+        )
+        events = [(ts, "reachable", bool(before), bool(after)) for ts, before, after in reachability]
+        events += [(ts, "power", before, after) for ts, before, after in power]
+        events.sort(key=lambda event: event[0], reverse=True)
+        return events[:limit]
+
+    def summary(self, device: str, since: float) -> dict:
+        # Samples older than RAW_RETENTION_SECONDS only survive as hourly rollups, weighted by their sample count.
+        rows = self._read(
+            "SELECT SUM(n), SUM(up), SUM(latency_sum) / SUM(latency_n), MAX(last_ts) FROM ("
+            "  SELECT COUNT(*) AS n, SUM(reachable) AS up, SUM(latency_ms) AS latency_sum,"
+            "         COUNT(latency_ms) AS latency_n, MAX(ts) AS last_ts"
+            "  FROM samples WHERE device = :device AND ts >= :since"
+            "  UNION ALL"
+            "  SELECT SUM(samples), SUM(reachable), SUM(latency_avg * samples),"
+            "         SUM(CASE WHEN latency_avg IS NULL THEN 0 ELSE samples END), MAX(bucket)"
+            "  FROM rollups WHERE device = :device AND bucket >= :since"
+            ")",
+            {"device": device, "since": since},
+        )
+        count, reachable, latency, last_ts = rows[0] if rows else (0, 0, None, None)
+        last_power = self._read(
+            "SELECT power, ts FROM ("
+            "  SELECT power, ts FROM samples WHERE device = :device AND power IS NOT NULL"
+            "  UNION ALL"
+            "  SELECT power, bucket AS ts FROM rollups WHERE device = :device AND power IS NOT NULL"
+            ") ORDER BY ts DESC LIMIT 1",
+            {"device": device},
+        )
+        return {
+            "samples": count or 0,
+            "uptime_pct": (reachable or 0) * 100.0 / count if count else None,
+            "latency_avg_ms": latency,
+            "last_seen": last_ts,
+            "power": last_power[0][0] if last_power else None,
+            "power_at": last_power[0][1] if last_power else None,
+        }
+
+
+def fleet_summary(since: float, path: Path = HISTORY_DB_FILE) -> dict[str, dict]:
+    """Uptime and latency per device since ``since``, from raw samples and hourly rollups, in one query.
+
+    Opens its own connection, so it can run on any thread alongside a
+    :class:`StatusHistory` writing to the same file.
+    """
+    if not path.exists():
+        return {}
+    conn = sqlite3.connect(str(path), timeout=5)
+    try:
+        rows = conn.execute(
+            "SELECT device, SUM(n), SUM(up), SUM(latency_sum) / SUM(latency_n), MAX(latency_max) FROM ("
+            "  SELECT device, COUNT(*) AS n, SUM(reachable) AS up, SUM(latency_ms) AS latency_sum,"
+            "         COUNT(latency_ms) AS latency_n, MAX(latency_ms) AS latency_max"
+            "  FROM samples WHERE ts >= :since GROUP BY device"
+            "  UNION ALL"
+            "  SELECT device, SUM(samples), SUM(reachable), SUM(latency_avg * samples),"
+            "         SUM(CASE WHEN latency_avg IS NULL THEN 0 ELSE samples END), MAX(latency_max)"
+            "  FROM rollups WHERE bucket >= :since GROUP BY device"
+            ") GROUP BY device",
+            {"since": since},
+        ).fetchall()
+    except sqlite3.Error:
+        return {}
+    finally:
+        conn.close()
+    return {
+        device: {
+            "samples": count,
+            "uptime_pct": (up or 0) * 100.0 / count if count else None,
+            "latency_avg_ms": latency_avg,
+            "latency_max_ms": latency_max,
+        }
+        for device, count, up, latency_avg, latency_max in rows
+    }
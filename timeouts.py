@@ -0,0 +1,109 @@
+import time
+
+
+class DeadlineExceeded(RuntimeError):
+    """A batch job ran out of its overall time budget before this call could run."""
+
+
+class Deadline:
+    """Overall time budget shared by every call of one batch job."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cap(self, timeout: float) -> float:
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Batch deadline of {self.seconds:.0f}s exceeded.")
+        return min(timeout, remaining)
+
+
+class RttEstimator:
+    """TCP-style retransmission timeout (RFC 6298) from measured round-trip times.
+
+    ``rto = srtt + 4 * rttvar``, clamped to ``[min_rto, max_rto]``. A timeout
+    doubles the RTO (Karn's backoff) so a slow link is given more time on the
+    next attempt instead of being declared offline again.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+    GRANULARITY = 0.01
+
+    def __init__(self, initial: float, min_rto: float, max_rto: float):
+        self.min_rto = min_rto
+        self.max_rto = max_rto
+        self.srtt: float | None = None
+        self.rttvar: float | None = None
+        self.samples = 0
+        self.rto = initial
+
+    def sample(self, rtt: float) -> None:
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.samples += 1
+        self.rto = self._clamp(self.srtt + max(self.GRANULARITY, self.K * self.rttvar))
+
+    def backoff(self) -> None:
+        self.rto = self._clamp(self.rto * 2)
+
+    def _clamp(self, value: float) -> float:
+        return max(self.min_rto, min(self.max_rto, value))
+
+
+class EndpointTimeouts:
+    """Connect and command RTO estimators for one ``ip:port``.
+
+    The connect estimator is shared by every port of the same host (network
+    RTT does not depend on the port); the command estimator, which also
+    covers panel processing time, is per endpoint.
+    """
+
+    def __init__(self, connect: RttEstimator, command: RttEstimator):
+        self.connect = connect
+        self.command = command
+
+    def connect_timeout(self, override: float | None = None, deadline: Deadline | None = None) -> float:
+        timeout = override if override is not None else self.connect.rto
+        return deadline.cap(timeout) if deadline else timeout
+
+    def command_timeout(self, override: float | None = None, deadline: Deadline | None = None) -> float:
+        timeout = override if override is not None else self.command.rto
+        return deadline.cap(timeout) if deadline else timeout
+
+    def snapshot(self) -> dict:
+        return {
+            "srtt_ms": None if self.connect.srtt is None else round(self.connect.srtt * 1000, 1),
+            "rttvar_ms": None if self.connect.rttvar is None else round(self.connect.rttvar * 1000, 1),
+            "connect_timeout": round(self.connect.rto, 3),
+            "command_timeout": round(self.command.rto, 3),
+        }
+
+
+class TimeoutRegistry:
+    def __init__(self):
+        self._hosts: dict[str, RttEstimator] = {}
+        self._endpoints: dict[str, EndpointTimeouts] = {}
+
+    def get(self, ip: str, port: int) -> EndpointTimeouts:
+        endpoint = f"{ip}:{port}"
+        timeouts = self._endpoints.get(endpoint)
+        if timeouts is None:
+            connect = self._hosts.get(ip)
+            if connect is None:
+                connect = self._hosts[ip] = RttEstimator(initial=3.0, min_rto=0.3, max_rto=10.0)
+            command = RttEstimator(initial=5.0, min_rto=1.0, max_rto=15.0)
+            timeouts = self._endpoints[endpoint] = EndpointTimeouts(connect, command)
+        return timeouts
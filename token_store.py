@@ -0,0 +1,239 @@
+import argparse
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+TOKEN_DIR = Path.home() / "Documents" / "SamsungMDC" / "tokens"
+TOKENS_FILE = TOKEN_DIR / "tokens.json"
+TOKENS_FORMAT = 1
+LEGACY_PATTERN = "tv_token_*.txt"
+LOCK_TIMEOUT = 10.0
+
+
+@contextlib.contextmanager
+def _file_lock(path: Path, timeout: float = LOCK_TIMEOUT):
+    """Exclusive lock on ``path`` (a sidecar file) shared by every process on this machine."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a+b") as handle:
+        if os.name == "nt":
+            import msvcrt
+
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    handle.seek(0)
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if time.monotonic() >= deadline:
+                        raise
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+class TokenStore:
+    """Smart TV pairing tokens, one per IP, kept in memory.
+
+    The file is read once, on first use; per-IP token files written by older
+    versions (``tv_token_<ip>.txt``) are picked up then as well. Changes are
+    written back by a background thread, atomically (temp file, then
+    ``os.replace``), and a burst of changes is written once. The last
+    write is waited for at interpreter exit (:meth:`flush`).
+
+    The dashboard, the daemon and the scheduler share the file, so a write
+    re-reads it under a lock file and applies only this process's changes;
+    tokens other processes saved meanwhile are kept and picked up.
+    """
+
+    def __init__(self, path: Path = TOKENS_FILE):
+        self.path = path
+        self._tokens: dict[str, str] | None = None
+        self._changes: dict[str, str | None] = {}  # not yet written; None = forget
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._writer: threading.Thread | None = None
+
+    def _loaded(self) -> dict[str, str]:
+        # Callers hold self._lock.
+        if self._tokens is None:
+            self._tokens = self._read()
+        return self._tokens
+
+    def _read(self) -> dict[str, str]:
+        tokens = {}
+        for legacy in sorted(self.path.parent.glob(LEGACY_PATTERN)):
+            try:
+                token = legacy.read_text(encoding="utf-8").strip()
+            except OSError:
+                continue
+            if token:
+                tokens[legacy.stem[len("tv_token_"):].replace("_", ".")] = token
+        saved = self._read_file()
+        # Legacy tokens go into the file with the next write.
+        self._changes.update({ip: token for ip, token in tokens.items() if ip not in saved})
+        tokens.update(saved)
+        return tokens
+
+    def _read_file(self) -> dict[str, str]:
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+            return {str(ip): str(token) for ip, token in payload.get("tokens", {}).items() if token}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    # ── Lookups ──────────────────────────────────────────────────────────────
+    def get(self, ip: str) -> str | None:
+        with self._lock:
+            return self._loaded().get(ip)
+
+    def set(self, ip: str, token: str | None) -> None:
+        """Remember ``ip``'s token (``None`` forgets it); a write is scheduled only when it changed.
+
+        Forgetting always writes: another process may have saved a token this one has not seen yet.
+        """
+        with self._lock:
+            tokens = self._loaded()
+            if token and tokens.get(ip) == token:
+                return
+            if token:
+                tokens[ip] = token
+            else:
+                tokens.pop(ip, None)
+            self._changes[ip] = token or None
+        self._schedule_write()
+
+    def forget(self, ip: str) -> None:
+        self.set(ip, None)
+
+    def all(self) -> dict[str, str]:
+        with self._lock:
+            return dict(self._loaded())
+
+    # ── Writing ──────────────────────────────────────────────────────────────
+    def _schedule_write(self) -> None:
+        with self._lock:
+            self._idle.clear()
+            self._dirty.set()
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="token-store", daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _write_loop(self) -> None:
+        while True:
+            self._dirty.wait()
+            with self._lock:
+                self._dirty.clear()
+                changes, self._changes = self._changes, {}
+            try:
+                merged = self._write(changes)
+            except OSError:
+                merged = None
+            with self._lock:
+                if merged is None:
+                    # Keep the changes for the next write; newer ones win.
+                    self._changes = {**changes, **self._changes}
+                else:
+                    # Adopt tokens other processes wrote, except where this one has newer changes.
+                    self._tokens = {**merged, **{ip: token for ip, token in self._changes.items() if token}}
+                    for ip, token in self._changes.items():
+                        if token is None:
+                            self._tokens.pop(ip, None)
+                if not self._dirty.is_set():
+                    self._idle.set()
+
+    def _write(self, changes: dict[str, str | None]) -> dict[str, str]:
+        """Apply ``changes`` to the tokens on disk under the lock file; returns what was written."""
+        with _file_lock(self.path.with_name(self.path.name + ".lock")):
+            tokens = self._read_file()
+            for ip, token in changes.items():
+                if token:
+                    tokens[ip] = token
+                else:
+                    tokens.pop(ip, None)
+            temp_file = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            temp_file.write_text(json.dumps({"format": TOKENS_FORMAT, "tokens": tokens}, indent=2),
+                                 encoding="utf-8")
+            os.replace(temp_file, self.path)
+        return tokens
+
+    def flush(self, timeout: float | None = 5.0) -> bool:
+        """Wait until pending changes are on disk; False on timeout."""
+        return self._idle.wait(timeout)
+
+    # ── Provisioning ─────────────────────────────────────────────────────────
+    def export(self, path: Path, ips: list[str] | None = None) -> int:
+        """Write tokens (all, or only ``ips``) to ``path`` for another operator laptop; returns the count."""
+        tokens = self.all()
+        if ips is not None:
+            tokens = {ip: token for ip, token in tokens.items() if ip in ips}
+        payload = {"format": TOKENS_FORMAT, "exported": time.strftime("%Y-%m-%dT%H:%M:%S"), "tokens": tokens}
+        Path(path).write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        return len(tokens)
+
+    def import_file(self, path: Path, overwrite: bool = False) -> int:
+        """Merge tokens from an export; existing tokens are kept unless ``overwrite``. Returns how many changed."""
+        payload = json.loads(Path(path).read_text(encoding="utf-8"))
+        incoming = payload.get("tokens") if isinstance(payload, dict) else None
+        if not isinstance(incoming, dict):
+            raise ValueError(f"{path} is not a token export")
+        changed = 0
+        with self._lock:
+            tokens = self._loaded()
+            for ip, token in incoming.items():
+                ip, token = str(ip).strip(), str(token or "").strip()
+                if not ip or not token or tokens.get(ip) == token or (ip in tokens and not overwrite):
+                    continue
+                tokens[ip] = token
+                self._changes[ip] = token
+                changed += 1
+        if changed:
+            self._schedule_write()
+        return changed
+
+
+TOKENS = TokenStore()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export or import Smart TV pairing tokens")
+    sub = parser.add_subparsers(dest="action", required=True)
+    sub.add_parser("list", help="Show which TVs have a token")
+    export = sub.add_parser("export", help="Write tokens to a file")
+    export.add_argument("file", type=Path)
+    export.add_argument("--devices", nargs="+", metavar="IP", help="Only these TVs")
+    imported = sub.add_parser("import", help="Merge tokens from an exported file")
+    imported.add_argument("file", type=Path)
+    imported.add_argument("--overwrite", action="store_true", help="Replace tokens this laptop already has")
+    args = parser.parse_args()
+
+    if args.action == "list":
+        for ip in sorted(TOKENS.all()):
+            print(ip)
+    elif args.action == "export":
+        print(f"Exported {TOKENS.export(args.file, args.devices)} token(s) to {args.file}")
+        print("Keep the file private: a token lets anyone on the network control that TV.")
+    else:
+        print(f"Imported {TOKENS.import_file(args.file, args.overwrite)} token(s) from {args.file}")
+
+
+if __name__ == "__main__":
+    main()
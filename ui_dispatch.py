@@ -0,0 +1,67 @@
+import itertools
+import sys
+import threading
+import time
+
+
+class UiDispatcher:
+    """Thread-safe queue of UI callbacks, drained on the Tk thread once per frame.
+
+    Worker threads call :meth:`post` instead of ``widget.after(0, ...)``. Only
+    the first post after an idle period wakes the Tk loop; everything else
+    rides along with the next drain. Callbacks posted with the same ``key``
+    coalesce: only the latest one runs (e.g. the newest status text). Each
+    frame runs at most ``max_per_frame`` callbacks or ``frame_budget`` seconds
+    of them, whichever comes first, and leaves the rest for the next frame.
+    """
+
+    def __init__(self, widget, frame_ms: int = 16, max_per_frame: int = 200, frame_budget: float = 0.008):
+        self.widget = widget
+        self.frame_ms = frame_ms
+        self.max_per_frame = max_per_frame
+        self.frame_budget = frame_budget
+        self._lock = threading.Lock()
+        self._pending: dict = {}
+        self._unique = itertools.count()
+        self._scheduled = False
+        self.coalesced = 0
+
+    def post(self, callback, key=None) -> None:
+        """Run ``callback()`` on the Tk thread; a pending callback with the same ``key`` is replaced."""
+        with self._lock:
+            if key is None:
+                key = ("_unique", next(self._unique))
+            elif self._pending.pop(key, None) is not None:
+                self.coalesced += 1
+            # Re-inserting moves a replaced key to the back, so it never runs ahead of posts made before it.
+            self._pending[key] = callback
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.widget.after(0, self._drain)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _drain(self) -> None:
+        started = time.perf_counter()
+        for _ in range(self.max_per_frame):
+            with self._lock:
+                if not self._pending:
+                    self._scheduled = False
+                    return
+                key = next(iter(self._pending))
+                callback = self._pending.pop(key)
+            try:
+                callback()
+            except Exception:
+                self.widget.report_callback_exception(*sys.exc_info())
+            if time.perf_counter() - started >= self.frame_budget:
+                break
+
+        with self._lock:
+            if not self._pending:
+                self._scheduled = False
+                return
+        self.widget.after(self.frame_ms, self._drain)